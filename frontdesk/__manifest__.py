@@ -9,13 +9,12 @@
     'installable': True,
     'application': True,
     'license': 'OEEL-1',
-    'version': '1.0',
+    'version': '1.2',
     'depends': ['hr', 'operating_unit', 'portal'],
     'data': [
         'security/security.xml',
         'security/ir.model.access.csv',
         'data/frontdesk_cron.xml',
-        'data/frontdesk_auto_delete_cron.xml',
         'views/frontdesk_report_views.xml',
         'views/frontdesk_drink_views.xml',
         'views/frontdesk_visitor_views.xml',
@@ -41,6 +40,8 @@
         'views/hr_department.xml',
         'views/templates.xml',
         'views/visit_report_wizard_views.xml',
+        'views/frontdesk_notification_views.xml',
+        'views/frontdesk_integration_job_views.xml',
     ],
     'demo': [
         'demo/frontdesk_demo.xml',
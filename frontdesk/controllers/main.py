@@ -2,7 +2,7 @@
 # Part of Odoo. See LICENSE file for full copyright and licensing details.
 
 from odoo import http, fields
-from odoo.http import request, content_disposition
+from odoo.http import request
 from odoo.tools import consteq
 from datetime import datetime, timedelta, time
 import requests
@@ -12,20 +12,26 @@ import base64
 
 _logger = logging.getLogger(__name__)
 
+# The QR image of a visit only changes when its token does, which also
+# changes the ETag, so clients may keep it for a day.
+QR_CODE_MAX_AGE = 24 * 60 * 60
+
 
 class QRCodeController(http.Controller):
 
     @http.route('/public/qr/<int:visitor_id>', type='http', auth='public', cors='*', website=True)
     def public_qr(self, visitor_id, **kwargs):
-        visitor = request.env['frontdesk.visitor'].sudo().browse(visitor_id)
-        if visitor.qr_code:
-            qr_code_data = base64.b64decode(visitor.qr_code)
-            headers = [
-                ('Content-Type', 'image/png'),
-                ('Content-Disposition', content_disposition(f'qr_code_{visitor_id}.png'))
-            ]
-            return request.make_response(qr_code_data, headers)
-        return request.not_found()
+        visitor = request.env['frontdesk.visitor'].sudo().browse(visitor_id).exists()
+        if visitor and not visitor.qr_code_download_link:
+            # not rendered yet by the QR code cron
+            visitor._render_missing_qr_codes()
+        if not visitor or not visitor.qr_code:
+            return request.not_found()
+        # Served straight from the stored attachment; the stream carries the
+        # attachment checksum as ETag so repeated hits answer 304.
+        stream = request.env['ir.binary']._get_stream_from(visitor, 'qr_code', default_mimetype='image/png')
+        stream.download_name = f'qr_code_{visitor_id}.png'
+        return stream.get_response(as_attachment=True, max_age=QR_CODE_MAX_AGE)
     
 class Frontdesk(http.Controller):
     def _get_additional_info(self, frontdesk, lang, is_mobile=False):
@@ -35,68 +41,6 @@ class Frontdesk(http.Controller):
             'current_lang': lang,
         })
         
-    def _get_azure_ad_token(self):
-        config = request.env['ir.config_parameter'].sudo()
-        tenant_id = config.get_param('azure_ad.tenant_id')
-        client_id = config.get_param('azure_ad.client_id')
-        client_secret = config.get_param('azure_ad.client_secret')
-
-        if not all([tenant_id, client_id, client_secret]):
-            return None
-
-        url = f"https://login.microsoftonline.com/{tenant_id}/oauth2/v2.0/token"
-        data = {
-            'client_id': client_id,
-            'client_secret': client_secret,
-            'grant_type': 'client_credentials',
-            'scope': 'https://graph.microsoft.com/.default',
-        }
-
-        try:
-            response = requests.post(url, data=data)
-            _logger.info(response.text)
-            response.raise_for_status()
-            return response.json().get("access_token")
-        except requests.exceptions.RequestException:
-            return None
-        
-    def _get_azure_ad_users(self, access_token):
-        """
-        Fetch all users from Azure AD using the Graph API.
-        """
-        # graph_url = "https://graph.microsoft.com/v1.0/users"
-        graph_url = "https://graph.microsoft.com/v1.0/users?$select=mail,displayName,businessPhones,jobTitle,mobilePhone,officeLocation,department"
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Content-Type": "application/json",
-        }
-
-        all_users = []
-        while graph_url:
-            try:
-                response = requests.get(graph_url, headers=headers)
-                response.raise_for_status()
-                data = response.json()
-                all_users.extend(data.get("value", []))  # Add the current batch of users
-
-                # Check if there is a next page
-                graph_url = data.get("@odata.nextLink")  # URL for the next page
-            except requests.exceptions.RequestException as e:
-                _logger.error("Error fetching Azure AD users: %s", e, exc_info=True)
-                break
-
-        return all_users
-        
-    def _get_ad_user_by_email(self, token, email):
-        users = self._get_azure_ad_users(token)
-        for user in users:
-            try:
-                if user.get("mail", "").lower() == email.lower():
-                    return user
-            except Exception as e:
-                _logger.error(f"Error processing user {user.get('displayName', 'Unknown')}: {str(e)}")
-        return False
-
     @http.route('/frontdesk/get_employee_info', type='json', auth='public', csrf=False)
     def get_employee_info(self, emp_id):
         employee = request.env['hr.employee'].sudo().search([('barcode', '=', emp_id)], limit=1)
@@ -143,12 +87,13 @@ class Frontdesk(http.Controller):
                 ('created_by_azure', '=', True),
             ], limit=1)
             if not user:
-                token = self._get_azure_ad_token()
-                if not token:
-                    return {'error': 'AD auth failed'}
-            
-                ad_user = self._get_ad_user_by_email(token, email)
-                _logger.info(ad_user)
+                AzureUser = request.env['frontdesk.azure.user'].sudo()
+                ad_user = AzureUser._find_by_email(email)
+                if not ad_user:
+                    token = AzureUser._get_access_token()
+                    if not token:
+                        return {'error': 'AD auth failed'}
+                    ad_user = AzureUser._fetch_by_email(email, token)
                 if not ad_user:
                     return {'error': 'Not found in AD'}
 
@@ -230,6 +175,9 @@ class Frontdesk(http.Controller):
         # return True for now
         return True
 
+    def _get_visitor_by_qr(self, qr_code):
+        return request.env['frontdesk.visitor'].sudo()._resolve_qr_code(qr_code)
+
     @http.route('/kiosk/<int:frontdesk_id>/<string:token>', type='http', auth='public', website=True, csrf=False)
     def launch_frontdesk(self, frontdesk_id, token, lang='en_US'):
         frontdesk = request.env['frontdesk.frontdesk'].sudo().browse(frontdesk_id)
@@ -269,6 +217,24 @@ class Frontdesk(http.Controller):
             frontdesk = frontdesk.with_context(lang=lang)
         return frontdesk._get_frontdesk_data()
 
+    @http.route('/frontdesk/<int:frontdesk_id>/<string:token>/<string:lang>/bootstrap', type='http', auth='public',
+                methods=['GET'], csrf=False, save_session=False)
+    def get_bootstrap(self, frontdesk_id, token, lang=None):
+        """ Frontdesk data, purposes with their wilayat, other reasons and
+        holidays in a single versioned payload, revalidated by ETag. """
+        frontdesk = request.env['frontdesk.frontdesk'].sudo().browse(frontdesk_id)
+        if not frontdesk.exists() or not self._verify_token(frontdesk, token):
+            return request.not_found()
+        installed_langs = [code for code, _name in request.env['res.lang'].get_installed()]
+        if not lang or lang not in installed_langs:
+            lang = request.env.lang or 'en_US'
+        version = frontdesk._get_bootstrap_version()
+        etag = f'{version}-{lang}'
+        headers = [('ETag', f'"{etag}"'), ('Cache-Control', 'private, no-cache')]
+        if request.httprequest.if_none_match.contains(etag):
+            return request.make_response('', headers=headers, status=304)
+        return request.make_json_response(frontdesk._get_bootstrap_payload(lang, version), headers=headers)
+
     @http.route('/frontdesk/<int:frontdesk_id>/<string:token>/get_planned_visitors', type='json', auth='public')
     def get_planned_visitors(self, frontdesk_id, token):
         frontdesk = request.env['frontdesk.frontdesk'].sudo().browse(frontdesk_id)
@@ -276,24 +242,32 @@ class Frontdesk(http.Controller):
             return request.not_found()
         return frontdesk._get_planned_visitors()
 
+    def _get_image_response(self, record, field_name, unique=None):
+        # Versioned URLs (``unique`` is the bootstrap version) never change
+        # content and can be cached for good, others are revalidated by ETag.
+        stream = request.env['ir.binary']._get_image_stream_from(record, field_name)
+        if unique:
+            return stream.get_response(max_age=http.STATIC_CACHE_LONG, immutable=True)
+        return stream.get_response()
+
     @http.route('/frontdesk/<int:frontdesk_id>/background', type='http', auth='public')
-    def frontdesk_background_image(self, frontdesk_id):
+    def frontdesk_background_image(self, frontdesk_id, unique=None):
         frontdesk = request.env['frontdesk.frontdesk'].sudo().browse(frontdesk_id)
         if not frontdesk.image:
             return ""
-        return request.env['ir.binary']._get_image_stream_from(frontdesk, 'image').get_response()
+        return self._get_image_response(frontdesk, 'image', unique)
     
     @http.route('/frontdesk/<int:frontdesk_id>/register_background', type='http', auth='public')
-    def frontdesk_background_register_image(self, frontdesk_id):
+    def frontdesk_background_register_image(self, frontdesk_id, unique=None):
         frontdesk = request.env['frontdesk.frontdesk'].sudo().browse(frontdesk_id)
         if not frontdesk.register_image:
             return ""
-        return request.env['ir.binary']._get_image_stream_from(frontdesk, 'register_image').get_response()
+        return self._get_image_response(frontdesk, 'register_image', unique)
 
     @http.route('/frontdesk/<int:drink_id>/get_frontdesk_drinks', type='http', auth='public')
-    def get_frontdesk_drinks(self, drink_id):
+    def get_frontdesk_drinks(self, drink_id, unique=None):
         drink = request.env['frontdesk.drink'].sudo().browse(drink_id)
-        return request.env['ir.binary']._get_image_stream_from(drink, 'drink_image').get_response()
+        return self._get_image_response(drink, 'drink_image', unique)
 
     @http.route('/frontdesk/<int:frontdesk_id>/<string:token>/<string:lang>/get_hosts', type='json', auth='public', csrf=False)
     def get_hosts(self, frontdesk_id, token, name, purpose_id=None, lang=None):
@@ -617,7 +591,7 @@ class Frontdesk(http.Controller):
     def frontdesk_check_in(self, frontdesk_id, token, **kwargs):
         try:
             qr_code = kwargs.get('qrCode')
-            visitor = request.env['frontdesk.visitor'].sudo().search([('qr_string', '=', qr_code)], limit=1)
+            visitor = self._get_visitor_by_qr(qr_code)
             if not visitor:
                 _logger.info('frontdesk_check_in: visitor not found')
                 return {'message': 'Invalid QR Code!'}
@@ -681,7 +655,7 @@ class Frontdesk(http.Controller):
     def frontdesk_cancel_visit(self, frontdesk_id, token, **kwargs):
         qr_code = kwargs.get('qrCode')
         reason = kwargs.get('reason')
-        visitor = request.env['frontdesk.visitor'].sudo().search([('qr_string', '=', qr_code)], limit=1)
+        visitor = self._get_visitor_by_qr(qr_code)
         if visitor:
             visitor.action_canceled()
             visitor.write({'cancel_reason': reason})
@@ -693,7 +667,7 @@ class Frontdesk(http.Controller):
                 methods=['POST'])
     def frontdesk_extend_visit(self, frontdesk_id, token, **kwargs):
         qr_code = kwargs.get('qrCode')
-        visitor = request.env['frontdesk.visitor'].sudo().search([('qr_string', '=', qr_code)], limit=1)
+        visitor = self._get_visitor_by_qr(qr_code)
         if visitor:
             visitor.action_request_extend_visit()
             return {
@@ -729,7 +703,7 @@ class Frontdesk(http.Controller):
     def frontdesk_check_out(self, frontdesk_id, token, **kwargs):
         try:
             qr_code = kwargs.get('qrCode')
-            visitor = request.env['frontdesk.visitor'].sudo().search([('qr_string', '=', qr_code)], limit=1)
+            visitor = self._get_visitor_by_qr(qr_code)
             kiosk = request.env['frontdesk.frontdesk'].sudo().browse(frontdesk_id)
             if not kiosk:
                 _logger.info('frontdesk_check_out: kiosk not found')
@@ -770,7 +744,7 @@ class Frontdesk(http.Controller):
         qr_code = kwargs.get('qrCode')
         evaluation = kwargs.get('evaluation')
         comment = kwargs.get('comment')
-        visitor = request.env['frontdesk.visitor'].sudo().search([('qr_string', '=', qr_code)], limit=1)
+        visitor = self._get_visitor_by_qr(qr_code)
         if visitor:
             visitor.evaluation = evaluation
             visitor.evaluation_comment = comment
@@ -861,106 +835,53 @@ class Frontdesk(http.Controller):
             
             if not all([company_name, hosting_employee_id, visit_date, visit_time, visitors, station_id]):
                 return {'success': False, 'error': 'Missing required fields'}
+            if not all(visitor.get(key) for visitor in visitors for key in ('name', 'email', 'phone', 'id_number')):
+                return {'success': False, 'error': 'Missing required fields'}
                 
             # Get the hosting employee
             hosting_employee = request.env['hr.employee'].sudo().browse(hosting_employee_id)
             if not hosting_employee.exists():
                 return {'success': False, 'error': 'Invalid hosting employee'}
+            station = request.env['frontdesk.frontdesk'].sudo().browse(station_id)
+            if not station.exists():
+                return {'success': False, 'error': 'Invalid station'}
             
             # Parse visit datetime
             visit_datetime = datetime.strptime(f"{visit_date} {visit_time}", '%Y-%m-%d %H:%M')
             
             # Convert time to float (hours)
             planned_time = visit_datetime.hour + visit_datetime.minute / 60.0
-            
-            # Find or create company
-            company = request.env['res.partner'].sudo().search([
-                ('name', '=', company_name),
-                ('is_company', '=', True),
-                ('is_visitor', '=', True)
-            ], limit=1)
-            
-            if not company:
-                company = request.env['res.partner'].sudo().create({
-                    'name': company_name,
-                    'is_company': True,
-                    'is_visitor': True
-                })
-            
-            # hosting_employee is already loaded above as the record
-            
-            # Generate a unique group reference for linking requests
-            from datetime import datetime as dt
-            group_reference = f"GRP-{visit_date.replace('-', '')}-{dt.now().strftime('%H%M%S')}-{len(visitors)}"
-            
-            created_requests = []
-            station = False
-            try:
-                station = request.env['frontdesk.frontdesk'].sudo().browse(station_id)
-            except Exception as e:
-                _logger.error(f"Error getting station: {str(e)}")
-            
-            # Process each visitor
-            for visitor_data in visitors:
-                # Find or create visitor partner
-                visitor_partner = request.env['res.partner'].sudo().search([
-                    ('national_id', '=', visitor_data['id_number'])
-                ], limit=1)
-                
-                if not visitor_partner:
-                    visitor_partner = request.env['res.partner'].sudo().create({
-                        'name': visitor_data['name'],
-                        'email': visitor_data['email'],
-                        'phone': visitor_data['phone'],
-                        'national_id': visitor_data['id_number'],
-                        'is_visitor': True,
-                        'parent_id': company.id
-                    })
-                else:
-                    # Update existing partner
-                    visitor_partner.write({
-                        'name': visitor_data['name'],
-                        'email': visitor_data['email'],
-                        'phone': visitor_data['phone'],
-                        'parent_id': company.id
-                    })
-                
-                # Create visit request record (not visitor directly)
-                request_vals = {
-                    'name': visitor_data['name'],
-                    'email': visitor_data['email'],
-                    'phone': visitor_data['phone'],
-                    'visitor_id': visitor_partner.id,
-                    'station_id': station_id,
-                    'date': visit_date,
-                    'planned_time': planned_time,
-                    'planned_duration': 60,  # Default 1 hour
-                    'visit_purpose': f'Group visit for {company_name} [{group_reference}]',
-                    'source': 'online',
-                    'state': 'draft',
-                    'company_id': company.id,
-                    'is_online': station.is_online if station else False,
-                    'visit_type': 'employee',
-                }
-                
-                # Add host employee if found
-                if hosting_employee:
-                    request_vals['employee_id'] = hosting_employee.id
-                
-                visit_request = request.env['frontdesk.request'].sudo().create(request_vals)
-                created_requests.append(visit_request)
+
+            # Small groups are imported right away, large ones in the background:
+            # the client can follow them with the returned job id.
+            reservation = request.env['frontdesk.group.reservation'].sudo()._create_reservation(
+                station, hosting_employee, company_name, visit_datetime.date(), planned_time, visitors)
             
             # Requests are grouped by the group_reference in their visit_purpose
             # The host employee can approve/reject them as a group or individually
             
+            if reservation.state == 'done':
+                message = f'Group reservation requests created successfully for {len(visitors)} visitors. Awaiting host approval.'
+            else:
+                message = f'Group reservation for {len(visitors)} visitors is being processed.'
             return {
                 'success': True, 
-                'message': f'Group reservation requests created successfully for {len(visitors)} visitors. Awaiting host approval.',
-                'request_count': len(created_requests),
-                'request_ids': [req.id for req in created_requests]
+                'message': message,
+                'job_id': reservation.id,
+                'access_token': reservation.access_token,
+                'state': reservation.state,
+                'request_count': len(reservation.request_ids),
+                'request_ids': reservation.request_ids.ids,
             }
             
         except Exception as e:
             _logger.error(f'Error submitting group reservation: {str(e)}')
             return {'success': False, 'error': 'Failed to submit group reservation'}
 
+    @http.route('/frontdesk/group_reservation_status/<int:job_id>/<string:access_token>', type='json', auth='public', csrf=False, save_session=False)
+    def group_reservation_status(self, job_id, access_token):
+        reservation = request.env['frontdesk.group.reservation'].sudo().browse(job_id)
+        if not reservation.exists() or not consteq(reservation.access_token, access_token):
+            return {'success': False, 'error': 'Group reservation not found'}
+        return dict(reservation._get_status(), success=True)
+
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+def migrate(cr, version):
+    """ Give every visit a unique QR token before the unique index on
+    ``frontdesk_visitor.qr_string`` is created.
+
+    Visits without a token (or with the former ``'/'`` placeholder) get a fresh
+    random one. When several visits share a token, the oldest visit keeps it
+    and the others are reassigned.
+    """
+    if not version:
+        return
+    cr.execute("""
+        UPDATE frontdesk_visitor
+           SET qr_string = md5(random()::text || id::text || clock_timestamp()::text)
+         WHERE qr_string IS NULL OR qr_string IN ('', '/')
+    """)
+    _logger.info("frontdesk: backfilled %s missing visitor QR codes", cr.rowcount)
+    cr.execute("""
+        UPDATE frontdesk_visitor v
+           SET qr_string = md5(random()::text || v.id::text || clock_timestamp()::text)
+          FROM (
+              SELECT id, row_number() OVER (PARTITION BY qr_string ORDER BY id) AS rank
+                FROM frontdesk_visitor
+          ) dup
+         WHERE dup.id = v.id AND dup.rank > 1
+    """)
+    _logger.info("frontdesk: reassigned %s duplicated visitor QR codes", cr.rowcount)
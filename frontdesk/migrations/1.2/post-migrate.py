@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+import logging
+
+from odoo import api, SUPERUSER_ID
+
+_logger = logging.getLogger(__name__)
+
+LEGACY_CRONS = [
+    'frontdesk.ir_cron_frontdesk_reminder',
+    'frontdesk.ir_cron_frontdesk_postpone',
+    'frontdesk.ir_cron_check_absent_visitors',
+    'frontdesk.ir_cron_auto_delete_requests',
+]
+
+
+def migrate(cr, version):
+    """ The per-task crons are replaced by the single visit scheduler. """
+    if not version:
+        return
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    for xmlid in LEGACY_CRONS:
+        cron = env.ref(xmlid, raise_if_not_found=False)
+        if cron:
+            cron.active = False
+    # The legacy crons already handled today's visits, don't notify them twice.
+    cr.execute("""
+        UPDATE frontdesk_visitor
+           SET reminder_sent = TRUE, postpone_sent = TRUE
+         WHERE date <= CURRENT_DATE
+    """)
+    _logger.info("frontdesk: marked %s existing visits as already notified", cr.rowcount)
+    # render the QR codes of the open visits, see pre-migrate
+    env.ref('frontdesk.ir_cron_frontdesk_generate_qr_codes')._trigger()
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+def migrate(cr, version):
+    """ Create the column of the stored QR download link beforehand, so that
+    the upgrade does not render a QR code PNG for every historical visit.
+
+    The QR codes of the open visits are rendered in batches by the
+    ``ir_cron_frontdesk_generate_qr_codes`` cron, the ones of closed visits
+    are left empty.
+    """
+    if not version:
+        return
+    cr.execute("ALTER TABLE frontdesk_visitor ADD COLUMN IF NOT EXISTS qr_code_download_link varchar")
+    _logger.info("frontdesk: created the visitor QR download link column, QR codes are rendered by cron")
@@ -6,6 +6,7 @@ from . import frontdesk_visitor
 from . import frontdesk_drink
 from . import res_partner
 from . import frontdesk_request
+from . import frontdesk_request_router
 from . import visit_purpose
 from . import employee_availability
 from . import visit_reassignment_request
@@ -16,5 +17,7 @@ from . import sms_config
 from . import sms_sms
 from . import hr_department
 from . import recaptcha_config
-
-
+from . import frontdesk_notification
+from . import frontdesk_group_reservation
+from . import azure_directory
+from . import frontdesk_integration_job
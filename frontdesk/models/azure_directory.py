@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+import logging
+import threading
+import time
+
+import requests
+
+from odoo import api, fields, models
+
+_logger = logging.getLogger(__name__)
+
+GRAPH_TIMEOUT = 30
+GRAPH_USER_FIELDS = 'id,mail,displayName,businessPhones,jobTitle,mobilePhone,officeLocation,department'
+DEFAULT_LOGIN_URL = 'https://login.microsoftonline.com'
+DEFAULT_GRAPH_URL = 'https://graph.microsoft.com/v1.0'
+DELTA_LINK_PARAM = 'frontdesk.azure_ad_delta_link'
+# tokens are refreshed that many seconds before they actually expire
+TOKEN_EXPIRY_MARGIN = 60
+
+# client-credentials tokens shared by all requests of the worker, keyed by
+# (login url, tenant, client id): {key: (access_token, expires_at)}
+_token_cache = {}
+_token_lock = threading.Lock()
+
+
+class AzureDirectoryUser(models.Model):
+    """ Local mirror of the Azure AD users, refreshed incrementally with a
+    Graph delta query so kiosk lookups are a single indexed search. """
+    _name = 'frontdesk.azure.user'
+    _description = 'Azure AD User'
+    _order = 'email_normalized'
+    _rec_name = 'display_name'
+
+    azure_id = fields.Char('Azure Object ID', required=True, readonly=True)
+    mail = fields.Char('Email', readonly=True)
+    email_normalized = fields.Char('Normalized Email', index=True, readonly=True)
+    display_name = fields.Char('Name', readonly=True)
+    job_title = fields.Char('Job Title', readonly=True)
+    department = fields.Char('Department', readonly=True)
+    office_location = fields.Char('Office Location', readonly=True)
+    business_phone = fields.Char('Business Phone', readonly=True)
+    mobile_phone = fields.Char('Mobile Phone', readonly=True)
+
+    _sql_constraints = [
+        ('azure_id_unique', 'unique(azure_id)', 'An Azure AD user can only be mirrored once.'),
+    ]
+
+    # ------------------------------------------------------------
+    # Graph API
+    # ------------------------------------------------------------
+
+    @api.model
+    def _get_graph_url(self):
+        return self.env['ir.config_parameter'].sudo().get_param('azure_ad.graph_url', DEFAULT_GRAPH_URL).rstrip('/')
+
+    @api.model
+    def _get_access_token(self):
+        """ Client-credentials token, reused until it is about to expire. """
+        config = self.env['ir.config_parameter'].sudo()
+        tenant_id = config.get_param('azure_ad.tenant_id')
+        client_id = config.get_param('azure_ad.client_id')
+        client_secret = config.get_param('azure_ad.client_secret')
+        if not all([tenant_id, client_id, client_secret]):
+            return None
+        login_url = config.get_param('azure_ad.login_url', DEFAULT_LOGIN_URL).rstrip('/')
+
+        key = (login_url, tenant_id, client_id)
+        with _token_lock:
+            token, expires_at = _token_cache.get(key, (None, 0))
+            if token and expires_at > time.time():
+                return token
+            try:
+                response = requests.post(f"{login_url}/{tenant_id}/oauth2/v2.0/token", data={
+                    'client_id': client_id,
+                    'client_secret': client_secret,
+                    'grant_type': 'client_credentials',
+                    'scope': 'https://graph.microsoft.com/.default',
+                }, timeout=GRAPH_TIMEOUT)
+                response.raise_for_status()
+                payload = response.json()
+            except (requests.exceptions.RequestException, ValueError) as e:
+                _logger.error("Error retrieving Azure AD token: %s", e)
+                return None
+            token = payload.get('access_token')
+            if token:
+                expires_in = int(payload.get('expires_in', 3600))
+                _token_cache[key] = (token, time.time() + expires_in - TOKEN_EXPIRY_MARGIN)
+            return token
+
+    @api.model
+    def _clear_token_cache(self):
+        with _token_lock:
+            _token_cache.clear()
+
+    @api.model
+    def _graph_get(self, session, url, token, params=None):
+        response = session.get(url, params=params, headers={
+            'Authorization': f'Bearer {token}',
+            'Content-Type': 'application/json',
+        }, timeout=GRAPH_TIMEOUT)
+        response.raise_for_status()
+        return response.json()
+
+    # ------------------------------------------------------------
+    # Mirror
+    # ------------------------------------------------------------
+
+    @api.model
+    def _prepare_user_values(self, user_data):
+        phones = user_data.get('businessPhones') or []
+        mail = user_data.get('mail') or False
+        return {
+            'azure_id': user_data['id'],
+            'mail': mail,
+            'email_normalized': mail.strip().lower() if mail else False,
+            'display_name': user_data.get('displayName') or False,
+            'job_title': user_data.get('jobTitle') or False,
+            'department': user_data.get('department') or False,
+            'office_location': user_data.get('officeLocation') or False,
+            'business_phone': phones[0] if phones else False,
+            'mobile_phone': user_data.get('mobilePhone') or False,
+        }
+
+    @api.model
+    def _apply_changes(self, users_data):
+        """ Upsert/remove one page of Graph users with a single search. """
+        removed_ids = {user['id'] for user in users_data if '@removed' in user}
+        updates = {user['id']: user for user in users_data if '@removed' not in user}
+        existing = self.sudo().search([('azure_id', 'in', list(removed_ids | set(updates)))])
+        existing.filtered(lambda user: user.azure_id in removed_ids).unlink()
+        to_create = []
+        existing_by_azure_id = {user.azure_id: user for user in existing if user.azure_id not in removed_ids}
+        for azure_id, user_data in updates.items():
+            values = self._prepare_user_values(user_data)
+            user = existing_by_azure_id.get(azure_id)
+            if not user:
+                to_create.append(values)
+            elif any(user[fname] != value for fname, value in values.items()):
+                user.write(values)
+        created = self.sudo().create(to_create)
+        return len(updates), len(removed_ids), len(created)
+
+    @api.model
+    def _cron_sync_delta(self):
+        """ Pull the users changed since the last run with a Graph delta query.
+        The first run (or an expired delta token) performs a full sync. """
+        token = self._get_access_token()
+        if not token:
+            _logger.warning("Azure AD mirror: configuration missing, skipping sync.")
+            return
+        config = self.env['ir.config_parameter'].sudo()
+        delta_link = config.get_param(DELTA_LINK_PARAM)
+        url = delta_link or f"{self._get_graph_url()}/users/delta"
+        params = None if delta_link else {'$select': GRAPH_USER_FIELDS}
+        counts = [0, 0, 0]
+        with requests.Session() as session:
+            while url:
+                try:
+                    data = self._graph_get(session, url, token, params)
+                except requests.exceptions.HTTPError as e:
+                    if delta_link and e.response is not None and e.response.status_code == 410:
+                        _logger.info("Azure AD mirror: delta token expired, restarting full sync.")
+                        config.set_param(DELTA_LINK_PARAM, False)
+                        return self._cron_sync_delta()
+                    _logger.error("Azure AD mirror: error fetching users: %s", e)
+                    return
+                except requests.exceptions.RequestException as e:
+                    _logger.error("Azure AD mirror: error fetching users: %s", e)
+                    return
+                params = None
+                for index, count in enumerate(self._apply_changes(data.get('value', []))):
+                    counts[index] += count
+                url = data.get('@odata.nextLink')
+                if not url:
+                    config.set_param(DELTA_LINK_PARAM, data.get('@odata.deltaLink') or False)
+        _logger.info("Azure AD mirror: %s users received, %s removed, %s created.", *counts)
+
+    # ------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------
+
+    @api.model
+    def _find_by_email(self, email):
+        """ Indexed lookup in the local mirror. """
+        if not email:
+            return self.browse()
+        return self.sudo().search([('email_normalized', '=', email.strip().lower())], limit=1)
+
+    @api.model
+    def _fetch_by_email(self, email, token):
+        """ Fallback for users not mirrored yet: a single filtered Graph call,
+        whose result is stored in the mirror. """
+        escaped = email.strip().replace("'", "''")
+        try:
+            with requests.Session() as session:
+                data = self._graph_get(session, f"{self._get_graph_url()}/users", token, {
+                    '$filter': f"mail eq '{escaped}'",
+                    '$select': GRAPH_USER_FIELDS,
+                })
+        except requests.exceptions.RequestException as e:
+            _logger.error("Azure AD lookup of %s failed: %s", email, e)
+            return self.browse()
+        users_data = data.get('value', [])[:1]
+        if not users_data:
+            return self.browse()
+        self._apply_changes(users_data)
+        return self._find_by_email(email)
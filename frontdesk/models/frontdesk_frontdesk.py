@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 # Part of Odoo. See LICENSE file for full copyright and licensing details.
 
+import hashlib
 import uuid
 import ast
 
@@ -18,6 +19,13 @@ ASK_FIELDS_SELECTION = [
 
 PLANNED_VISITOR_TIME = 45
 
+# Reference data shipped in the kiosk bootstrap payload; a write on any of
+# these tables yields a new payload version.
+BOOTSTRAP_TABLES = [
+    'frontdesk_visit_purpose', 'frontdesk_other_reason', 'frontdesk_holiday',
+    'owwsc_wilayat', 'res_lang',
+]
+
 class Frontdesk(models.Model):
     _name = 'frontdesk.frontdesk'
     _description = 'Frontdesk'
@@ -372,6 +380,47 @@ class Frontdesk(models.Model):
             'station': self.search_read([('id', '=', self.id)], self._get_frontdesk_field()),
         }
 
+    def _get_bootstrap_version(self):
+        """ Return a short digest identifying the current bootstrap payload of
+        the frontdesk. It changes on any write to the frontdesk, its company
+        or the reference data tables. """
+        self.ensure_one()
+        self.env.cr.execute(" UNION ALL ".join(
+            [f"(SELECT MAX(write_date), COUNT(*) FROM {table})" for table in BOOTSTRAP_TABLES] + [
+                """(SELECT GREATEST(f.write_date, p.write_date), f.id
+                      FROM frontdesk_frontdesk f
+                      JOIN res_company c ON c.id = f.company_id
+                      JOIN res_partner p ON p.id = c.partner_id
+                     WHERE f.id = %s)"""
+            ]
+        ), [self.id])
+        return hashlib.sha1(repr(self.env.cr.fetchall()).encode()).hexdigest()[:16]
+
+    @tools.ormcache('self.id', 'lang', 'version')
+    def _get_bootstrap_payload(self, lang, version):
+        """ Everything the kiosk needs on startup, in one payload. Cached per
+        frontdesk, language and version: callers must not modify the result. """
+        self.ensure_one()
+        frontdesk = self.sudo().with_context(lang=lang)
+        data = frontdesk._get_frontdesk_data()
+        station = data['station'][0]
+        station['background_url'] = f'/frontdesk/{self.id}/background?unique={version}'
+        station['register_background_url'] = f'/frontdesk/{self.id}/register_background?unique={version}'
+        purposes = frontdesk.env['frontdesk.visit.purpose'].search([])
+        return {
+            **data,
+            'version': version,
+            'purposes': [{
+                'id': purpose.id,
+                'name': purpose.name,
+                'is_other': purpose.is_other,
+                'wilayat': [{'id': state.id, 'name': state.name} for state in purpose.state_ids],
+                'other_reason_ids': purpose.other_reason_ids.ids,
+            } for purpose in purposes],
+            'other_reasons': frontdesk.env['frontdesk.other.reason'].search_read([], ['name']),
+            'holidays': frontdesk.env['frontdesk.holiday'].search_read([], ['date_from', 'date_to']),
+        }
+
     def _get_planned_visitors(self):
         return []
         """ Returns the planned visitors for quick sign in to the frontend. """
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+import logging
+import uuid
+
+from odoo import api, fields, models
+
+_logger = logging.getLogger(__name__)
+
+# Groups up to this size are imported inline, larger ones by the cron worker.
+GROUP_RESERVATION_INLINE_LIMIT = 50
+GROUP_RESERVATION_CHUNK_SIZE = 100
+
+
+class FrontdeskGroupReservation(models.Model):
+    """ Bulk import of a group reservation (one visit request per visitor).
+
+    Visitor partners are resolved by national ID in one query, missing ones
+    are created with a single multi-create, and the host/desk/operating unit
+    routing shared by the whole group is computed once before all requests
+    are created in one multi-create per chunk.
+    """
+    _name = 'frontdesk.group.reservation'
+    _description = 'Frontdesk Group Reservation'
+    _order = 'id desc'
+
+    name = fields.Char('Reference', required=True, readonly=True)
+    station_id = fields.Many2one('frontdesk.frontdesk', string="Desk", required=True)
+    employee_id = fields.Many2one('hr.employee', string="Hosting Employee", required=True)
+    company_id = fields.Many2one('res.partner', string="Visitor Company", required=True)
+    visit_date = fields.Date(string="Planned Date", required=True)
+    planned_time = fields.Float(string="Planned Time")
+    visitor_data = fields.Json('Visitors')
+    state = fields.Selection([
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ], default='queued', required=True, index=True)
+    total_count = fields.Integer('Visitors')
+    processed_count = fields.Integer('Processed')
+    request_ids = fields.Many2many('frontdesk.request', string="Visit Requests")
+    error = fields.Text('Error')
+    access_token = fields.Char(default=lambda self: str(uuid.uuid4()), required=True, copy=False, readonly=True)
+
+    @api.model
+    def _create_reservation(self, station, employee, company_name, visit_date, planned_time, visitors):
+        """ Register a group reservation and import it right away when small,
+        otherwise hand it to the background worker. """
+        company = self.env['res.partner'].sudo().search([
+            ('name', '=', company_name),
+            ('is_company', '=', True),
+            ('is_visitor', '=', True)
+        ], limit=1)
+        if not company:
+            company = self.env['res.partner'].sudo().create({
+                'name': company_name,
+                'is_company': True,
+                'is_visitor': True
+            })
+        reservation = self.sudo().create({
+            'name': f"GRP-{fields.Date.to_string(visit_date).replace('-', '')}-{fields.Datetime.now().strftime('%H%M%S')}-{len(visitors)}",
+            'station_id': station.id,
+            'employee_id': employee.id,
+            'company_id': company.id,
+            'visit_date': visit_date,
+            'planned_time': planned_time,
+            'visitor_data': visitors,
+            'total_count': len(visitors),
+        })
+        if len(visitors) <= GROUP_RESERVATION_INLINE_LIMIT:
+            reservation._process()
+        else:
+            self.env.ref('frontdesk.ir_cron_frontdesk_group_reservation').sudo()._trigger()
+        return reservation
+
+    @api.model
+    def _cron_process_reservations(self):
+        for reservation in self.search([('state', 'in', ('queued', 'running'))], order='id'):
+            reservation._process(commit=True)
+
+    def _process(self, commit=False):
+        self.ensure_one()
+        self.state = 'running'
+        try:
+            routing = self._prepare_request_routing()
+            visitors = self.visitor_data or []
+            while self.processed_count < len(visitors):
+                chunk = visitors[self.processed_count:self.processed_count + GROUP_RESERVATION_CHUNK_SIZE]
+                requests = self._import_chunk(chunk, routing)
+                self.write({
+                    'request_ids': [fields.Command.link(request_id) for request_id in requests.ids],
+                    'processed_count': self.processed_count + len(chunk),
+                })
+                if commit:
+                    self.env.cr.commit()
+            self.state = 'done'
+        except Exception as e:
+            _logger.error('Error importing group reservation %s: %s', self.name, e)
+            if commit:
+                self.env.cr.rollback()
+            self.write({'state': 'failed', 'error': str(e)})
+            if not commit:
+                raise
+
+    def _prepare_request_routing(self):
+        """ Resolve once the routing shared by every request of the group. """
+        self.ensure_one()
+        values = self.env['frontdesk.request'].sudo()._prepare_routing_values({
+            'station_id': self.station_id.id,
+            'employee_id': self.employee_id.id,
+            'company_id': self.company_id.id,
+            'is_online': self.station_id.is_online,
+            'visit_type': 'employee',
+        })
+        return {key: values[key] for key in (
+            'station_id', 'employee_id', 'department_id', 'building_id', 'level_id', 'section_id',
+            'location_description', 'operating_unit_id', 'operating_unit_change_reason',
+        ) if key in values}
+
+    def _resolve_partners(self, visitors):
+        """ Return ``{national_id: partner}`` for all visitors of a chunk, using a
+        single search for the existing ones and a single create for the rest. """
+        Partner = self.env['res.partner'].sudo()
+        national_ids = list({visitor['id_number'] for visitor in visitors})
+        partners = {partner.national_id: partner for partner in Partner.search([('national_id', 'in', national_ids)])}
+        to_create = {}
+        for visitor in visitors:
+            vals = {
+                'name': visitor['name'],
+                'email': visitor['email'],
+                'phone': visitor['phone'],
+                'parent_id': self.company_id.id,
+            }
+            partner = partners.get(visitor['id_number'])
+            if partner:
+                if any(partner[field] != value for field, value in vals.items() if field != 'parent_id') \
+                        or partner.parent_id != self.company_id:
+                    partner.write(vals)
+            else:
+                to_create[visitor['id_number']] = dict(vals, national_id=visitor['id_number'], is_visitor=True)
+        if to_create:
+            for partner in Partner.create(list(to_create.values())):
+                partners[partner.national_id] = partner
+        return partners
+
+    def _import_chunk(self, visitors, routing):
+        partners = self._resolve_partners(visitors)
+        vals_list = [dict(
+            routing,
+            name=visitor['name'],
+            email=visitor['email'],
+            phone=visitor['phone'],
+            visitor_id=partners[visitor['id_number']].id,
+            date=self.visit_date,
+            planned_time=self.planned_time,
+            planned_duration=60,  # Default 1 hour
+            visit_purpose=f'Group visit for {self.company_id.name} [{self.name}]',
+            source='online',
+            state='draft',
+            company_id=self.company_id.id,
+            is_online=self.station_id.is_online,
+            visit_type='employee',
+        ) for visitor in visitors]
+        return self.env['frontdesk.request'].sudo().with_context(frontdesk_request_routed=True).create(vals_list)
+
+    def _get_status(self):
+        self.ensure_one()
+        return {
+            'job_id': self.id,
+            'reference': self.name,
+            'state': self.state,
+            'total': self.total_count,
+            'processed': self.processed_count,
+            'request_ids': self.request_ids.ids,
+            'error': self.error or False,
+        }
@@ -0,0 +1,351 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+import logging
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from odoo import SUPERUSER_ID, api, fields, models
+
+_logger = logging.getLogger(__name__)
+
+DISPATCH_BATCH_SIZE = 100
+DEFAULT_WORKERS = 4  # concurrent calls per integration
+MAX_ATTEMPTS = 5
+RETRY_BASE_DELAY = 30  # seconds, doubled on every failed attempt
+DONE_RETENTION_DAYS = 30
+# an endpoint failing CIRCUIT_THRESHOLD times in a row is left alone for CIRCUIT_COOLDOWN seconds
+CIRCUIT_THRESHOLD = 5
+CIRCUIT_COOLDOWN = 120
+HANDLER_PREFIX = '_integration_'
+BATCH_SUFFIX = '_batch'
+
+_circuits_lock = threading.Lock()
+_circuits = {}
+
+
+class IntegrationCircuit:
+    """ Circuit breaker of an endpoint, shared by the threads of a worker. """
+
+    def __init__(self):
+        self.failures = 0
+        self.open_until = 0.0
+
+    def remaining(self):
+        """ Seconds before the endpoint may be called again, 0 when closed. """
+        return max(0.0, self.open_until - time.monotonic())
+
+    def record(self, success):
+        with _circuits_lock:
+            if success:
+                self.failures = 0
+                self.open_until = 0.0
+            else:
+                self.failures += 1
+                if self.failures >= CIRCUIT_THRESHOLD:
+                    self.open_until = time.monotonic() + CIRCUIT_COOLDOWN
+
+
+def get_circuit(endpoint):
+    with _circuits_lock:
+        if endpoint not in _circuits:
+            _circuits[endpoint] = IntegrationCircuit()
+        return _circuits[endpoint]
+
+
+def _run_isolated(registry, jobs, batched):
+    """ Run jobs in their own transactions: the calls of a chain in order, one
+    transaction each, or a batched call in a single one. """
+    threading.current_thread().dbname = registry.db_name
+    if batched:
+        try:
+            with registry.cursor() as cr:
+                env = api.Environment(cr, SUPERUSER_ID, {})
+                return env['frontdesk.integration.job']._run_batch_call(jobs)
+        except Exception as e:  # noqa: BLE001 e.g. the commit of the call failed
+            return {job[0]: (False, str(e), 0.0) for job in jobs}
+    outcomes = {}
+    for job_id, res_model, res_id, method, endpoint in jobs:
+        try:
+            with registry.cursor() as cr:
+                env = api.Environment(cr, SUPERUSER_ID, {})
+                outcomes[job_id] = env['frontdesk.integration.job']._run_call(res_model, res_id, method, endpoint)
+        except Exception as e:  # noqa: BLE001 e.g. the commit of the call failed
+            outcomes[job_id] = (False, str(e), 0.0)
+    return outcomes
+
+
+class FrontdeskIntegrationJob(models.Model):
+    """ Outbox of the calls to partner systems (COSEC, Outlook, push...).
+
+    Integration addons enqueue a call in the caller's transaction with
+    ``_enqueue``; once committed, ``_cron_dispatch`` runs it on a bounded
+    pool of threads per integration, so that a kiosk never waits on a slow
+    partner system. A call is ``records.<method>()`` where ``method`` starts
+    with ``_integration_``; it returns False or raises when it failed and
+    must be retried. Calls of a same record run in order.
+
+    When the model also defines ``<method>_batch``, the single pending calls
+    of ``method`` to a same endpoint are grouped into one call of
+    ``records.<method>_batch()``, which returns ``{record id: (success,
+    error)}``; the duration of that call is reported on each of its jobs.
+    """
+    _name = 'frontdesk.integration.job'
+    _description = 'Frontdesk Integration Outbox'
+    _order = 'id'
+
+    integration = fields.Selection([], required=True, index=True)
+    endpoint = fields.Char('Endpoint', required=True, help='Calls to a same endpoint share a circuit breaker.')
+    res_model = fields.Char('Related Model', required=True)
+    res_id = fields.Integer('Related Record ID', required=True)
+    method = fields.Char('Method', required=True)
+    state = fields.Selection([
+        ('pending', 'Pending'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ], default='pending', required=True, index=True)
+    attempt_count = fields.Integer('Failed Attempts', default=0)
+    next_attempt_at = fields.Datetime('Next Attempt', default=fields.Datetime.now, index=True)
+    done_at = fields.Datetime('Done At')
+    duration = fields.Float('Duration (ms)', help='Duration of the last call.')
+    last_error = fields.Text('Last Error')
+
+    # ------------------------------------------------------------
+    # Enqueue
+    # ------------------------------------------------------------
+
+    @api.model
+    def _enqueue(self, records, integration, method, endpoint=None):
+        """ Queue ``record.<method>()`` for each of ``records``, unless the same
+        call is already pending for it. A pending call claimed by a running
+        dispatch (row locked) may have read the record before this change:
+        the call is queued again. """
+        if not records:
+            return self.browse()
+        self.flush_model(['state', 'res_model', 'res_id', 'method'])
+        self.env.cr.execute("""
+            SELECT res_id FROM frontdesk_integration_job
+             WHERE state = 'pending' AND res_model = %s AND res_id IN %s AND method = %s
+               FOR SHARE SKIP LOCKED
+        """, [records._name, tuple(records.ids), method])
+        pending_ids = {row[0] for row in self.env.cr.fetchall()}
+        jobs = self.sudo().create([{
+            'integration': integration,
+            'endpoint': endpoint or integration,
+            'res_model': records._name,
+            'res_id': record.id,
+            'method': method,
+        } for record in records if record.id not in pending_ids])
+        if jobs:
+            self._trigger_dispatch()
+        return jobs
+
+    @api.model
+    def _trigger_dispatch(self):
+        # cron triggers are only notified once the transaction is committed
+        cron = self.env.ref('frontdesk.ir_cron_frontdesk_integration_dispatch', raise_if_not_found=False)
+        if cron:
+            cron.sudo()._trigger()
+
+    # ------------------------------------------------------------
+    # Worker
+    # ------------------------------------------------------------
+
+    @api.model
+    def _cron_dispatch(self, batch_size=DISPATCH_BATCH_SIZE):
+        """ Run due calls by batches. The integrations of a batch are called
+        concurrently, each one on at most ``frontdesk.integration_workers``
+        threads; calls to an endpoint whose circuit is open are postponed. """
+        while True:
+            self.env.cr.execute("""
+                SELECT id FROM frontdesk_integration_job
+                 WHERE state = 'pending' AND next_attempt_at <= %s
+              ORDER BY next_attempt_at, id
+                 LIMIT %s
+                   FOR UPDATE SKIP LOCKED
+            """, [fields.Datetime.now(), batch_size])
+            jobs = self.sudo().browse([row[0] for row in self.env.cr.fetchall()])
+            if not jobs:
+                break
+            for job, outcome in jobs._dispatch().items():
+                job._apply_outcome(*outcome)
+            self.env.cr.commit()
+            if len(jobs) < batch_size:
+                break
+        stats = self._get_dispatch_stats()
+        for integration, integration_stats in stats.items():
+            _logger.info('Frontdesk %s integration: %s pending, %s failed, avg latency %sms, error rate %s%%',
+                         integration, integration_stats['pending'], integration_stats['failed'],
+                         integration_stats['avg_latency'], integration_stats['error_rate'])
+        return stats
+
+    def _dispatch(self):
+        """ Run the calls of ``self`` and return their outcome by job. """
+        chains = defaultdict(lambda: defaultdict(list))
+        for job in self.sorted('id'):
+            chains[job.integration][(job.res_model, job.res_id)].append(
+                (job.id, job.res_model, job.res_id, job.method, job.endpoint))
+
+        # units of work by integration: (jobs, batched)
+        units = defaultdict(list)
+        for integration, integration_chains in chains.items():
+            batches = defaultdict(list)
+            for chain in integration_chains.values():
+                _job_id, res_model, _res_id, method, endpoint = chain[0]
+                if len(chain) == 1 and res_model in self.env and hasattr(self.env[res_model], method + BATCH_SUFFIX):
+                    batches[(res_model, method, endpoint)].append(chain[0])
+                else:
+                    units[integration].append((chain, False))
+            units[integration] += [(jobs, True) for jobs in batches.values()]
+
+        outcomes = {}
+        if getattr(threading.current_thread(), 'testing', False):
+            # test cursors cannot be shared with other threads
+            for integration_units in units.values():
+                for jobs, batched in integration_units:
+                    if batched:
+                        outcomes.update(self._run_batch_call(jobs))
+                    else:
+                        for job_id, res_model, res_id, method, endpoint in jobs:
+                            outcomes[job_id] = self._run_call(res_model, res_id, method, endpoint)
+        else:
+            ICP = self.env['ir.config_parameter'].sudo()
+            default_workers = int(ICP.get_param('frontdesk.integration_workers', DEFAULT_WORKERS))
+            executors, futures = [], []
+            try:
+                for integration, integration_units in units.items():
+                    workers = int(ICP.get_param(f'frontdesk.integration_workers.{integration}', default_workers))
+                    executor = ThreadPoolExecutor(max_workers=max(1, min(workers, len(integration_units))),
+                                                  thread_name_prefix=f'frontdesk_{integration}')
+                    executors.append(executor)
+                    futures += [executor.submit(_run_isolated, self.pool, jobs, batched)
+                                for jobs, batched in integration_units]
+                for future in futures:
+                    outcomes.update(future.result())
+            finally:
+                for executor in executors:
+                    executor.shutdown(wait=True)
+        return {self.browse(job_id): outcome for job_id, outcome in outcomes.items()}
+
+    @api.model
+    def _run_call(self, res_model, res_id, method, endpoint):
+        """ Call ``method`` on the record, in the current transaction.
+
+        :return: tuple (success, error, duration of the call in ms); success
+          is None when the call is postponed, the duration being then the
+          delay before the endpoint may be called again
+        """
+        circuit = get_circuit(endpoint)
+        if circuit.remaining():
+            return None, 'Circuit open for %s' % endpoint, circuit.remaining() * 1000
+        if not method.startswith(HANDLER_PREFIX):
+            return False, 'Invalid integration method %s' % method, 0.0
+        record = self.env[res_model].browse(res_id).exists()
+        start = time.perf_counter()
+        error = None
+        try:
+            if record:
+                with self.env.cr.savepoint():
+                    success = getattr(record, method)() is not False
+            else:
+                success = True
+            if not success:
+                error = 'Call reported a failure'
+        except Exception as e:  # noqa: BLE001 retried with backoff
+            success = False
+            error = str(e) or e.__class__.__name__
+        duration = (time.perf_counter() - start) * 1000
+        circuit.record(success)
+        return success, error, duration
+
+    @api.model
+    def _run_batch_call(self, jobs):
+        """ Call ``<method>_batch`` once on the records of ``jobs``, which share
+        their model, method and endpoint, in the current transaction.
+
+        :param list jobs: tuples (job id, model, record id, method, endpoint)
+        :return: {job id: (success, error, duration)}, see ``_run_call``
+        """
+        _job_id, res_model, _res_id, method, endpoint = jobs[0]
+        circuit = get_circuit(endpoint)
+        if circuit.remaining():
+            return {job[0]: (None, 'Circuit open for %s' % endpoint, circuit.remaining() * 1000) for job in jobs}
+        if not method.startswith(HANDLER_PREFIX):
+            return {job[0]: (False, 'Invalid integration method %s' % method, 0.0) for job in jobs}
+        records = self.env[res_model].browse([job[2] for job in jobs]).exists()
+        start = time.perf_counter()
+        try:
+            with self.env.cr.savepoint():
+                results = getattr(records, method + BATCH_SUFFIX)() if records else {}
+        except Exception as e:  # noqa: BLE001 retried with backoff
+            error = str(e) or e.__class__.__name__
+            results = {res_id: (False, error) for res_id in records.ids}
+        duration = (time.perf_counter() - start) * 1000
+        # records removed meanwhile have nothing left to sync
+        outcomes = {job[0]: (*results.get(job[2], (True, None)), duration) for job in jobs}
+        circuit.record(any(success for success, _error, _duration in outcomes.values()))
+        return outcomes
+
+    def _apply_outcome(self, success, error, duration):
+        if success is None:
+            # circuit open: postpone without counting an attempt
+            self.write({'next_attempt_at': fields.Datetime.now() + timedelta(milliseconds=duration),
+                        'last_error': error})
+        elif success:
+            self.write({'state': 'done', 'done_at': fields.Datetime.now(), 'duration': duration, 'last_error': False})
+        else:
+            self._mark_failed_attempt(error, duration)
+
+    def _mark_failed_attempt(self, error, duration=0.0):
+        for job in self:
+            attempts = job.attempt_count + 1
+            _logger.warning('Frontdesk %s call %s on %s(%s) failed (attempt %s): %s',
+                            job.integration, job.method, job.res_model, job.res_id, attempts, error)
+            vals = {'attempt_count': attempts, 'last_error': str(error), 'duration': duration}
+            if attempts >= MAX_ATTEMPTS:
+                vals['state'] = 'failed'
+            else:
+                delay = RETRY_BASE_DELAY * 2 ** (attempts - 1)
+                vals['next_attempt_at'] = fields.Datetime.now() + timedelta(seconds=delay)
+            job.write(vals)
+
+    # ------------------------------------------------------------
+    # Monitoring
+    # ------------------------------------------------------------
+
+    @api.model
+    def _get_dispatch_stats(self):
+        """ Queue depth, latency (ms) and error rate (%) of the last hour, by integration. """
+        now = fields.Datetime.now()
+        self.env.cr.execute("""
+            SELECT integration,
+                   COUNT(*) FILTER (WHERE state = 'pending'),
+                   COUNT(*) FILTER (WHERE state = 'failed'),
+                   AVG(duration) FILTER (WHERE state = 'done' AND done_at >= %(since)s),
+                   COUNT(*) FILTER (WHERE state = 'done' AND done_at >= %(since)s),
+                   SUM(attempt_count) FILTER (WHERE write_date >= %(since)s)
+              FROM frontdesk_integration_job
+          GROUP BY integration
+        """, {'since': now - timedelta(hours=1)})
+        stats = {}
+        for integration, pending, failed, avg_latency, done, failures in self.env.cr.fetchall():
+            calls = done + (failures or 0)
+            stats[integration] = {
+                'pending': pending,
+                'failed': failed,
+                'avg_latency': round(avg_latency or 0.0, 1),
+                'error_rate': round(100.0 * (failures or 0) / calls, 1) if calls else 0.0,
+            }
+        return stats
+
+    @api.autovacuum
+    def _gc_done_jobs(self):
+        limit_date = fields.Datetime.now() - timedelta(days=DONE_RETENTION_DAYS)
+        self.sudo().search([('state', '=', 'done'), ('done_at', '<', limit_date)]).unlink()
+
+    def action_retry(self):
+        self.write({'state': 'pending', 'attempt_count': 0, 'next_attempt_at': fields.Datetime.now()})
+        self._trigger_dispatch()
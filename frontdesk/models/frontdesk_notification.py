@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+import logging
+from datetime import timedelta
+
+from odoo import api, fields, models
+
+_logger = logging.getLogger(__name__)
+
+QUEUE_BATCH_SIZE = 200
+MAX_ATTEMPTS = 5
+RETRY_BASE_DELAY = 60  # seconds, doubled on every failed attempt
+SENT_RETENTION_DAYS = 30
+
+
+class FrontdeskNotification(models.Model):
+    """ Outbound email/SMS job.
+
+    Notifications are enqueued in the caller's transaction and rendered and
+    sent later by ``_cron_process_queue``, so kiosk requests and crons never
+    wait on the SMTP server or the SMS gateway.
+    """
+    _name = 'frontdesk.notification'
+    _description = 'Frontdesk Notification Queue'
+    _order = 'id'
+
+    channel = fields.Selection([
+        ('email', 'Email'),
+        ('sms', 'SMS'),
+    ], required=True)
+    state = fields.Selection([
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ], default='pending', required=True, index=True)
+    res_id = fields.Integer('Related Record ID', required=True)
+    mail_template_id = fields.Many2one('mail.template', ondelete='cascade')
+    sms_template_id = fields.Many2one('sms.template', ondelete='cascade')
+    email_values = fields.Json('Email Values')
+    number = fields.Char('Phone Number')
+    attempt_count = fields.Integer('Attempts', default=0)
+    next_attempt_at = fields.Datetime('Next Attempt', default=fields.Datetime.now, index=True)
+    sent_at = fields.Datetime('Sent At')
+    last_error = fields.Text('Last Error')
+
+    # ------------------------------------------------------------
+    # Enqueue
+    # ------------------------------------------------------------
+
+    @api.model
+    def _enqueue_mail(self, template, res_id, email_values=None):
+        if not template or not res_id:
+            return self.browse()
+        job = self.sudo().create({
+            'channel': 'email',
+            'mail_template_id': template.id,
+            'res_id': res_id,
+            'email_values': email_values or False,
+        })
+        self._trigger_queue()
+        return job
+
+    @api.model
+    def _enqueue_sms(self, template, res_id, number):
+        if not template or not res_id or not number:
+            return self.browse()
+        job = self.sudo().create({
+            'channel': 'sms',
+            'sms_template_id': template.id,
+            'res_id': res_id,
+            'number': number,
+        })
+        self._trigger_queue()
+        return job
+
+    @api.model
+    def _trigger_queue(self):
+        cron = self.env.ref('frontdesk.ir_cron_frontdesk_notification_queue', raise_if_not_found=False)
+        if cron:
+            cron.sudo()._trigger()
+
+    # ------------------------------------------------------------
+    # Worker
+    # ------------------------------------------------------------
+
+    @api.model
+    def _cron_process_queue(self, batch_size=QUEUE_BATCH_SIZE):
+        """ Drain due jobs in batches: all emails of a batch go through one
+        ``mail.mail.send()`` call (one SMTP connection per mail server) and
+        all SMS through one ``sms.sms._send()`` call. """
+        while True:
+            self.env.cr.execute("""
+                SELECT id FROM frontdesk_notification
+                 WHERE state = 'pending' AND next_attempt_at <= %s
+              ORDER BY next_attempt_at, id
+                 LIMIT %s
+                   FOR UPDATE SKIP LOCKED
+            """, [fields.Datetime.now(), batch_size])
+            jobs = self.sudo().browse([row[0] for row in self.env.cr.fetchall()])
+            if not jobs:
+                break
+            jobs.filtered(lambda j: j.channel == 'email')._process_mail_jobs()
+            jobs.filtered(lambda j: j.channel == 'sms')._process_sms_jobs()
+            self.env.cr.commit()
+            if len(jobs) < batch_size:
+                break
+        stats = self._get_queue_stats()
+        _logger.info('Frontdesk notification queue: %(pending)s pending, oldest %(oldest_age)ss, '
+                     'avg latency %(avg_latency)ss, %(failed)s failed', stats)
+        return stats
+
+    def _process_mail_jobs(self):
+        mails = self.env['mail.mail'].sudo()
+        mail_jobs = {}
+        for job in self:
+            try:
+                mail_id = job.mail_template_id.sudo().send_mail(
+                    job.res_id, force_send=False, email_values=job.email_values or None)
+                mails |= mails.browse(mail_id)
+                mail_jobs[mail_id] = job
+            except Exception as e:
+                job._mark_failed_attempt(e)
+        if not mails:
+            return
+        mails.send(raise_exception=False)
+        for mail_id, job in mail_jobs.items():
+            # sent mails are auto-deleted, failed ones stay in exception
+            mail = mails.browse(mail_id).exists()
+            if mail and mail.state == 'exception':
+                job._mark_failed_attempt(mail.failure_reason)
+                mail.unlink()
+            else:
+                job._mark_sent()
+
+    def _process_sms_jobs(self):
+        sms_vals = []
+        sms_jobs = self.browse()
+        for job in self:
+            try:
+                template = job.sms_template_id.sudo()
+                body = template._render_field('body', [job.res_id], compute_lang=True)[job.res_id]
+            except Exception as e:
+                job._mark_failed_attempt(e)
+                continue
+            sms_vals.append({'body': body, 'number': job.number})
+            sms_jobs |= job
+        if not sms_vals:
+            return
+        sms_records = self.env['sms.sms'].sudo().create(sms_vals)
+        sms_records._send(unlink_sent=False, using_template=True)
+        for job, sms in zip(sms_jobs, sms_records):
+            if sms.state == 'error':
+                job._mark_failed_attempt(sms.failure_type)
+            else:
+                job._mark_sent()
+
+    def _mark_sent(self):
+        self.write({'state': 'sent', 'sent_at': fields.Datetime.now(), 'last_error': False})
+
+    def _mark_failed_attempt(self, error):
+        for job in self:
+            attempts = job.attempt_count + 1
+            _logger.warning('Frontdesk %s notification %s failed (attempt %s): %s', job.channel, job.id, attempts, error)
+            vals = {'attempt_count': attempts, 'last_error': str(error)}
+            if attempts >= MAX_ATTEMPTS:
+                vals['state'] = 'failed'
+            else:
+                delay = RETRY_BASE_DELAY * 2 ** (attempts - 1)
+                vals['next_attempt_at'] = fields.Datetime.now() + timedelta(seconds=delay)
+            job.write(vals)
+
+    # ------------------------------------------------------------
+    # Monitoring
+    # ------------------------------------------------------------
+
+    @api.model
+    def _get_queue_stats(self):
+        """ Queue depth and latency, in seconds. """
+        now = fields.Datetime.now()
+        self.env.cr.execute("""
+            SELECT COUNT(*) FILTER (WHERE state = 'pending'),
+                   COUNT(*) FILTER (WHERE state = 'failed'),
+                   EXTRACT(EPOCH FROM %(now)s - MIN(create_date) FILTER (WHERE state = 'pending')),
+                   EXTRACT(EPOCH FROM AVG(sent_at - create_date) FILTER (WHERE state = 'sent' AND sent_at >= %(since)s))
+              FROM frontdesk_notification
+        """, {'now': now, 'since': now - timedelta(hours=1)})
+        pending, failed, oldest_age, avg_latency = self.env.cr.fetchone()
+        return {
+            'pending': pending,
+            'failed': failed,
+            'oldest_age': round(oldest_age or 0.0, 1),
+            'avg_latency': round(avg_latency or 0.0, 1),
+        }
+
+    @api.autovacuum
+    def _gc_sent_notifications(self):
+        limit_date = fields.Datetime.now() - timedelta(days=SENT_RETENTION_DAYS)
+        self.sudo().search([('state', '=', 'sent'), ('sent_at', '<', limit_date)]).unlink()
+
+    def action_retry(self):
+        self.write({'state': 'pending', 'attempt_count': 0, 'next_attempt_at': fields.Datetime.now()})
+        self._trigger_queue()
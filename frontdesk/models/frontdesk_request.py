@@ -197,7 +197,7 @@ class VisitRequest(models.Model):
                     _logger.info('Sending email notification to id %s', self.id)
                     _logger.info('Sending email notification with template %s', mail_template)
                     if mail_template.model:
-                        mail_template.sudo().send_mail(self.id, force_send=True)
+                        self.env['frontdesk.notification']._enqueue_mail(mail_template, self.id)
                     else:
                         _logger.error('Mail template model is False. Cannot send email.')
                         raise UserError(_("Mail template model is not set. Cannot send email."))
@@ -499,251 +499,24 @@ class VisitRequest(models.Model):
                 requests.append(data)
             return self.sudo().create(requests)
 
-    @api.model
-    def create(self, values):
-        # find existing visitor
-        existing_visitor = False
-        if values and values.get('name'):
-            if values.get('passport') and values.get('visitor_id_number') and values.get('email'):
-                existing_visitor = self.env['res.partner'].sudo().search([
-                    '|', '|',
-                    ('passport_id', '=', values.get('passport').strip()),
-                    ('national_id', '=', str(values.get('visitor_id_number')).strip()),
-                    ('email', '=', values.get('email').strip()),
-                ], limit=1)
-            if not existing_visitor and values.get('passport') and values.get('email'):
-                existing_visitor = self.env['res.partner'].sudo().search([
-                    '|',
-                    ('passport_id', '=', values.get('passport').strip()),
-                    ('email', '=', values.get('email').strip()),
-                ], limit=1)
-            if not existing_visitor and values.get('visitor_id_number') and values.get('email'):
-                existing_visitor = self.env['res.partner'].sudo().search([
-                    '|',
-                    ('national_id', '=', str(values.get('visitor_id_number')).strip()),
-                    ('email', '=', values.get('email').strip()),
-                ], limit=1)
-            if not existing_visitor and values.get('visitor_id_number'):
-                existing_visitor = self.env['res.partner'].sudo().search([
-                    ('national_id', '=', str(values.get('visitor_id_number')).strip()),
-                ], limit=1)
-            if not existing_visitor and values.get('passport'):
-                existing_visitor = self.env['res.partner'].sudo().search([
-                    ('passport_id', '=', values.get('passport').strip()),
-                ], limit=1)
-            if not existing_visitor and values.get('email'):
-                existing_visitor = self.env['res.partner'].sudo().search([
-                    ('email', '=', values.get('email').strip()),
-                ], limit=1)
-
-        if existing_visitor:
-            values['visitor_id'] = existing_visitor.id
-            if existing_visitor and existing_visitor.email and values.get('email') and values.get('email') != existing_visitor.email:
-                # if the email is different, update the email
-                existing_visitor.write({'email': values.get('email')})
-            if existing_visitor and values.get('phone') and values.get('phone') != existing_visitor.phone:
-                # if the email is different, update the email
-                existing_visitor.write({'phone': values.get('phone')})
-
-        # Update existing company if found
-        if values.get('company'):
-            existing_company = self.env['res.partner'].sudo().search(
-                [('name', 'ilike', values.get('company').strip())], limit=1)
-            if existing_company:
-                values['company_id'] = existing_company.id
-
-        # Update existing department if found
-        existing_department = False
-        if values.get('department'):
-            existing_department = self.env['hr.department'].sudo().search(
-                [('name', 'ilike', values.get('department').strip())], limit=1)
-            if existing_department:
-                values['department_id'] = existing_department.id
-
-        # Update existing employee if found
-        
-        existing_employee = False
-        if values.get('employee_email'):
-            existing_employee = self.env['hr.employee'].sudo().search(['|',
-                ('work_email', 'ilike', str(values.get('employee_email')).strip()),
-                ('private_email', 'ilike', str(values.get('employee_email')).strip()),
-            ], limit=1)
-            if existing_employee:
-                values['employee_id'] = existing_employee.id
-
-        if values.get('employee_phone') and not existing_employee:
-            existing_employee = self.env['hr.employee'].sudo().search(['|',
-                ('work_phone', 'ilike', str(values.get('employee_phone')).strip()),
-                ('mobile_phone', 'ilike', str(values.get('employee_phone')).strip()),
-            ], limit=1)
-            if existing_employee:
-                values['employee_id'] = existing_employee.id
-
-        # if employee_id is set, set the building, level, section and location description
-        if values.get('employee_id'):
-            employee = self.env['hr.employee'].sudo().browse(values.get('employee_id'))
-            if employee:
-                values['building_id'] = employee.building_id.id
-                values['level_id'] = employee.level_id.id
-                values['section_id'] = employee.section_id.id
-                values['location_description'] = employee.location_description
-
-        if values.get('is_online') and values.get('is_online') == True:
-            # TODO: check Handling online requests automatic assignment
-            _logger.info('Handling online requests automatic assignment')
-            if values.get('visit_type') and values.get('visit_type') == 'employee':
-                _logger.info('Creating online visit request for employee')
-                # get the employee
-                try:
-                    employee = False
-                    # reset the department_id to False
-                    values['department_id'] = False
-
-                    if not employee and values.get('employee_id'):
-                        employee = self.env['hr.employee'].sudo().browse(values.get('employee_id'))
-
-                    if not employee and values.get('employee_email'):
-                        employee = self.env['hr.employee'].sudo().search(['|',
-                            ('work_email', 'ilike', str(values.get('employee_email')).strip()),
-                            ('private_email', 'ilike', str(values.get('employee_email')).strip()),
-                        ], limit=1)
-
-                    if not employee and values.get('employee_phone'):
-                        employee = self.env['hr.employee'].sudo().search(['|',
-                                ('work_phone', 'ilike', str(values.get('employee_phone')).strip()),
-                                ('mobile_phone', 'ilike', str(values.get('employee_phone')).strip()),
-                            ], limit=1)
-                        
-                    if employee:
-                        # get the employee operating unit
-                        employee_building_id = employee.building_id
-                        employee_operating_unit = employee_building_id.operating_unit_id if employee_building_id else False
-                        if employee_operating_unit:
-                            # get desk for the operating unit with is_reception_desk == True
-                            employee_desk = self.env['frontdesk.frontdesk'].search([
-                                ('operating_unit_id', '=', employee_operating_unit.id),
-                                ('is_reception_desk', '=', True),
-                            ], limit=1)
-                            if not employee_desk:
-                                employee_desk = self.env['frontdesk.frontdesk'].search([
-                                    ('operating_unit_id', '=', employee_operating_unit.id),
-                                ], limit=1)
-                            if employee_desk:
-                                values['station_id'] = employee_desk.id
-                                operating_unit_change_reason = self.env['frontdesk.operating.unit.change.reason'].search([
-                                    ('name', '=', 'Automatic'),
-                                ], limit=1)
-                                if not operating_unit_change_reason:
-                                    operating_unit_change_reason = self.env['frontdesk.operating.unit.change.reason'].create({
-                                        'name': 'Automatic',
-                                    })
-                                values['operating_unit_change_reason'] = operating_unit_change_reason.id if operating_unit_change_reason else False
-                                values['operating_unit_id'] = employee_desk.operating_unit_id.id if employee_desk.operating_unit_id else False
-                except Exception as e:
-                    _logger.error('Error creating online visit request for employee: %s', e)
-                    
-            elif values.get('visit_type') and values.get('visit_type') == 'department':
-                _logger.info('Creating online visit request for department')
-                try:
-                    if values.get('department_id'):
-                        department = self.env['hr.department'].sudo().browse(values.get('department_id'))
-                    elif existing_department:
-                        department = existing_department
-
-                    _logger.info(values.get('department_id'))
-
-                    if department:
-                        _logger.info(department)
-                        department_operating_unit = department.operating_unit_ids
-                        _logger.info(department_operating_unit)
-
-                        if department_operating_unit and len(department_operating_unit.ids) == 1:
-                            _logger.info('Single operating unit found for department')
-                            # get desk for the operating unit with is_reception_desk == True
-                            department_desk = self.env['frontdesk.frontdesk'].search([
-                                ('operating_unit_id', 'in', department_operating_unit.ids),
-                                ('is_reception_desk', '=', True),
-                            ], limit=1)
-                            if not department_desk:
-                                department_desk = self.env['frontdesk.frontdesk'].search([
-                                    ('operating_unit_id', 'in', department_operating_unit.ids),
-                                ], limit=1)
-                            if department_desk:
-                                values['station_id'] = department_desk.id
-                                values['operating_unit_id'] = department_desk.operating_unit_id.id if department_desk.operating_unit_id else False
-                        elif department_operating_unit and len(department_operating_unit.ids) > 1:
-                            _logger.info('Multiple operating units found for department')
-                            # get the selected wilayat_id
-                            if 'wilayat_id' in values and values.get('wilayat_id'):
-                                _logger.info('Getting selected wilayat_id')
-                                try:
-                                    selected_wilayat_id = self.env['owwsc.wilayat'].sudo().browse(int(values.get('wilayat_id')))
-                                    if selected_wilayat_id:
-                                        _logger.info("selected_wilayat_id")
-                                        _logger.info(selected_wilayat_id)
-                                        _logger.info(selected_wilayat_id.id)
-                                        # get all the buildings in the wilayat
-                                        buildings = self.env['owwsc.building'].search([
-                                            ('wilayat_id', '=', selected_wilayat_id.id),
-                                        ])
-                                        _logger.info("buildings")
-                                        _logger.info(buildings)
-                                        if buildings and len(buildings.ids) == 1:
-                                            # get the operating unit for the building
-                                            building = buildings[0]
-                                            if building:
-                                                building_operating_unit = building.operating_unit_id
-                                                if building_operating_unit:
-                                                    _logger.info("building_operating_unit")
-                                                    _logger.info(building_operating_unit)
-                                                    values['operating_unit_id'] = building_operating_unit.id
-                                                    department_desk = self.env['frontdesk.frontdesk'].search([
-                                                        ('operating_unit_id', '=', building_operating_unit.id),
-                                                        ('is_reception_desk', '=', True),
-                                                    ], limit=1)
-                                                    if not department_desk:
-                                                        department_desk = self.env['frontdesk.frontdesk'].search([
-                                                            ('operating_unit_id', '=', building_operating_unit.id),
-                                                        ], limit=1)
-                                                    if department_desk:
-                                                        values['station_id'] = department_desk.id
-
-                                except Exception as e:
-                                    _logger.error('Error getting selected wilayat_id: %s', e)
-
+    @api.model_create_multi
+    def create(self, vals_list):
+        # Callers that already resolved visitor, host and desk routing for the
+        # whole batch (e.g. group reservations) skip the lookups.
+        if not self.env.context.get('frontdesk_request_routed'):
+            self.env['frontdesk.request.router']._route_requests(vals_list)
+        visit_requests = super(VisitRequest, self).create(vals_list)
+        for visit_request in visit_requests:
+            visit_request._notify_host_by_email()
+        return visit_requests
 
-                except Exception as e:
-                    _logger.error('Error creating online visit request for department: %s', e)
+    @api.model
+    def _prepare_routing_values(self, values):
+        """ Resolve the existing visitor, company, department, hosting employee
+        and desk/operating unit of a request from its raw values (in place). """
+        self.env['frontdesk.request.router']._route_requests([values])
+        return values
 
-        if not values.get('is_online') or not values.get('is_online') == True:
-            try:
-                if values.get('employee_id') and values.get('visit_type') == 'employee':
-                    values['department_id'] = False
-                    try:
-                        employee = self.env['hr.employee'].sudo().browse(values.get('employee_id'))
-                        if employee and employee.department_id:
-                            values['department_id'] = employee.department_id.id
-                    except Exception as e:
-                        _logger.error('Error setting department_id for employee: %s', e)
-            except Exception as e:
-                _logger.error('Error creating normal visit request for employee: %s', e)
-
-        _logger.info(f"before department_id: {values.get('department_id') if values.get('department_id') else None}")
-        if 'department_id' in values:
-            department = self.env['hr.department'].sudo().browse(values.get('department_id'))
-            if not department.exists():
-                values['department_id'] = False
-        else:
-            values['department_id'] = False
-        _logger.info(f"Resolved department_id: {values.get('department_id') if values.get('department_id') else None}")
-
-
-        _logger.info('Creating visit request with values model')
-        _logger.info(values)
-        visit_request = super(VisitRequest, self).create(values)
-        visit_request._notify_host_by_email()
-        return visit_request
-    
 
 class FrontdeskRequestOperatingUnitChangeReason(models.Model):
     _name = 'frontdesk.operating.unit.change.reason'
@@ -0,0 +1,311 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+import logging
+
+from odoo import api, models, tools
+
+_logger = logging.getLogger(__name__)
+
+ROUTING_MODELS = ['hr_employee', 'hr_department', 'frontdesk_frontdesk', 'owwsc_building']
+
+
+class FrontdeskRequestRouter(models.AbstractModel):
+    """ Resolve visitor, host and desk/operating unit routing of visit requests.
+
+    The employee -> building -> operating unit -> desk topology is loaded once
+    into an in-memory map, cached per worker and invalidated as soon as the
+    write date or row count of one of the underlying tables changes. Visitor
+    partners of a whole batch are fetched with a single query, so routing N
+    requests costs a constant number of queries.
+    """
+    _name = 'frontdesk.request.router'
+    _description = 'Visit Request Routing'
+
+    @api.model
+    def _get_routing_version(self):
+        self.env.cr.execute(" UNION ALL ".join(
+            f"(SELECT MAX(write_date), COUNT(*) FROM {table})" for table in ROUTING_MODELS
+        ))
+        return tuple(self.env.cr.fetchall())
+
+    @api.model
+    def _get_routing_map(self):
+        return self._load_routing_map(self._get_routing_version())
+
+    @api.model
+    @tools.ormcache('version')
+    def _load_routing_map(self, version):
+        def m2o(value):
+            return value[0] if value else False
+
+        employees = [{
+            'id': employee['id'],
+            'work_email': (employee['work_email'] or '').lower(),
+            'private_email': (employee['private_email'] or '').lower(),
+            'work_phone': (employee['work_phone'] or '').lower(),
+            'mobile_phone': (employee['mobile_phone'] or '').lower(),
+            'building_id': m2o(employee['building_id']),
+            'level_id': m2o(employee['level_id']),
+            'section_id': m2o(employee['section_id']),
+            'location_description': employee['location_description'],
+            'department_id': m2o(employee['department_id']),
+        } for employee in self.env['hr.employee'].sudo().search_read([], [
+            'work_email', 'private_email', 'work_phone', 'mobile_phone', 'building_id',
+            'level_id', 'section_id', 'location_description', 'department_id',
+        ])]
+
+        buildings = self.env['owwsc.building'].sudo().search_read([], ['wilayat_id', 'operating_unit_id'])
+        building_operating_unit = {building['id']: m2o(building['operating_unit_id']) for building in buildings}
+        buildings_by_wilayat = {}
+        for building in buildings:
+            if building['wilayat_id']:
+                buildings_by_wilayat.setdefault(building['wilayat_id'][0], []).append(building['id'])
+
+        # reception desk of each operating unit first, any other desk otherwise
+        desk_by_operating_unit = {}
+        desks = self.env['frontdesk.frontdesk'].sudo().search_read(
+            [('operating_unit_id', '!=', False)], ['operating_unit_id', 'is_reception_desk'])
+        for desk in sorted(desks, key=lambda d: not d['is_reception_desk']):
+            desk_by_operating_unit.setdefault(desk['operating_unit_id'][0], desk['id'])
+
+        department_operating_units = {
+            department['id']: department['operating_unit_ids']
+            for department in self.env['hr.department'].sudo().search_read([], ['operating_unit_ids'])
+        }
+        return {
+            'employees': employees,
+            'employee_by_id': {employee['id']: employee for employee in employees},
+            'building_operating_unit': building_operating_unit,
+            'buildings_by_wilayat': buildings_by_wilayat,
+            'desk_by_operating_unit': desk_by_operating_unit,
+            'department_operating_units': department_operating_units,
+        }
+
+    @api.model
+    def _route_requests(self, vals_list):
+        """ Resolve the routing of ``vals_list`` in place. """
+        routing = RequestRouting(self.env, self._get_routing_map())
+        routing.prefetch_partners(vals_list)
+        for values in vals_list:
+            routing.route(values)
+        return vals_list
+
+
+class RequestRouting:
+    """ Routing of one batch of visit requests, memoizing lookups that
+    cannot be answered from the routing map. """
+
+    PARTNER_KEYS = [('passport', 'passport_id'), ('visitor_id_number', 'national_id'), ('email', 'email')]
+
+    def __init__(self, env, routing_map):
+        self.env = env
+        self.map = routing_map
+        self.partners = env['res.partner'].sudo()
+        self._companies = {}
+        self._departments = {}
+        self._automatic_reason = None
+
+    # ------------------------------------------------------------
+    # Batched / memoized lookups
+    # ------------------------------------------------------------
+
+    @staticmethod
+    def _partner_criteria(values):
+        criteria = {}
+        for key, fname in RequestRouting.PARTNER_KEYS:
+            if values.get(key):
+                criteria[fname] = str(values[key]).strip()
+        return criteria
+
+    def prefetch_partners(self, vals_list):
+        """ Fetch with one query every partner that may match a visitor of the batch. """
+        needles = {fname: set() for _key, fname in self.PARTNER_KEYS}
+        for values in vals_list:
+            if values.get('name'):
+                for fname, needle in self._partner_criteria(values).items():
+                    needles[fname].add(needle)
+        domain = [(fname, 'in', list(values)) for fname, values in needles.items() if values]
+        if domain:
+            domain = ['|'] * (len(domain) - 1) + domain
+            self.partners = self.partners.search_fetch(domain, ['passport_id', 'national_id', 'email', 'phone'])
+
+    def find_visitor(self, values):
+        """ Same precedence as the former sequential searches: all identifiers
+        together when an email is given, then ID card, passport or email alone. """
+        criteria = self._partner_criteria(values)
+        passport, national_id, email = (criteria.get(f) for f in ('passport_id', 'national_id', 'email'))
+        steps = []
+        if passport and national_id and email:
+            steps.append(['passport_id', 'national_id', 'email'])
+        if passport and email:
+            steps.append(['passport_id', 'email'])
+        if national_id and email:
+            steps.append(['national_id', 'email'])
+        if national_id:
+            steps.append(['national_id'])
+        if passport:
+            steps.append(['passport_id'])
+        if email:
+            steps.append(['email'])
+        for fnames in steps:
+            for partner in self.partners:
+                if any(partner[fname] == criteria[fname] for fname in fnames):
+                    return partner
+        return self.partners.browse()
+
+    def find_company(self, name):
+        name = name.strip()
+        if name not in self._companies:
+            self._companies[name] = self.env['res.partner'].sudo().search([('name', 'ilike', name)], limit=1)
+        return self._companies[name]
+
+    def find_department(self, name):
+        name = name.strip()
+        if name not in self._departments:
+            self._departments[name] = self.env['hr.department'].sudo().search([('name', 'ilike', name)], limit=1)
+        return self._departments[name]
+
+    def find_employee(self, email=None, phone=None):
+        """ Mirror of the ``ilike`` searches on work/private email or work/mobile phone. """
+        if email:
+            needle, fnames = str(email).strip().lower(), ('work_email', 'private_email')
+        elif phone:
+            needle, fnames = str(phone).strip().lower(), ('work_phone', 'mobile_phone')
+        else:
+            return False
+        for employee in self.map['employees']:
+            if any(needle in employee[fname] for fname in fnames):
+                return employee
+        return False
+
+    def get_employee(self, employee_id):
+        employee = self.map['employee_by_id'].get(employee_id)
+        if employee is None:
+            # archived employee, not part of the map
+            record = self.env['hr.employee'].sudo().browse(employee_id)
+            employee = {
+                'id': record.id,
+                'building_id': record.building_id.id,
+                'level_id': record.level_id.id,
+                'section_id': record.section_id.id,
+                'location_description': record.location_description,
+                'department_id': record.department_id.id,
+            }
+        return employee
+
+    def get_desk(self, operating_unit_ids):
+        for operating_unit_id in operating_unit_ids:
+            desk_id = self.map['desk_by_operating_unit'].get(operating_unit_id)
+            if desk_id:
+                return desk_id
+        return False
+
+    def get_automatic_reason(self):
+        if self._automatic_reason is None:
+            Reason = self.env['frontdesk.operating.unit.change.reason']
+            reason = Reason.search([('name', '=', 'Automatic')], limit=1)
+            if not reason:
+                reason = Reason.create({'name': 'Automatic'})
+            self._automatic_reason = reason.id
+        return self._automatic_reason
+
+    # ------------------------------------------------------------
+    # Routing
+    # ------------------------------------------------------------
+
+    def route(self, values):
+        existing_visitor = self.find_visitor(values) if values.get('name') else False
+        if existing_visitor:
+            values['visitor_id'] = existing_visitor.id
+            if existing_visitor.email and values.get('email') and values.get('email') != existing_visitor.email:
+                # if the email is different, update the email
+                existing_visitor.write({'email': values.get('email')})
+            if values.get('phone') and values.get('phone') != existing_visitor.phone:
+                # if the phone is different, update the phone
+                existing_visitor.write({'phone': values.get('phone')})
+
+        # Update existing company if found
+        if values.get('company'):
+            existing_company = self.find_company(values['company'])
+            if existing_company:
+                values['company_id'] = existing_company.id
+
+        # Update existing department if found
+        existing_department = False
+        if values.get('department'):
+            existing_department = self.find_department(values['department'])
+            if existing_department:
+                values['department_id'] = existing_department.id
+
+        # Update existing employee if found
+        existing_employee = self.find_employee(email=values.get('employee_email'))
+        if not existing_employee:
+            existing_employee = self.find_employee(phone=values.get('employee_phone'))
+        if existing_employee:
+            values['employee_id'] = existing_employee['id']
+
+        # if employee_id is set, set the building, level, section and location description
+        if values.get('employee_id'):
+            employee = self.get_employee(values['employee_id'])
+            values['building_id'] = employee['building_id']
+            values['level_id'] = employee['level_id']
+            values['section_id'] = employee['section_id']
+            values['location_description'] = employee['location_description']
+
+        if values.get('is_online'):
+            try:
+                if values.get('visit_type') == 'employee':
+                    self._route_online_employee(values)
+                elif values.get('visit_type') == 'department':
+                    self._route_online_department(values, existing_department)
+            except Exception as e:
+                _logger.error('Error assigning desk to online visit request: %s', e)
+        elif values.get('employee_id') and values.get('visit_type') == 'employee':
+            values['department_id'] = self.get_employee(values['employee_id'])['department_id'] or False
+
+        department_id = values.get('department_id')
+        if department_id and department_id not in self.map['department_operating_units']:
+            department_id = self.env['hr.department'].sudo().browse(department_id).exists().id
+        values['department_id'] = department_id or False
+        return values
+
+    def _route_online_employee(self, values):
+        # reset the department_id to False
+        values['department_id'] = False
+        employee = False
+        if values.get('employee_id'):
+            employee = self.get_employee(values['employee_id'])
+        if not employee:
+            employee = self.find_employee(email=values.get('employee_email')) \
+                or self.find_employee(phone=values.get('employee_phone'))
+        if not employee or not employee['building_id']:
+            return
+        operating_unit_id = self.map['building_operating_unit'].get(employee['building_id'])
+        desk_id = operating_unit_id and self.get_desk([operating_unit_id])
+        if desk_id:
+            values['station_id'] = desk_id
+            values['operating_unit_change_reason'] = self.get_automatic_reason()
+            values['operating_unit_id'] = operating_unit_id
+
+    def _route_online_department(self, values, existing_department):
+        department_id = values.get('department_id') or (existing_department and existing_department.id)
+        if not department_id:
+            return
+        operating_unit_ids = self.map['department_operating_units'].get(department_id)
+        if operating_unit_ids is None:
+            operating_unit_ids = self.env['hr.department'].sudo().browse(department_id).operating_unit_ids.ids
+        if len(operating_unit_ids) == 1:
+            desk_id = self.get_desk(operating_unit_ids)
+            if desk_id:
+                values['station_id'] = desk_id
+                values['operating_unit_id'] = operating_unit_ids[0]
+        elif len(operating_unit_ids) > 1 and values.get('wilayat_id'):
+            buildings = self.map['buildings_by_wilayat'].get(int(values['wilayat_id']), [])
+            if len(buildings) == 1:
+                operating_unit_id = self.map['building_operating_unit'].get(buildings[0])
+                if operating_unit_id:
+                    values['operating_unit_id'] = operating_unit_id
+                    desk_id = self.get_desk([operating_unit_id])
+                    if desk_id:
+                        values['station_id'] = desk_id
@@ -2,6 +2,7 @@
 # Part of Odoo. See LICENSE file for full copyright and licensing details.
 import qrcode
 import base64
+import uuid
 from io import BytesIO
 
 from werkzeug.urls import url_encode, url_join
@@ -15,15 +16,25 @@ import werkzeug.urls
 import requests
 from datetime import date, time
 import logging
+import time as pytime
 
 _logger = logging.getLogger(__name__)
 
+# Visits still rendered by the QR code cron, the codes of closed visits are
+# never rendered again.
+QR_CODE_OPEN_STATES = ('planned', 'checked_in', 'requested_extend', 'Extended', 'partially_checked_out')
+QR_CODE_BATCH_SIZE = 500
+
 class FrontdeskVisitor(models.Model):
     _name = 'frontdesk.visitor'
     _description = 'Frontdesk Visitors'
     _order = 'check_in'
     _rec_name = 'partner_id'
 
+    _sql_constraints = [
+        ('qr_string_unique', 'unique(qr_string)', 'The QR code must be unique per visit.'),
+    ]
+
     active = fields.Boolean(default=True)
     parent_id = fields.Many2one('frontdesk.visitor', string="Main Visitor")
     child_ids = fields.One2many('frontdesk.visitor', 'parent_id', string="Child Visitors")
@@ -80,8 +91,8 @@ class FrontdeskVisitor(models.Model):
     station_id = fields.Many2one('frontdesk.frontdesk', required=True, string="Desk")
     visitor_properties = fields.Properties('Properties', definition='station_id.visitor_properties_definition', copy=True)
     served = fields.Boolean(string='Drink Served')
-    qr_string = fields.Char(string='QR Code', default='/')
-    qr_code = fields.Binary(compute='_generate_qr')
+    qr_string = fields.Char(string='QR Code', index=True, copy=False, readonly=True)
+    qr_code = fields.Binary(compute='_generate_qr', store=True, attachment=True)
     belonging_ids = fields.One2many('frontdesk.belonging', 'visitor_id')
 
     planned_date = fields.Date(string="Planned Date")
@@ -89,18 +100,45 @@ class FrontdeskVisitor(models.Model):
     planned_date_end = fields.Date(string='Planned End Date')
     planned_time = fields.Float(string="Planned Time")
     planned_duration = fields.Integer(string="Planned Duration (Minutes)")
+
+    # Due times driving the visit scheduler (see _cron_visit_scheduler)
+    planned_datetime = fields.Datetime(string="Planned Datetime", compute='_compute_planned_datetime', store=True, index=True)
+    reminder_at = fields.Datetime(string="Reminder Due At", compute='_compute_due_times', store=True, index=True)
+    postpone_at = fields.Datetime(string="Postponement Due At", compute='_compute_due_times', store=True, index=True)
+    absent_at = fields.Datetime(string="Absent At", compute='_compute_due_times', store=True, index=True)
+    reminder_sent = fields.Boolean(string="Reminder Sent", copy=False)
+    postpone_sent = fields.Boolean(string="Postponement Sent", copy=False)
     preferred_language = fields.Selection([
         ('en_US', 'English'),
         ('ar_001', 'Arabic'),
     ], string='Preferred Language', default='en_US')
     
+    @api.depends('date', 'planned_date', 'planned_time')
+    def _compute_planned_datetime(self):
+        for visitor in self:
+            planned_date = visitor.planned_date or visitor.date
+            if not planned_date:
+                visitor.planned_datetime = False
+                continue
+            planned_time = visitor.planned_time or 0.0
+            visitor.planned_datetime = datetime.combine(planned_date, datetime.min.time()) + timedelta(hours=int(planned_time), minutes=(planned_time % 1) * 60)
+
+    @api.depends('planned_datetime', 'check_in', 'station_id.reminder_notify_time', 'station_id.postpone_time', 'station_id.absence_period')
+    def _compute_due_times(self):
+        for visitor in self:
+            frontdesk = visitor.station_id
+            planned_datetime = visitor.planned_datetime
+            visitor.reminder_at = planned_datetime and planned_datetime - timedelta(minutes=frontdesk.reminder_notify_time)
+            visitor.absent_at = planned_datetime and planned_datetime + timedelta(minutes=frontdesk.absence_period)
+            visitor.postpone_at = visitor.check_in and visitor.check_in + timedelta(minutes=frontdesk.postpone_time)
+
     def get_planned_time_str(self):
         for rec in self:
             hour = int(rec.planned_time)
             minute = int((rec.planned_time - hour) * 60)
             return f"{hour:02}:{minute:02}"
 
-    qr_code_download_link = fields.Char(string='QR Code Download Link')
+    qr_code_download_link = fields.Char(string='QR Code Download Link', compute='_generate_qr', store=True)
     nfc_card_number = fields.Char(string='NFC Card Number', help="NFC Card number assigned to the visitor upon check-in.")
     evaluation = fields.Selection([
         ('very_sad', 'Very Sad 😡'),
@@ -176,39 +214,81 @@ class FrontdeskVisitor(models.Model):
     def action_reject_extension(self):
        self.write({'extension_status': 'rejected'})
 
+    @api.depends('qr_string')
     def _generate_qr(self):
-        # method to generate QR code
+        """ Render the QR code PNG once per token.
+
+        The image is stored as an attachment (the filestore deduplicates it by
+        checksum) and only re-rendered when ``qr_string`` changes, so forms,
+        reports, templates and ``/public/qr/<id>`` all read the same blob.
+        """
+        if not qrcode:
+            raise UserError(_('Necessary Requirements To Run This Operation Is Not Satisfied'))
         for rec in self:
-            if qrcode and base64:
+            if not rec.qr_string:
+                rec.qr_code = False
+                rec.qr_code_download_link = False
+                continue
+            qr = qrcode.QRCode(
+                version=1,
+                error_correction=qrcode.constants.ERROR_CORRECT_L,
+                box_size=10,
+                border=1,
+            )
+            qr.add_data(rec.qr_string)
+
+            qr.make(fit=True)
+            img = qr.make_image()
+            temp = BytesIO()
+            img.save(temp, format="PNG")
+            rec.qr_code = base64.b64encode(temp.getvalue())
+            # rec.qr_code_download_link = f'/web/content?model=frontdesk.visitor&id={rec.id}&field=qr_code'
+            rec.qr_code_download_link = f'/public/qr/{rec.id}' if rec.id else False
+
+    def _render_missing_qr_codes(self):
+        """ Render the QR codes left empty by the upgrade (see the 1.2 migration). """
+        visitors = self.filtered(lambda visitor: visitor.qr_string and not visitor.qr_code_download_link)
+        for fname in ('qr_code', 'qr_code_download_link'):
+            self.env.add_to_compute(self._fields[fname], visitors)
+        visitors.flush_recordset(['qr_code', 'qr_code_download_link'])
+        return visitors
 
-                qr = qrcode.QRCode(
-                    version=1,
-                    error_correction=qrcode.constants.ERROR_CORRECT_L,
-                    box_size=10,
-                    border=1,
-                )
-                qr.add_data(rec.qr_string)
-
-                qr.make(fit=True)
-                img = qr.make_image()
-                temp = BytesIO()
-                img.save(temp, format="PNG")
-                qr_image = base64.b64encode(temp.getvalue())
-                rec.update({
-                    'qr_code': qr_image,
-                    })
-                rec.update({
-                    # 'qr_code_download_link': f'/web/content?model=frontdesk.visitor&id={rec.id}&field=qr_code'
-                    'qr_code_download_link': f'/public/qr/{rec.id}'
-                    })
-                
-            else:
-                raise UserError(_('Necessary Requirements To Run This Operation Is Not Satisfied'))
+    @api.model
+    def _cron_generate_qr_codes(self, batch_size=QR_CODE_BATCH_SIZE):
+        """ Render the QR codes of the open visits in batches, the cron is
+        triggered again until none is left. """
+        visitors = self.search([
+            ('qr_string', '!=', False),
+            ('qr_code_download_link', '=', False),
+            ('state', 'in', QR_CODE_OPEN_STATES),
+        ], limit=batch_size, order='id desc')
+        visitors._render_missing_qr_codes()
+        _logger.info('Frontdesk: rendered %s missing visitor QR codes', len(visitors))
+        if len(visitors) == batch_size:
+            self.env.ref('frontdesk.ir_cron_frontdesk_generate_qr_codes')._trigger()
 
     def get_child_count(self):
         for visitor in self:
             visitor.child_count = len(visitor.child_ids)
 
+    @api.model
+    def _get_new_qr_string(self):
+        return self.env['ir.sequence'].next_by_code('frontdesk.visitor') or uuid.uuid4().hex
+
+    @api.model
+    def _resolve_qr_code(self, qr_code):
+        """ Return the visitor matching a scanned QR token, or an empty recordset.
+
+        This is the single lookup path shared by all kiosk endpoints: the token
+        is resolved through the unique ``qr_string`` index and the visitor is
+        fetched in the same query.
+        """
+        token = qr_code.strip() if isinstance(qr_code, str) else False
+        if not token:
+            return self.browse()
+        fnames = ['qr_string', 'state', 'station_id', 'date', 'planned_time', 'planned_duration', 'parent_id']
+        return self.search_fetch([('qr_string', '=', token)], fnames, limit=1)
+
     def write(self, vals):
         if vals.get('state') == 'checked_in':
             vals['check_in'] = fields.Datetime.now()
@@ -373,110 +453,147 @@ class FrontdeskVisitor(models.Model):
         except Exception as e:
             _logger.error('Error sending _notify_by_sms SMS: %s', e)
 
-    ### Reminder Notification ###
+    ### Visit Scheduler ###
     @api.model
-    def send_reminder_notifications(self):
-        _logger.info('Sending reminder notifications')
+    def _cron_visit_scheduler(self):
+        """ Single due-time driven scheduler for planned visits.
+
+        Each phase only selects the visits whose stored due time
+        (``reminder_at``, ``postpone_at``, ``absent_at``) has just been reached,
+        through the indexed columns, and applies its state changes with one
+        write per frontdesk.
+        """
         now = fields.Datetime.now()
+        metrics = {}
+        for phase, method in [
+            ('reminder', self._schedule_reminders),
+            ('postponement', self._schedule_postponements),
+            ('absence', self._schedule_absences),
+            ('auto_delete', self._schedule_auto_delete),
+        ]:
+            metrics[phase] = self._run_scheduler_phase(phase, method, now)
+        return metrics
+
+    @api.model
+    def _run_scheduler_phase(self, phase, method, now):
+        start = pytime.monotonic()
+        scanned, changed = method(now)
+        duration = pytime.monotonic() - start
+        _logger.info('Frontdesk scheduler %s: %s rows scanned, %s rows changed in %.3fs', phase, scanned, changed, duration)
+        return {'scanned': scanned, 'changed': changed, 'duration': duration}
+
+    @api.model
+    def _schedule_reminders(self, now):
         visitors = self.search([
             ('state', '=', 'planned'),
-            ('date', '=', fields.Date.today()),
+            ('date', '=', now.date()),
+            ('reminder_sent', '=', False),
+            ('reminder_at', '<=', now),
+            ('station_id.allow_reminder', '=', True),
         ])
+        for frontdesk, station_visitors in visitors.grouped('station_id').items():
+            for visitor in station_visitors:
+                if frontdesk.reminder_notify_host:
+                    visitor._send_reminder_host_notification(visitor)
+                if frontdesk.reminder_notify_visitor:
+                    visitor._send_reminder_visitor_notification(visitor)
+            station_visitors.write({'reminder_sent': True})
+        return len(visitors), len(visitors)
 
-        for visitor in visitors:
-            frontdesk = visitor.station_id
-            if visitor.planned_time is not None:
-                planned_datetime = datetime.combine(visitor.planned_date, datetime.min.time()) + timedelta(hours=int(visitor.planned_time), minutes=(visitor.planned_time % 1) * 60)
-                reminder_time = planned_datetime - timedelta(minutes=frontdesk.reminder_notify_time)
-                if visitor.partner_id:
-                    _logger.info('Visitor %s reminder time %s', visitor.partner_id.name, reminder_time)
-                if frontdesk.allow_reminder and now >= reminder_time:
-                    if visitor and frontdesk.reminder_notify_host:
-                        self._send_reminder_host_notification(visitor)
-                        _logger.info('Sent reminder to host')
-                    if visitor and frontdesk.reminder_notify_visitor:
-                        self._send_reminder_visitor_notification(visitor)
-                        _logger.info('Sent reminder to visitor')
+    @api.model
+    def _schedule_postponements(self, now):
+        visitors = self.search([
+            ('state', '=', 'planned'),
+            ('date', '=', now.date()),
+            ('postpone_sent', '=', False),
+            ('postpone_at', '<=', now),
+            ('station_id.send_postpone_notification', '=', True),
+        ])
+        for station_visitors in visitors.grouped('station_id').values():
+            for visitor in station_visitors:
+                _logger.info('Visitor %s is late, sending postponement notification', visitor.partner_id.name)
+                visitor._send_postponement_notification(visitor)
+            station_visitors.write({'postpone_sent': True})
+        return len(visitors), len(visitors)
+
+    @api.model
+    def _schedule_absences(self, now):
+        visitors = self.search([
+            ('state', '=', 'planned'),
+            ('absent_at', '<=', now),
+        ])
+        for station_visitors in visitors.grouped('station_id').values():
+            station_visitors.write({'state': 'absent'})
+        return len(visitors), len(visitors)
+
+    @api.model
+    def _schedule_auto_delete(self, now):
+        """ Delete all non-approved requests at end of working hours """
+        frontdesks = self.env['frontdesk.frontdesk'].search([
+            ('enable_auto_delete_requests', '=', True)
+        ])
+        today = now.date()
+        due_frontdesks = frontdesks.filtered(
+            lambda f: now >= datetime.combine(today, time(int(f.auto_delete_time), int((f.auto_delete_time % 1) * 60)))
+        )
+        if not due_frontdesks:
+            return len(frontdesks), 0
+        visitors = self.search([
+            ('station_id', 'in', due_frontdesks.ids),
+            ('date', '=', today),
+            ('state', '=', 'planned'),
+        ])
+        for frontdesk, station_visitors in visitors.grouped('station_id').items():
+            _logger.info('Auto-deleting %s non-approved requests for frontdesk %s', len(station_visitors), frontdesk.name)
+            station_visitors.unlink()
+        return len(frontdesks) + len(visitors), len(visitors)
+
+    # Entry points of the former per-task crons, kept for existing cron records
+    @api.model
+    def send_reminder_notifications(self):
+        return self._run_scheduler_phase('reminder', self._schedule_reminders, fields.Datetime.now())
+
+    @api.model
+    def send_postponement_notifications(self):
+        return self._run_scheduler_phase('postponement', self._schedule_postponements, fields.Datetime.now())
+
+    @api.model
+    def check_absent_visitors(self):
+        return self._run_scheduler_phase('absence', self._schedule_absences, fields.Datetime.now())
+
+    @api.model
+    def auto_delete_non_approved_requests(self):
+        return self._run_scheduler_phase('auto_delete', self._schedule_auto_delete, fields.Datetime.now())
 
     def _send_reminder_host_notification(self, visitor):
         frontdesk = visitor.station_id
         method = frontdesk.reminder_notify_host_method
+        queue = self.env['frontdesk.notification']
         for host in visitor.host_ids:
             if method in ['email', 'both'] and host.user_id.email:
-                mail_template = frontdesk.reminder_mail_host_template_id
-                if mail_template:
-                    mail_template.send_mail(host.id, force_send=True)
+                queue._enqueue_mail(frontdesk.reminder_mail_host_template_id, host.id)
             if method in ['sms', 'both'] and host.work_phone:
-                if host.work_phone:
-                    try:
-                        sms_template = frontdesk.reminder_sms_host_template_id
-                        body = sms_template._render_field('body', self.ids, compute_lang=True)[self.id]
-                        
-                        self.env['sms.sms'].create({
-                            'body': body,
-                            'number': host.work_phone,
-                        })._send(using_template=True)
-                    except Exception as e:
-                        _logger.error('Error sending _send_reminder_host_notification SMS: %s', e)
+                queue._enqueue_sms(frontdesk.reminder_sms_host_template_id, visitor.id, host.work_phone)
 
-                
     def _send_reminder_visitor_notification(self, visitor):
         frontdesk = visitor.station_id
         method = frontdesk.reminder_notify_visitor_method
+        queue = self.env['frontdesk.notification']
         if method in ['email', 'both'] and visitor.email:
-            mail_template = frontdesk.reminder_mail_visitor_template_id
-            if mail_template:
-                mail_template.send_mail(visitor.id, force_send=True)
+            queue._enqueue_mail(frontdesk.reminder_mail_visitor_template_id, visitor.id)
         if method in ['sms', 'both'] and visitor.phone:
-            if visitor.phone:
-                try:
-                    sms_template = frontdesk.reminder_sms_visitor_template_id
-                    body = sms_template._render_field('body', self.ids, compute_lang=True)[self.id]
-                    
-                    self.env['sms.sms'].create({
-                        'body': body,
-                        'number': visitor.partner_id.phone if visitor.partner_id else visitor.phone,
-                    })._send(using_template=True)
-                except Exception as e:
-                    _logger.error('Error sending _send_reminder_visitor_notification SMS: %s', e)
-
-    ### Postponement Notification ###
-    @api.model
-    def send_postponement_notifications(self):
-        _logger.info('Checking for visitors to postpone due to lateness')
-        now = fields.Datetime.now()
-        visitors = self.search([
-            ('state', '=', 'planned'),
-            ('date', '=', fields.Date.today()),
-        ])
-
-        for visitor in visitors:
-            frontdesk = visitor.station_id
-            if visitor.check_in and frontdesk.send_postpone_notification:
-                postpone_time = visitor.check_in + timedelta(minutes=frontdesk.postpone_time)
-                if now >= postpone_time:
-                    _logger.info('Visitor %s is late, sending postponement notification', visitor.partner_id.name)
-                    self._send_postponement_notification(visitor)
+            number = visitor.partner_id.phone if visitor.partner_id else visitor.phone
+            queue._enqueue_sms(frontdesk.reminder_sms_visitor_template_id, visitor.id, number)
 
     def _send_postponement_notification(self, visitor):
         frontdesk = visitor.station_id
         method = frontdesk.postpone_notify_method
+        queue = self.env['frontdesk.notification']
         if method in ['email', 'both'] and visitor.email:
-            mail_template = frontdesk.postpone_mail_template_id
-            if mail_template:
-                mail_template.send_mail(visitor.id, force_send=True)
+            queue._enqueue_mail(frontdesk.postpone_mail_template_id, visitor.id)
         if method in ['sms', 'both'] and visitor.phone:
-            if visitor.phone:
-                try:
-                    sms_template = frontdesk.postpone_sms_template_id
-                    body = sms_template._render_field('body', self.ids, compute_lang=True)[self.id]
-                    
-                    self.env['sms.sms'].create({
-                        'body': body,
-                        'number': visitor.partner_id.phone if visitor.partner_id else visitor.phone,
-                    })._send(using_template=True)
-                except Exception as e:
-                    _logger.error('Error sending _send_postponement_notification SMS: %s', e)
+            number = visitor.partner_id.phone if visitor.partner_id else visitor.phone
+            queue._enqueue_sms(frontdesk.postpone_sms_template_id, visitor.id, number)
 
     @api.model
     def cancel_all_visits_due_to_extreme_weather(self):
@@ -493,119 +610,37 @@ class FrontdeskVisitor(models.Model):
     def _send_extreme_weather_cancellation_notification(self, visitor):
         frontdesk = visitor.station_id
         method = frontdesk.cancellation_extreme_notify_method
+        queue = self.env['frontdesk.notification']
         if method in ['email', 'both'] and visitor.email:
-            mail_template = frontdesk.cancellation_extreme_weather_mail_template_id
-            if mail_template:
-                mail_template.send_mail(visitor.id, force_send=True)
+            queue._enqueue_mail(frontdesk.cancellation_extreme_weather_mail_template_id, visitor.id)
         if method in ['sms', 'both'] and visitor.phone:
-            if visitor.phone:
-                try:
-                    sms_template = frontdesk.cancellation_extreme_weather_sms_template_id
-                    body = sms_template._render_field('body', self.ids, compute_lang=True)[self.id]
-                    
-                    self.env['sms.sms'].create({
-                        'body': body,
-                        'number': visitor.partner_id.phone if visitor.partner_id else visitor.phone,
-                    })._send(using_template=True)
-                except Exception as e:
-                    _logger.error('Error sending _send_extreme_weather_cancellation_notification SMS: %s', e)
-    
-    ### Absence Checking ###
-    @api.model
-    def check_absent_visitors(self):
-        now = fields.Datetime.now()
-        visitors = self.search([
-            ('state', '=', 'planned'),
-            ('date', '<=', fields.Date.today()),
-        ])
-        for visitor in visitors:
-            frontdesk = visitor.station_id
-            if visitor.planned_time is not None:
-                planned_datetime = datetime.combine(visitor.planned_date, datetime.min.time()) + timedelta(hours=int(visitor.planned_time), minutes=(visitor.planned_time % 1) * 60)
-                absence_time = planned_datetime + timedelta(minutes=frontdesk.absence_period)
-                if now >= absence_time:
-                    visitor.state = 'absent'
-            elif visitor.date < fields.Date.today():
-                visitor.state = 'absent'
-    
-    @api.model
-    def auto_delete_non_approved_requests(self):
-        """Delete all non-approved requests at end of working hours"""
-        _logger.info('Checking for auto-delete of non-approved requests')
-        now = fields.Datetime.now()
-        
-        # Get all frontdesk stations with auto-delete enabled
-        frontdesks = self.env['frontdesk.frontdesk'].search([
-            ('enable_auto_delete_requests', '=', True)
-        ])
-        
-        for frontdesk in frontdesks:
-            # Convert auto_delete_time to datetime for today
-            hour = int(frontdesk.auto_delete_time)
-            minute = int((frontdesk.auto_delete_time % 1) * 60)
-            delete_time = datetime.combine(date.today(), time(hour, minute))
-            
-            if now >= delete_time:
-                # Find non-approved requests for today
-                visitors_to_delete = self.search([
-                    ('station_id', '=', frontdesk.id),
-                    ('date', '=', fields.Date.today()),
-                    ('state', '=', 'planned'),
-                ])
-                
-                if visitors_to_delete:
-                    _logger.info(f'Auto-deleting {len(visitors_to_delete)} non-approved requests for frontdesk {frontdesk.name}')
-                    visitors_to_delete.unlink()
-        
-    
+            number = visitor.partner_id.phone if visitor.partner_id else visitor.phone
+            queue._enqueue_sms(frontdesk.cancellation_extreme_weather_sms_template_id, visitor.id, number)
+
     @api.model
     def create(self, values):
-        values['qr_string'] = self.env['ir.sequence'].next_by_code('frontdesk.visitor') or '/'
+        values['qr_string'] = self._get_new_qr_string()
         rec = super(FrontdeskVisitor, self).create(values)
         frontdesk = rec.station_id
-        try:
-            _logger.info("sending QR Code SMS")
-            if rec and frontdesk and frontdesk.enable_qr_code_sms and frontdesk.qr_code_sms_template_id and rec.partner_id:
-                _logger.info("sending QR Code SMS template found")
-                _logger.info(rec.partner_id)
-                _logger.info(rec.partner_id.phone)
-                sms_template = frontdesk.qr_code_sms_template_id
-                _logger.info(sms_template)
-
-                body = sms_template._render_field('body', [rec.id], compute_lang=True)[rec.id]
-
-                _logger.info(body)
-                if rec.partner_id:
-                    self.env['sms.sms'].create({
-                        'body': body,
-                        'number': rec.partner_id.phone,
-                    })._send(using_template=True)
-            else:
-                _logger.warning('QR Code SMS template not found for frontdesk %s', frontdesk.name)
-                
-        except Exception as e:
-            _logger.error('Error sending QR Code SMS: %s', e)
-            
-        if rec and rec.station_id and rec.station_id.enable_reservation_ack_mail and rec.station_id.reservation_ack_mail_template_id:
-            try:
-                mail_template = rec.station_id.reservation_ack_mail_template_id
-                if mail_template and rec.partner_id:
-                    mail_template.send_mail(rec.id, force_send=True)
-                    if rec.station_id.enable_reservation_security_mail:
-                        # send to security group (responsible_ids)
-                        for user in rec.station_id.responsible_ids:
-                            # get the user's partner_id
-                            partner = user.partner_id
-                            if partner:
-                                mail_template.send_mail(rec.id, force_send=True, email_values={
-                                'author_id': self.create_uid.partner_id.id,
-                                'auto_delete': True,
-                                'email_from': self.env.company.email_formatted,
-                                'email_to': partner.email,
-                                'message_type': 'user_notification',
-                            },)
-            except Exception as e:
-                _logger.error('Error sending Email: %s', e)
+        queue = self.env['frontdesk.notification']
+        if frontdesk.enable_qr_code_sms and frontdesk.qr_code_sms_template_id and rec.partner_id:
+            queue._enqueue_sms(frontdesk.qr_code_sms_template_id, rec.id, rec.partner_id.phone)
+        else:
+            _logger.warning('QR Code SMS template not found for frontdesk %s', frontdesk.name)
+
+        mail_template = frontdesk.reservation_ack_mail_template_id
+        if frontdesk.enable_reservation_ack_mail and mail_template and rec.partner_id:
+            queue._enqueue_mail(mail_template, rec.id)
+            if frontdesk.enable_reservation_security_mail:
+                # send to security group (responsible_ids), drained in the same batch
+                for partner in frontdesk.responsible_ids.partner_id.filtered('email'):
+                    queue._enqueue_mail(mail_template, rec.id, email_values={
+                        'author_id': rec.create_uid.partner_id.id,
+                        'auto_delete': True,
+                        'email_from': self.env.company.email_formatted,
+                        'email_to': partner.email,
+                        'message_type': 'user_notification',
+                    })
         return rec
 
 
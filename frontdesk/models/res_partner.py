@@ -9,4 +9,4 @@ class ResPartner(models.Model):
     is_visitor = fields.Boolean("Is Visitor")
     is_blacklisted_from_visit = fields.Boolean(string="Blacklisted", default=False)
     passport_id = fields.Char(string="Passport ID")
-    national_id = fields.Char(string="National/Resident ID")
\ No newline at end of file
+    national_id = fields.Char(string="National/Resident ID", index=True)
\ No newline at end of file
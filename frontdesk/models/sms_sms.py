@@ -5,6 +5,8 @@ from odoo.exceptions import UserError
 
 _logger = logging.getLogger(__name__)
 
+SMS_API_TIMEOUT = 30
+
 class SmsSms(models.Model):
     _inherit = 'sms.sms'
 
@@ -37,6 +39,15 @@ class SmsSms(models.Model):
         if not using_template:
             raise UserError(_("You are not allowed to send an SMS."))
 
+        # Fetch the SMS API configuration from system parameters, once per batch
+        get_param = self.env['ir.config_parameter'].sudo().get_param
+        api_url = get_param('sms.nama_api_url')
+        bank_code = get_param('sms.nama_bank_code')
+        bank_pwd = get_param('sms.nama_bank_pwd')
+        sender_id = get_param('sms.nama_sender_id')
+        # Reuse one HTTP connection for the whole batch
+        session = requests.Session()
+
         for sms in self:
             try:
 
@@ -44,12 +55,6 @@ class SmsSms(models.Model):
                 is_valid = self._validate_sms_number(sms.number)
                 if not is_valid:
                     raise UserError(_("The phone number %s does not belong to any visitor or employee.") % sms.number)
-                
-                # Fetch the SMS API configuration from system parameters
-                api_url = self.env['ir.config_parameter'].sudo().get_param('sms.nama_api_url')
-                bank_code = self.env['ir.config_parameter'].sudo().get_param('sms.nama_bank_code')
-                bank_pwd = self.env['ir.config_parameter'].sudo().get_param('sms.nama_bank_pwd')
-                sender_id = self.env['ir.config_parameter'].sudo().get_param('sms.nama_sender_id')
 
                 if not all([api_url, bank_code, bank_pwd, sender_id]):
                     raise UserError(_("SMS API configuration is incomplete. Please check the system parameters."))
@@ -65,7 +70,7 @@ class SmsSms(models.Model):
                 headers = {"Content-Type": "application/json"}
 
                 # Send the POST request to the SMS API
-                response = requests.post(api_url, json=payload, headers=headers)
+                response = session.post(api_url, json=payload, headers=headers, timeout=SMS_API_TIMEOUT)
 
                 # Check the response from the SMS API
                 if response.status_code == 200:
@@ -83,5 +88,7 @@ class SmsSms(models.Model):
                 if raise_exception:
                     raise UserError(_("Failed to send SMS due to: %s") % str(e))
 
+        session.close()
+
         # Notify related mail messages about the SMS status update
         self.mapped('mail_message_id')._notify_message_notification_update()
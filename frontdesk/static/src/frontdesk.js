@@ -46,10 +46,36 @@ export class Frontdesk extends Component {
     async onWillStart() {
         const urlParams = new URLSearchParams(window.location.search);
         const lang = urlParams.get('lang');
-        this.frontdeskData = await this.rpc(`${this.frontdeskUrl}/${lang}/get_frontdesk_data`);
+        this.frontdeskData = await this._fetchBootstrap(lang);
         this.station = this.frontdeskData.station[0];
     }
 
+    /**
+     * Fetch the bootstrap payload, retrying once on network or server errors.
+     * Failures are thrown so that the error dialog is shown as for a failed rpc.
+     *
+     * @private
+     */
+    async _fetchBootstrap(lang, retries = 1) {
+        let response;
+        try {
+            // Plain GET so the browser revalidates the cached payload by ETag
+            response = await fetch(`${this.frontdeskUrl}/${lang}/bootstrap`);
+        } catch (error) {
+            if (retries > 0) {
+                return this._fetchBootstrap(lang, retries - 1);
+            }
+            throw error;
+        }
+        if (!response.ok) {
+            if (response.status >= 500 && retries > 0) {
+                return this._fetchBootstrap(lang, retries - 1);
+            }
+            throw new Error(`Could not load the frontdesk (${response.status} ${response.statusText})`);
+        }
+        return response.json();
+    }
+
     /* This method updates the plannedVisitors */
     updatePlannedVisitors() {
         this._getPlannedVisitors();
@@ -252,6 +278,9 @@ export class Frontdesk extends Component {
             props = {
                 stationId: this.station.id,
                 stationInfo: this.station,
+                purposes: this.frontdeskData.purposes,
+                otherReasons: this.frontdeskData.other_reasons,
+                holidays: this.frontdeskData.holidays,
                 token: this.token,
                 showScreen: this.showScreen.bind(this),
                 setHostData: this.setHostData.bind(this),
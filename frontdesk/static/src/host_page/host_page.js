@@ -38,6 +38,11 @@ export class HostPage extends Component {
     }
 
     async _loadHolidays() {
+        if (this.props.holidays) {
+            // shipped with the bootstrap payload
+            this.state.holidays = this.props.holidays;
+            return;
+        }
         try {
             const result = await this.rpc(`/frontdesk/${this.props.stationId}/${this.props.token}/get_holidays`, {});
             this.state.holidays = result;
@@ -360,6 +365,9 @@ export class HostPage extends Component {
 HostPage.template = "frontdesk.HostPage";
 HostPage.components = { Many2One };
 HostPage.props = {
+    holidays: { type: Array, optional: true },
+    otherReasons: { type: Array, optional: true },
+    purposes: { type: Array, optional: true },
     setHostData: Function,
     showScreen: Function,
     stationId: Number,
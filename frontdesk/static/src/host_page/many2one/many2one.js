@@ -51,6 +51,14 @@ export class Many2One extends Component {
     }
 
     purposeSearch(name) {
+        if (this.props.purposes) {
+            // filtered locally from the bootstrap payload, like name_search
+            const search = (name || "").toLowerCase();
+            const purposes = this.props.purposes
+                .filter((purpose) => purpose.name.toLowerCase().includes(search))
+                .map((purpose) => [purpose.id, purpose.name, purpose.is_other]);
+            return Object.assign(Promise.resolve(purposes), { abort() {} });
+        }
         const urlParams = new URLSearchParams(window.location.search);
         const lang = urlParams.get('lang');
         return this.rpc(`/frontdesk/${this.props.stationId}/${this.props.token}/${lang}/get_purposes`, {
@@ -285,8 +293,8 @@ export class Many2One extends Component {
     }
 
     async loadOtherReasons() {
-        // Fetch "Other Reasons" using RPC
-        const reasons = await this.rpc('/frontdesk/get_other_reasons', {});
+        // Fetch "Other Reasons" using RPC unless shipped with the bootstrap payload
+        const reasons = this.props.otherReasons || await this.rpc('/frontdesk/get_other_reasons', {});
         this.state.otherReasons = reasons.map(reason => ({
             id: reason.id,
             name: reason.name,
@@ -297,7 +305,8 @@ export class Many2One extends Component {
         // Fetch "Wilayat" using RPC
         console.log("loadWilayat");
         console.log(purpose_id);
-        const wilayat = await this.rpc('/frontdesk/get_wilayat', {
+        const purpose = this.props.purposes?.find((purpose) => purpose.id === purpose_id);
+        const wilayat = purpose ? purpose.wilayat : await this.rpc('/frontdesk/get_wilayat', {
             'purpose_id': purpose_id,
         });
         this.state.wilayatOptions = wilayat.map(reason => ({
@@ -345,6 +354,8 @@ Many2One.template = "frontdesk.Many2One";
 Many2One.components = { AutoComplete };
 Many2One.props = {
     disableButton: Function,
+    otherReasons: { type: Array, optional: true },
+    purposes: { type: Array, optional: true },
     stationId: Number,
     token: String,
     update: Function,
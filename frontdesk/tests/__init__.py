@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 # Part of Odoo. See LICENSE file for full copyright and licensing details.
 
+from . import test_azure_directory
 from . import test_frontdesk
 from . import test_frontdesk_ui
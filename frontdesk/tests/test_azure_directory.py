@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from odoo.tests.common import TransactionCase
+
+
+class FakeGraphHandler(BaseHTTPRequestHandler):
+    """ Minimal Azure AD login + Graph endpoint serving ``server.users``. """
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.server.token_requests += 1
+        self._reply({'access_token': 'fake-token', 'expires_in': 3600})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        base = f'http://127.0.0.1:{self.server.server_port}/v1.0'
+        self.server.graph_requests.append(self.path)
+        if url.path == '/v1.0/users/delta':
+            if query.get('$deltatoken'):
+                self._reply({'value': self.server.changes, '@odata.deltaLink': f'{base}/users/delta?$deltatoken=2'})
+            elif query.get('$skiptoken'):
+                self._reply({'value': self.server.users[1:], '@odata.deltaLink': f'{base}/users/delta?$deltatoken=1'})
+            else:
+                self._reply({'value': self.server.users[:1], '@odata.nextLink': f'{base}/users/delta?$skiptoken=1'})
+        elif url.path == '/v1.0/users':
+            mail = query['$filter'][0].split("'")[1]
+            self._reply({'value': [user for user in self.server.extra_users if user['mail'] == mail]})
+        else:
+            self._reply({}, status=404)
+
+
+class TestAzureDirectory(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = HTTPServer(('127.0.0.1', 0), FakeGraphHandler)
+        cls.server.token_requests = 0
+        cls.server.graph_requests = []
+        cls.server.users = [
+            {'id': 'aad-1', 'mail': 'Alice@Example.com', 'displayName': 'Alice', 'businessPhones': ['111']},
+            {'id': 'aad-2', 'mail': 'bob@example.com', 'displayName': 'Bob', 'businessPhones': []},
+        ]
+        cls.server.changes = [
+            {'id': 'aad-2', '@removed': {'reason': 'deleted'}},
+            {'id': 'aad-3', 'mail': 'carol@example.com', 'displayName': 'Carol'},
+        ]
+        cls.server.extra_users = [{'id': 'aad-4', 'mail': 'dave@example.com', 'displayName': 'Dave'}]
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.addClassCleanup(cls.server.server_close)
+        cls.addClassCleanup(cls.server.shutdown)
+
+        base = f'http://127.0.0.1:{cls.server.server_port}'
+        config = cls.env['ir.config_parameter'].sudo()
+        config.set_param('azure_ad.tenant_id', 'tenant')
+        config.set_param('azure_ad.client_id', 'client')
+        config.set_param('azure_ad.client_secret', 'secret')
+        config.set_param('azure_ad.login_url', base)
+        config.set_param('azure_ad.graph_url', f'{base}/v1.0')
+        cls.AzureUser = cls.env['frontdesk.azure.user']
+        cls.AzureUser._clear_token_cache()
+        cls.addClassCleanup(cls.AzureUser._clear_token_cache)
+
+    def test_delta_sync_and_lookup(self):
+        token_requests = self.server.token_requests
+        self.AzureUser._cron_sync_delta()
+        self.assertEqual(self.AzureUser._find_by_email('alice@example.COM').display_name, 'Alice')
+        self.assertEqual(self.AzureUser._find_by_email('alice@example.com').business_phone, '111')
+        self.assertTrue(self.AzureUser._find_by_email('bob@example.com'))
+
+        # the second run only applies the changes of the stored delta link
+        self.AzureUser._cron_sync_delta()
+        self.assertFalse(self.AzureUser._find_by_email('bob@example.com'))
+        self.assertTrue(self.AzureUser._find_by_email('carol@example.com'))
+        self.assertIn('$deltatoken=1', self.server.graph_requests[-1])
+        self.assertLessEqual(self.server.token_requests - token_requests, 1, 'The access token should be reused until it expires')
+
+    def test_lookup_fallback(self):
+        token = self.AzureUser._get_access_token()
+        self.assertFalse(self.AzureUser._find_by_email('dave@example.com'))
+        dave = self.AzureUser._fetch_by_email('dave@example.com', token)
+        self.assertEqual(dave.azure_id, 'aad-4')
+        self.assertEqual(self.AzureUser._find_by_email('dave@example.com'), dave)
+        self.assertFalse(self.AzureUser._fetch_by_email('nobody@example.com', token))
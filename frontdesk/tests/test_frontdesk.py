@@ -1,6 +1,11 @@
 # -*- coding: utf-8 -*-
 # Part of Odoo. See LICENSE file for full copyright and licensing details.
 
+from datetime import timedelta
+
+from freezegun import freeze_time
+
+from odoo import fields
 from odoo.addons.mail.tests.common import MailCommon
 
 class TestFrontDesk(MailCommon):
@@ -112,3 +117,193 @@ class TestFrontDesk(MailCommon):
         notify_drink_user = self.visitor_2.drink_ids.notify_user_ids.name
         self.visitor_2.state = 'checked_in'
         self.assert_discuss_notification(notify_drink_user)
+
+    def test_qr_code_resolver(self):
+        '''Test that every visit gets a unique QR token and that kiosk scans resolve it'''
+
+        tokens = (self.visitor_1 | self.visitor_2 | self.visitor_3).mapped('qr_string')
+        self.assertEqual(len(set(tokens)), 3)
+        Visitor = self.env['frontdesk.visitor']
+        self.assertEqual(Visitor._resolve_qr_code(self.visitor_2.qr_string), self.visitor_2)
+        self.assertEqual(Visitor._resolve_qr_code(' %s\n' % self.visitor_2.qr_string), self.visitor_2)
+        self.assertFalse(Visitor._resolve_qr_code('unknown-token'))
+        self.assertFalse(Visitor._resolve_qr_code(False))
+
+    def test_qr_code_image_stored(self):
+        '''Test that the QR image is rendered once per token and stored as an attachment'''
+
+        attachment = self.env['ir.attachment'].sudo().search([
+            ('res_model', '=', 'frontdesk.visitor'),
+            ('res_id', '=', self.visitor_1.id),
+            ('res_field', '=', 'qr_code'),
+        ])
+        self.assertEqual(len(attachment), 1)
+        self.assertEqual(self.visitor_1.qr_code_download_link, f'/public/qr/{self.visitor_1.id}')
+
+    def test_qr_code_cron_renders_open_visits(self):
+        '''Test that the QR codes left empty by the upgrade are only rendered for open visits'''
+
+        visitors = self.visitor_1 | self.visitor_2
+        self.visitor_2.state = 'checked_out'
+        visitors.flush_recordset()
+        self.env['ir.attachment'].sudo().search([
+            ('res_model', '=', 'frontdesk.visitor'),
+            ('res_id', 'in', visitors.ids),
+            ('res_field', '=', 'qr_code'),
+        ]).unlink()
+        self.env.cr.execute("UPDATE frontdesk_visitor SET qr_code_download_link = NULL WHERE id IN %s", [tuple(visitors.ids)])
+        visitors.invalidate_recordset()
+
+        self.env['frontdesk.visitor']._cron_generate_qr_codes()
+        self.assertEqual(self.visitor_1.qr_code_download_link, f'/public/qr/{self.visitor_1.id}')
+        self.assertTrue(self.visitor_1.qr_code)
+        self.assertFalse(self.visitor_2.qr_code_download_link)
+        self.assertFalse(self.visitor_2.qr_code)
+
+    def test_visit_scheduler_absence(self):
+        '''Test that the scheduler only marks visits whose absence time has been reached'''
+
+        day = fields.Date.to_date('2024-03-04')
+        self.station.absence_period = 30
+        self.visitor_1.write({'planned_date': day, 'date': day, 'planned_time': 10.0})
+        self.visitor_2.write({'planned_date': day + timedelta(days=1), 'date': day + timedelta(days=1), 'planned_time': 10.0})
+        self.assertEqual(self.visitor_1.absent_at, self.visitor_1.planned_datetime + timedelta(minutes=30))
+
+        Visitor = self.env['frontdesk.visitor']
+        with freeze_time('2024-03-04 10:29:00'):
+            Visitor._cron_visit_scheduler()
+        self.assertEqual(self.visitor_1.state, 'planned')
+
+        with freeze_time('2024-03-04 10:30:00'):
+            metrics = Visitor._cron_visit_scheduler()
+        self.assertIn('absence', metrics)
+        self.assertEqual(self.visitor_1.state, 'absent')
+        self.assertEqual(self.visitor_2.state, 'planned')
+
+    def test_visit_scheduler_reminder_postponement(self):
+        '''Test that reminders and postponement notices are sent once, when their due time is reached'''
+
+        day = fields.Date.to_date('2024-03-04')
+        self.station.write({'reminder_notify_time': 60, 'postpone_time': 15, 'absence_period': 120})
+        self.visitor_1.write({'planned_date': day, 'date': day, 'planned_time': 10.0})
+        self.visitor_2.write({'partner_id': self.partner_2.id, 'planned_date': day, 'date': day, 'planned_time': 10.0,
+                              'check_in': fields.Datetime.to_datetime('2024-03-04 10:00:00')})
+        Visitor = self.env['frontdesk.visitor']
+        Notification = self.env['frontdesk.notification']
+
+        with freeze_time('2024-03-04 08:59:00'):
+            Visitor._cron_visit_scheduler()
+        self.assertFalse(self.visitor_1.reminder_sent)
+
+        with freeze_time('2024-03-04 09:00:00'):
+            Visitor._cron_visit_scheduler()
+        self.assertTrue(self.visitor_1.reminder_sent)
+        reminders = Notification.search_count([('mail_template_id', '=', self.station.reminder_mail_host_template_id.id)])
+        self.assertTrue(reminders)
+        self.assertFalse(self.visitor_2.postpone_sent)
+
+        # sent once, not on every run
+        with freeze_time('2024-03-04 09:05:00'):
+            Visitor._cron_visit_scheduler()
+        self.assertEqual(Notification.search_count([('mail_template_id', '=', self.station.reminder_mail_host_template_id.id)]), reminders)
+
+        with freeze_time('2024-03-04 10:14:00'):
+            Visitor._cron_visit_scheduler()
+        self.assertFalse(self.visitor_2.postpone_sent)
+
+        with freeze_time('2024-03-04 10:15:00'):
+            metrics = Visitor._cron_visit_scheduler()
+        self.assertTrue(self.visitor_2.postpone_sent)
+        self.assertEqual(metrics['postponement']['changed'], 1)
+        self.assertTrue(Notification.search_count([('res_id', '=', self.visitor_2.id), ('mail_template_id', '=', self.station.postpone_mail_template_id.id)]))
+        self.assertEqual((self.visitor_1 | self.visitor_2).mapped('state'), ['planned', 'planned'])
+
+    def test_notification_queue(self):
+        '''Test that visit notifications are queued instead of sent inline, and retried with backoff'''
+
+        self.station.write({
+            'enable_qr_code_sms': True,
+            'qr_code_sms_template_id': self.env.ref('frontdesk.qr_code_sms_template').id,
+        })
+        self.partner_1.phone = '99999999'
+        visitor = self.env['frontdesk.visitor'].create({
+            'partner_id': self.partner_1.id,
+            'station_id': self.station.id,
+            'date': fields.Date.today(),
+        })
+        job = self.env['frontdesk.notification'].search([('res_id', '=', visitor.id), ('channel', '=', 'sms')])
+        self.assertEqual(len(job), 1)
+        self.assertEqual(job.state, 'pending')
+        self.assertEqual(job.number, '99999999')
+
+        job._mark_failed_attempt('gateway down')
+        self.assertEqual(job.attempt_count, 1)
+        self.assertGreater(job.next_attempt_at, fields.Datetime.now())
+        self.assertEqual(self.env['frontdesk.notification']._get_queue_stats()['pending'], 1)
+
+    def test_group_reservation_bulk_import(self):
+        '''Test that a group reservation resolves partners by national ID and creates all requests'''
+
+        existing = self.env['res.partner'].create({'name': 'Known Visitor', 'national_id': 'ID-1', 'is_visitor': True})
+        visitors = [{
+            'name': f'Delegate {i}',
+            'email': f'delegate{i}@example.com',
+            'phone': f'9000000{i}',
+            'id_number': f'ID-{i}',
+        } for i in range(1, 4)]
+        reservation = self.env['frontdesk.group.reservation']._create_reservation(
+            self.station, self.employee_1, 'Delegation Co', fields.Date.today(), 10.0, visitors)
+
+        self.assertEqual(reservation.state, 'done')
+        self.assertEqual(reservation.processed_count, 3)
+        self.assertEqual(len(reservation.request_ids), 3)
+        self.assertEqual(reservation.request_ids.employee_id, self.employee_1)
+        self.assertIn(existing, reservation.request_ids.visitor_id)
+        self.assertEqual(existing.name, 'Delegate 1')
+        self.assertEqual(set(reservation.request_ids.visitor_id.mapped('national_id')), {'ID-1', 'ID-2', 'ID-3'})
+
+    def test_request_routing_batch(self):
+        '''Test that a batch of visit requests resolves visitors and hosts from the routing map'''
+
+        department = self.env['hr.department'].create({'name': 'Routing Department'})
+        self.employee_2.department_id = department
+        known = self.env['res.partner'].create({'name': 'Known Visitor', 'national_id': 'NID-42', 'is_visitor': True})
+        requests = self.env['frontdesk.request'].create([{
+            'name': 'Known Visitor',
+            'station_id': self.station.id,
+            'visitor_id_number': 'NID-42',
+            'employee_email': 'TEST_WORK2@example.com',
+            'visit_type': 'employee',
+            'date': fields.Date.today(),
+        }, {
+            'name': 'New Visitor',
+            'station_id': self.station.id,
+            'visitor_id_number': 'NID-43',
+            'employee_phone': '1234567890',
+            'visit_type': 'employee',
+            'date': fields.Date.today(),
+        }])
+
+        self.assertEqual(requests[0].visitor_id, known)
+        self.assertEqual(requests[0].employee_id, self.employee_2)
+        self.assertEqual(requests[0].department_id, department)
+        self.assertEqual(requests[1].employee_id, self.employee_1)
+
+    def test_kiosk_bootstrap_payload(self):
+        '''Test that the kiosk bootstrap payload is cached until its reference data changes'''
+
+        version = self.station._get_bootstrap_version()
+        payload = self.station._get_bootstrap_payload('en_US', version)
+        self.assertIs(self.station._get_bootstrap_payload('en_US', version), payload)
+        self.assertEqual(self.station._get_bootstrap_version(), version)
+
+        self.env['frontdesk.holiday'].create({
+            'name': 'Holiday',
+            'date_from': fields.Date.today(),
+            'date_to': fields.Date.today(),
+        })
+        self.env.flush_all()
+        new_version = self.station._get_bootstrap_version()
+        self.assertNotEqual(new_version, version)
+        self.assertEqual(len(self.station._get_bootstrap_payload('en_US', new_version)['holidays']),
+                         len(payload['holidays']) + 1)
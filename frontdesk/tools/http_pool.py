@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+Keep-alive sessions and rate limiting shared by the frontdesk integrations
+(COSEC, ROP, push notifications). Nothing here touches the ORM, so that it
+can be used from the worker threads of the integration outbox.
+"""
+
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_POOL_SIZE = 10  # connections kept per host, as requests does
+
+_lock = threading.Lock()
+_sessions = {}
+
+
+class RateLimiter:
+    """ Token bucket allowing ``rate`` calls per second, with bursts of at
+    most one second worth of calls. """
+
+    def __init__(self, rate):
+        self.rate = float(rate)
+        self.tokens = self.rate
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def get_session(key, pool_size=DEFAULT_POOL_SIZE, verify=True):
+    """ Keep-alive session of ``key``, able to hold ``pool_size`` connections
+    to the same host; a larger pool replaces the session.
+
+    :param key: hashable, prefixed by the integration, e.g. ('cosec', config id)
+    :param bool verify: check the TLS certificate of the host
+    """
+    with _lock:
+        session, size = _sessions.get(key, (None, 0))
+        if session is None or size < pool_size:
+            session = requests.Session()
+            session.verify = verify
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _sessions[key] = (session, pool_size)
+        return session
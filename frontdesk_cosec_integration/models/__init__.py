@@ -1,3 +1,4 @@
 from . import frontdesk_cosec_config
 from . import frontdesk_cosec_log
 from . import frontdesk_visitor
+from . import frontdesk_integration_job
@@ -53,6 +53,18 @@ class FrontdeskCosecConfig(models.Model):
         help='Select which frontdesk stations should send data to COSEC'
     )
     
+    # Dispatch
+    max_parallel_requests = fields.Integer(
+        string='Parallel Requests',
+        default=4,
+        help='Maximum number of concurrent calls to COSEC when sending several logs'
+    )
+    max_requests_per_second = fields.Float(
+        string='Requests per Second',
+        default=10,
+        help='Maximum number of calls to COSEC per second, 0 for no limit'
+    )
+    
     # Logging
     enable_logging = fields.Boolean(
         string='Enable Logging',
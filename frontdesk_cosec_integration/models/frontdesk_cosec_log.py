@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 from odoo import models, fields, api
+from odoo.addons.frontdesk_cosec_integration.tools import cosec_client
 from datetime import datetime
+from psycopg2.extras import execute_values
 import logging
 
 _logger = logging.getLogger(__name__)
@@ -25,8 +27,9 @@ class FrontdeskCosecLog(models.Model):
         ('pending', 'Pending'),
         ('success', 'Success'),
         ('failed', 'Failed'),
-        ('error', 'Error')
-    ], string='Status', default='pending')
+        ('error', 'Error'),
+        ('superseded', 'Superseded')
+    ], string='Status', default='pending', index=True)
     
     # Error Details
     error_message = fields.Text(string='Error Message')
@@ -42,16 +45,8 @@ class FrontdeskCosecLog(models.Model):
             # Get COSEC config
             config = self.env['frontdesk.cosec.config'].get_active_config()
             
-            # Send data again
-            success = self._send_to_cosec(config)
-            
-            if success:
-                self.write({
-                    'state': 'success',
-                    'sent_date': fields.Datetime.now()
-                })
-            else:
-                self.write({'state': 'failed'})
+            # Send data again, the state is written by the dispatcher
+            self._dispatch(config)
                 
         except Exception as e:
             self.write({
@@ -74,30 +69,9 @@ class FrontdeskCosecLog(models.Model):
                 }
             }
         
-        success_count = 0
-        error_count = 0
-        
-        for log in failed_logs:
-            try:
-                config = self.env['frontdesk.cosec.config'].get_active_config()
-                success = log._send_to_cosec(config)
-                
-                if success:
-                    log.write({
-                        'state': 'success',
-                        'sent_date': fields.Datetime.now()
-                    })
-                    success_count += 1
-                else:
-                    log.write({'state': 'failed'})
-                    error_count += 1
-                    
-            except Exception as e:
-                log.write({
-                    'state': 'error',
-                    'error_message': str(e)
-                })
-                error_count += 1
+        results = failed_logs._dispatch()
+        success_count = sum(results.values())
+        error_count = len(results) - success_count
         
         return {
             'type': 'ir.actions.client',
@@ -111,95 +85,130 @@ class FrontdeskCosecLog(models.Model):
     
     def _send_to_cosec(self, config):
         """Send visitor data to COSEC API"""
-        try:
-            import requests
-            from requests.auth import HTTPBasicAuth
-            
-            # Prepare data
-            emp_id_with_prefix = f"{config.emp_id_prefix}{self.emp_id}" if self.emp_id else "UNKNOWN"
-            
-            # Build URL with parameters - using the correct format from the example
-            url = f"{config.api_url}?action=set;id={emp_id_with_prefix};active=0"
-            
-            # Make request
-            response = requests.get(
-                url,
-                auth=HTTPBasicAuth(config.username, config.password),
-                timeout=30,
-                verify=False
-            )
-            
-            # Update log
-            self.write({
-                'api_url': url,
-                'request_data': f"emp_id: {emp_id_with_prefix}, qr_string: {self.qr_string}",
-                'response_data': response.text,
-                'response_status': str(response.status_code),
-                'sent_date': fields.Datetime.now()
-            })
-            
-            # Check for success response
-            response_text = response.text.strip()
-            if response.status_code == 200:
-                # Check if response contains success indicators
-                if ('success' in response_text.lower() or 
-                    'saved successfully' in response_text.lower() or
-                    '0070200001' in response_text):
-                    return True
-                else:
-                    # Log the actual response for debugging
-                    _logger.warning(f"COSEC API returned unexpected response: {response_text}")
-                    return False
+        self.ensure_one()
+        return self._dispatch(config).get(self, False)
+
+    def _dispatch(self, config=None):
+        """Send the logs to COSEC concurrently and write their states back in bulk.
+
+        Logs superseded by a newer success for the same emp_id/qr_string are
+        not sent again. Calls go through the keep-alive session of the config,
+        on at most ``max_parallel_requests`` threads and
+        ``max_requests_per_second``.
+
+        :return: dict {log: True if COSEC accepted it} for the logs sent
+        """
+        config = config or self.env['frontdesk.cosec.config'].get_active_config()
+        logs = self - self._get_superseded()
+        (self - logs).write({'state': 'superseded'})
+        if not logs:
+            return {}
+
+        requests_data = []
+        for log in logs:
+            emp_id_with_prefix = f"{config.emp_id_prefix}{log.emp_id}" if log.emp_id else "UNKNOWN"
+            requests_data.append((
+                cosec_client.build_url(config.api_url, emp_id_with_prefix),
+                f"emp_id: {emp_id_with_prefix}, qr_string: {log.qr_string}",
+            ))
+        workers = max(1, config.max_parallel_requests)
+        session = cosec_client.get_session(config.id, workers)
+        outcomes = cosec_client.send_all(
+            session, [url for url, _request_data in requests_data], (config.username, config.password),
+            workers, rate=config.max_requests_per_second)
+
+        now = fields.Datetime.now()
+        values, results = [], {}
+        for log, (url, request_data), outcome in zip(logs, requests_data, outcomes):
+            success = not outcome['error'] and cosec_client.is_success(outcome['status'], outcome['text'])
+            if outcome['error']:
+                state = 'error'
+            elif success:
+                state = 'success'
             else:
-                return False
-                
-        except Exception as e:
-            self.write({
-                'error_message': str(e),
-                'sent_date': fields.Datetime.now()
-            })
-            return False
-    
+                state = 'failed'
+                _logger.warning("COSEC API returned unexpected response: %s", outcome['text'].strip())
+            values.append((
+                log.id, state, url, request_data, outcome['text'] or None,
+                str(outcome['status']) if outcome['status'] else None, outcome['error'], now,
+            ))
+            results[log] = success
+        logs._write_dispatch_results(values)
+        return results
+
+    def _get_superseded(self):
+        """Failed logs having a newer success for the same emp_id and qr_string"""
+        if not self.ids:
+            return self.browse()
+        self.flush_model(['emp_id', 'qr_string', 'state'])
+        self.env.cr.execute("""
+            SELECT log.id
+              FROM frontdesk_cosec_log log
+             WHERE log.id IN %s
+               AND log.state != 'success'
+               AND EXISTS (
+                    SELECT 1 FROM frontdesk_cosec_log newer
+                     WHERE newer.state = 'success'
+                       AND newer.id > log.id
+                       AND COALESCE(newer.emp_id, '') = COALESCE(log.emp_id, '')
+                       AND COALESCE(newer.qr_string, '') = COALESCE(log.qr_string, ''))
+        """, [tuple(self.ids)])
+        return self.browse([row[0] for row in self.env.cr.fetchall()])
+
+    def _write_dispatch_results(self, values):
+        """Write the outcome of the calls with a single query
+
+        :param list values: tuples (id, state, api_url, request_data,
+          response_data, response_status, error_message, sent_date)
+        """
+        self.flush_recordset()
+        execute_values(self.env.cr._obj, """
+            UPDATE frontdesk_cosec_log AS log
+               SET state = v.state,
+                   api_url = v.api_url,
+                   request_data = v.request_data,
+                   response_data = COALESCE(v.response_data, log.response_data),
+                   response_status = COALESCE(v.response_status, log.response_status),
+                   error_message = COALESCE(v.error_message, log.error_message),
+                   sent_date = v.sent_date::timestamp,
+                   write_uid = %s,
+                   write_date = NOW() AT TIME ZONE 'UTC'
+              FROM (VALUES %%s) AS v(id, state, api_url, request_data, response_data,
+                                     response_status, error_message, sent_date)
+             WHERE log.id = v.id
+        """ % self.env.uid, values)
+        self.invalidate_recordset(['state', 'api_url', 'request_data', 'response_data', 'response_status',
+                                   'error_message', 'sent_date', 'write_uid', 'write_date'])
+        sent = self.filtered(lambda log: log.state == 'success')
+        sent.visitor_id.write({'cosec_sent': True, 'cosec_last_sent': fields.Datetime.now()})
+
     @api.model
     def auto_retry_failed_logs(self, max_retries=3):
         """Automatically retry failed logs with limited attempts"""
         from datetime import timedelta
         
+        # visitors still retried by the integration outbox are left to it
+        outbox_jobs = self.env['frontdesk.integration.job'].sudo().search([
+            ('state', '=', 'pending'),
+            ('res_model', '=', 'frontdesk.visitor'),
+            ('method', '=', '_integration_send_to_cosec'),
+        ])
         failed_logs = self.search([
             ('state', 'in', ['failed', 'error']),
-            ('create_date', '>=', fields.Datetime.now() - timedelta(hours=24))  # Only retry recent failures
+            ('create_date', '>=', fields.Datetime.now() - timedelta(hours=24)),  # Only retry recent failures
+            ('visitor_id', 'not in', outbox_jobs.mapped('res_id')),
         ])
         
         if not failed_logs:
-            return {'message': 'No failed logs to retry'}
-        
-        success_count = 0
-        error_count = 0
+            return {'message': 'No failed logs to retry', 'total_count': 0}
         
-        for log in failed_logs:
-            try:
-                config = self.env['frontdesk.cosec.config'].get_active_config()
-                success = log._send_to_cosec(config)
-                
-                if success:
-                    log.write({
-                        'state': 'success',
-                        'sent_date': fields.Datetime.now()
-                    })
-                    success_count += 1
-                else:
-                    log.write({'state': 'failed'})
-                    error_count += 1
-                    
-            except Exception as e:
-                log.write({
-                    'state': 'error',
-                    'error_message': str(e)
-                })
-                error_count += 1
+        results = failed_logs._dispatch()
+        success_count = sum(results.values())
+        error_count = len(results) - success_count
         
         return {
             'success_count': success_count,
             'error_count': error_count,
+            'total_count': len(failed_logs),
             'message': f'Retried {len(failed_logs)} logs. Success: {success_count}, Failed: {error_count}'
         }
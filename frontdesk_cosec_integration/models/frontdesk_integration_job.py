@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+from odoo import fields, models
+
+
+class FrontdeskIntegrationJob(models.Model):
+    _inherit = 'frontdesk.integration.job'
+
+    integration = fields.Selection(selection_add=[('cosec', 'COSEC')], ondelete={'cosec': 'cascade'})
@@ -11,18 +11,38 @@ class FrontdeskVisitor(models.Model):
     cosec_sent = fields.Boolean(string='Sent to COSEC', default=False)
     cosec_last_sent = fields.Datetime(string='Last Sent to COSEC')
 
-    @api.model
-    def create(self, values):
-        """Override create to send data to COSEC after visitor creation"""
-        visitor = super(FrontdeskVisitor, self).create(values)
-        
-        # Send to COSEC if integration is enabled
-        try:
-            visitor._send_to_cosec_system()
-        except Exception as e:
-            _logger.error(f"Error sending visitor {visitor.id} to COSEC: {str(e)}")
-        
-        return visitor
+    @api.model_create_multi
+    def create(self, vals_list):
+        """Override create to queue the sending of the visitors to COSEC"""
+        visitors = super(FrontdeskVisitor, self).create(vals_list)
+
+        # Sent after commit by the integration outbox if integration is enabled
+        config = self.env['frontdesk.cosec.config'].sudo().search([('active', '=', True)], limit=1)
+        if config and config.enable_cosec_integration:
+            if config.station_ids:
+                visitors = visitors.filtered(lambda visitor: visitor.station_id in config.station_ids)
+            self.env['frontdesk.integration.job']._enqueue(
+                visitors, 'cosec', '_integration_send_to_cosec', endpoint=f'cosec:{config.api_url}')
+
+        return visitors
+
+    def _integration_send_to_cosec(self):
+        """Integration outbox handler, False when COSEC must be retried. A retry
+        sends the log of the failed attempt again instead of creating a new one."""
+        self.ensure_one()
+        config = self.env['frontdesk.cosec.config'].search([('active', '=', True)], limit=1)
+        if not config or not config.enable_cosec_integration:
+            return True
+        if config.station_ids and self.station_id not in config.station_ids:
+            return True
+        log = self.env['frontdesk.cosec.log'].search([
+            ('visitor_id', '=', self.id),
+            ('state', 'in', ['pending', 'failed', 'error']),
+        ], order='id desc', limit=1)
+        if not log:
+            return self._send_to_cosec_system()
+        # superseded: already delivered by a newer log
+        return log._send_to_cosec(config) or log.state == 'superseded'
 
     def _send_to_cosec_system(self):
         """Send visitor data to COSEC system"""
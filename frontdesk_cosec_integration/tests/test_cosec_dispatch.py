@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+from urllib.parse import unquote
+
+from odoo.tests.common import TransactionCase
+
+
+class FakeCosecHandler(BaseHTTPRequestHandler):
+    """ COSEC ``action=set`` endpoint answering after a fixed latency; ids
+    ending with 9 are refused. """
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            time.sleep(server.latency)
+            params = dict(part.partition('=')[::2] for part in unquote(self.path.partition('?')[2]).split(';'))
+            with server.lock:
+                server.requests.append(params.get('id'))
+            if params.get('action') != 'set':
+                status, body = 400, b'invalid action'
+            elif params.get('id', '').endswith('9'):
+                status, body = 200, b'0070200002: user not found'
+            else:
+                status, body = 200, b'0070200001: saved successfully'
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/plain')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class TestCosecDispatch(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), FakeCosecHandler)
+        cls.server.daemon_threads = True
+        cls.server.lock = threading.Lock()
+        cls.server.latency = 0.05
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.addClassCleanup(cls.server.server_close)
+        cls.addClassCleanup(cls.server.shutdown)
+
+        cls.config = cls.env['frontdesk.cosec.config'].create({
+            'name': 'Stub',
+            'api_url': f'http://127.0.0.1:{cls.server.server_port}/COSEC/api.svc/v2/user',
+            'username': 'user',
+            'password': 'pass',
+            'enable_cosec_integration': False,
+            'emp_id_prefix': 'NAMA',
+            'max_parallel_requests': 3,
+            'max_requests_per_second': 0,
+        })
+        cls.station = cls.env['frontdesk.frontdesk'].create({'name': 'Gate'})
+        cls.visitor = cls.env['frontdesk.visitor'].create({'name': 'Visitor', 'station_id': cls.station.id})
+        cls.CosecLog = cls.env['frontdesk.cosec.log']
+
+    def setUp(self):
+        super().setUp()
+        self.server.in_flight = self.server.max_in_flight = 0
+        self.server.requests = []
+
+    def _create_logs(self, emp_ids, state='failed'):
+        return self.CosecLog.create([{
+            'visitor_id': self.visitor.id,
+            'emp_id': emp_id,
+            'qr_string': f'QR{emp_id}',
+            'state': state,
+        } for emp_id in emp_ids])
+
+    def test_dispatch_parallel_bulk_write(self):
+        logs = self._create_logs([str(1000 + number) for number in range(12)])
+        Log = type(self.CosecLog)
+        with patch.object(Log, '_write_dispatch_results', autospec=True,
+                          side_effect=Log._write_dispatch_results) as mock_write:
+            results = logs._dispatch(self.config)
+
+        self.assertEqual(len(self.server.requests), 12)
+        self.assertLessEqual(self.server.max_in_flight, 3)
+        self.assertGreater(self.server.max_in_flight, 1, 'Logs should be sent concurrently')
+        # the states of all the logs are written back with a single call
+        self.assertEqual(mock_write.call_count, 1)
+        self.assertEqual(len(mock_write.call_args.args[1]), 12)
+
+        refused = logs.filtered(lambda log: log.emp_id == '1009')
+        self.assertEqual(refused.state, 'failed')
+        self.assertFalse(results[refused])
+        self.assertEqual(set((logs - refused).mapped('state')), {'success'})
+        self.assertEqual(set((logs - refused).mapped('response_status')), {'200'})
+        self.assertIn('NAMA1000', logs[0].api_url)
+        self.assertTrue(self.visitor.cosec_sent)
+
+    def test_dispatch_rate_limit(self):
+        self.config.write({'max_parallel_requests': 4, 'max_requests_per_second': 10})
+        logs = self._create_logs([str(2000 + number) for number in range(20)])
+        start = time.monotonic()
+        logs._dispatch(self.config)
+        elapsed = time.monotonic() - start
+        self.assertEqual(len(self.server.requests), 20)
+        # a burst of 10 calls, then 10 calls at 10 per second
+        self.assertGreaterEqual(elapsed, 0.9)
+        self.assertLessEqual(self.server.max_in_flight, 4)
+
+    def test_dispatch_superseded(self):
+        old_log, other_log = self._create_logs(['3001', '3002'])
+        self._create_logs(['3001'], state='success')
+        results = (old_log | other_log)._dispatch(self.config)
+
+        # the failed log already delivered by a newer one is not sent again
+        self.assertEqual(old_log.state, 'superseded')
+        self.assertNotIn(old_log, results)
+        self.assertEqual(self.server.requests, ['NAMA3002'])
+        self.assertEqual(other_log.state, 'success')
+
+    def test_outbox_enqueue_once(self):
+        Job = self.env['frontdesk.integration.job']
+        visitor_2 = self.env['frontdesk.visitor'].create({'name': 'Visitor 2', 'station_id': self.station.id})
+        visitors = self.visitor | visitor_2
+        jobs = Job._enqueue(visitors, 'cosec', '_integration_send_to_cosec')
+        self.assertEqual(len(jobs), 2)
+        # a call still waiting for the dispatcher is not queued twice
+        self.assertFalse(Job._enqueue(visitors, 'cosec', '_integration_send_to_cosec'))
+
+        jobs[0].state = 'done'
+        requeued = Job._enqueue(visitors, 'cosec', '_integration_send_to_cosec')
+        self.assertEqual(requeued.mapped('res_id'), [self.visitor.id])
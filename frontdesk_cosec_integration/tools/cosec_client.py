@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+HTTP side of the COSEC dispatcher.
+
+Calls of the ``action=set`` endpoint go through one keep-alive session per
+configuration and are spread over a bounded pool of threads, limited to a
+number of calls per second. Nothing here touches the ORM, so that it runs in
+worker threads.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from odoo.addons.frontdesk.tools import http_pool
+
+SUCCESS_MARKERS = ('success', 'saved successfully', '0070200001')
+TIMEOUT = 30
+
+
+def get_session(key, pool_size):
+    """ Keep-alive session of the configuration ``key``. """
+    return http_pool.get_session(('cosec', key), pool_size, verify=False)
+
+
+def build_url(api_url, emp_id):
+    return f"{api_url}?action=set;id={emp_id};active=0"
+
+
+def is_success(status_code, text):
+    return status_code == 200 and any(marker in text.strip().lower() for marker in SUCCESS_MARKERS)
+
+
+def send_all(session, urls, auth, workers, rate=None):
+    """
+    Call every url of ``urls`` and return their outcome.
+
+    :param session: see ``get_session``
+    :param tuple auth: (username, password) of the basic authentication
+    :param int workers: maximum number of concurrent calls
+    :param float rate: maximum number of calls per second, no limit if falsy
+    :return: list of dicts with ``status``, ``text`` and ``error`` (str or
+      None), in the order of ``urls``
+    """
+    limiter = http_pool.RateLimiter(rate) if rate else None
+
+    def call(url):
+        if limiter:
+            limiter.acquire()
+        try:
+            response = session.get(url, auth=auth, timeout=TIMEOUT)
+        except Exception as e:  # noqa: BLE001 reported to the caller
+            return {'status': None, 'text': '', 'error': str(e)}
+        return {'status': response.status_code, 'text': response.text, 'error': None}
+
+    if workers <= 1 or len(urls) <= 1:
+        return [call(url) for url in urls]
+    with ThreadPoolExecutor(max_workers=min(workers, len(urls)), thread_name_prefix='cosec_send') as executor:
+        return list(executor.map(call, urls))
+
@@ -3,4 +3,5 @@
 
 from . import outlook_config
 from . import hr_employee
-from . import frontdesk_visitor
\ No newline at end of file
+from . import frontdesk_visitor
+from . import frontdesk_integration_job
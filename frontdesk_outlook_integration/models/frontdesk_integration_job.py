@@ -0,0 +1,10 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+from odoo import fields, models
+
+
+class FrontdeskIntegrationJob(models.Model):
+    _inherit = 'frontdesk.integration.job'
+
+    integration = fields.Selection(selection_add=[('outlook', 'Outlook')], ondelete={'outlook': 'cascade'})
@@ -9,6 +9,14 @@ from odoo import models, fields, api, _
 
 _logger = logging.getLogger(__name__)
 
+GRAPH_URL = 'https://graph.microsoft.com/v1.0'
+GRAPH_BATCH_SIZE = 20  # maximum number of requests of a Graph $batch call
+
+
+def _is_success(operation, status):
+    # an event already removed from the calendar is cancelled
+    return status in (200, 201, 204) or (operation == 'cancel' and status == 404)
+
 
 class FrontdeskVisitor(models.Model):
     _inherit = 'frontdesk.visitor'
@@ -21,6 +29,12 @@ class FrontdeskVisitor(models.Model):
         ('sync_failed', 'Sync Failed'),
         ('cancelled', 'Cancelled')
     ], string='Outlook Sync Status', default='not_synced', readonly=True)
+    outlook_pending_operation = fields.Selection([
+        ('create', 'Create'),
+        ('update', 'Update'),
+        ('cancel', 'Cancel')
+    ], string='Outlook Pending Operation', readonly=True, copy=False,
+        help='Operation waiting to be sent to Outlook, the operations of a visitor being coalesced')
     
     def create_outlook_event(self):
         """Create event in host employee's Outlook calendar"""
@@ -158,92 +172,262 @@ class FrontdeskVisitor(models.Model):
     
     def _send_outlook_request(self, host, method, endpoint, data=None):
         """Send request to Microsoft Graph API"""
-        access_token = host.outlook_access_token
-        
-        if host.outlook_token_expiry and host.outlook_token_expiry <= datetime.now():
-            access_token = self._refresh_host_token(host)
+        access_token = host._get_outlook_access_token()
+        if not access_token:
+            _logger.error('Failed to refresh access token')
+            return False
+
+        url = f'{GRAPH_URL}/me{endpoint}'
+        # a token refused before its expiry is refreshed once
+        for attempt in range(2):
+            headers = {
+                'Authorization': f'Bearer {access_token}',
+                'Content-Type': 'application/json'
+            }
+            try:
+                if method == 'POST':
+                    response = requests.post(url, headers=headers, json=data, timeout=30)
+                elif method == 'PATCH':
+                    response = requests.patch(url, headers=headers, json=data, timeout=30)
+                elif method == 'DELETE':
+                    response = requests.delete(url, headers=headers, timeout=30)
+                else:
+                    return False
+            except Exception as e:
+                _logger.error(f'Error sending Outlook request: {e}')
+                return False
+
+            if response.status_code != 401 or attempt:
+                break
+            access_token = host._get_outlook_access_token(rejected_token=access_token)
             if not access_token:
-                _logger.error('Failed to refresh access token')
                 return False
-        
-        url = f'https://graph.microsoft.com/v1.0/me{endpoint}'
-        headers = {
-            'Authorization': f'Bearer {access_token}',
-            'Content-Type': 'application/json'
-        }
-        
-        try:
+
+        if response.status_code in [200, 201, 204]:
             if method == 'POST':
-                response = requests.post(url, headers=headers, json=data, timeout=30)
-            elif method == 'PATCH':
-                response = requests.patch(url, headers=headers, json=data, timeout=30)
-            elif method == 'DELETE':
-                response = requests.delete(url, headers=headers, timeout=30)
+                return response.json().get('id')
+            return True
+        self._log_outlook_error(host, response.status_code, response.text)
+        return False
+
+    def _log_outlook_error(self, host, status_code, error_msg):
+        if status_code == 404 and 'MailboxNotEnabledForRESTAPI' in error_msg:
+            _logger.error(f'Outlook mailbox not enabled for {host.name}: Mailbox is inactive, soft-deleted, or hosted on-premise (Exchange Server). Microsoft Graph API only works with Microsoft 365 cloud mailboxes.')
+        else:
+            _logger.error(f'Outlook API error: {status_code} - {error_msg}')
+
+    def _send_outlook_batch(self, host, access_token, batch_requests):
+        """Send up to GRAPH_BATCH_SIZE requests in one Graph $batch call
+
+        :return: tuple (status of the call, error, {request id: response})
+        """
+        response = requests.post(
+            f'{GRAPH_URL}/$batch',
+            headers={'Authorization': f'Bearer {access_token}', 'Content-Type': 'application/json'},
+            json={'requests': batch_requests},
+            timeout=30,
+        )
+        if response.status_code != 200:
+            return response.status_code, f'{response.status_code} - {response.text}', {}
+        return 200, None, {item['id']: item for item in response.json().get('responses', [])}
+
+    # ------------------------------------------------------------
+    # Background sync
+    # ------------------------------------------------------------
+
+    def _schedule_outlook_operation(self, operation):
+        """Coalesce ``operation`` with the one pending for each visitor, and queue
+        the sync of the visitors whose host has calendar sync enabled"""
+        to_sync = self.browse()
+        for visitor in self.filtered(lambda visitor: visitor.employee_id.outlook_calendar_sync):
+            pending = visitor.outlook_pending_operation
+            has_event = bool(visitor.outlook_event_id)
+            if operation == 'create':
+                if not has_event:
+                    new_operation = 'create'
+                else:
+                    # cancelled then planned again before the sync
+                    new_operation = 'update' if pending == 'cancel' else pending
+            elif operation == 'update':
+                # a pending creation sends the latest data, a pending cancellation wins
+                new_operation = pending or ('update' if has_event else False)
             else:
-                return False
-                
-            if response.status_code in [200, 201, 204]:
-                if method == 'POST':
-                    return response.json().get('id')
-                return True
-            elif response.status_code == 401:
-                access_token = self._refresh_host_token(host)
-                if access_token:
-                    return self._send_outlook_request(host, method, endpoint, data)
-                return False
+                # nothing to cancel if the event was not created yet
+                new_operation = 'cancel' if has_event else False
+            if new_operation != pending:
+                visitor.outlook_pending_operation = new_operation
+            if new_operation:
+                to_sync |= visitor
+        for host, visitors in to_sync.grouped('employee_id').items():
+            self.env['frontdesk.integration.job']._enqueue(
+                visitors, 'outlook', '_integration_outlook_sync', endpoint=f'outlook:{host.id}')
+
+    def _integration_outlook_sync(self):
+        """Integration outbox handler, False when the event must be retried"""
+        self.ensure_one()
+        return self._integration_outlook_sync_batch()[self.id][0]
+
+    def _integration_outlook_sync_batch(self):
+        """Send the pending Outlook operations of the visitors, by host: one token
+        and one Graph $batch call per GRAPH_BATCH_SIZE visitors.
+
+        The visitors are not locked during the Graph calls: their outcome is
+        applied afterwards in a short transaction, see _apply_outlook_outcomes.
+
+        :return: {visitor id: (success, error)}
+        """
+        if not self:
+            return {}
+        # the outcome is applied from another transaction
+        self.flush_recordset()
+        snapshots = {visitor.id: visitor._get_outlook_snapshot() for visitor in self}
+        # {visitor id: (host, Graph response, error of the call)}, host is False when the sync is disabled
+        outcomes = {}
+        outlook_config = self.env['outlook.config'].sudo().search([('active', '=', True)], limit=1)
+        for host, visitors in self.filtered('outlook_pending_operation').grouped('employee_id').items():
+            if not host.outlook_calendar_sync or not (host.sudo().outlook_access_token or host.sudo().outlook_refresh_token):
+                outcomes.update({visitor.id: (False, None, None) for visitor in visitors})
+                continue
+            access_token = host._get_outlook_access_token(outlook_config=outlook_config)
+            if not access_token:
+                outcomes.update({visitor.id: (host, None, 'Failed to refresh access token') for visitor in visitors})
+                continue
+            for index in range(0, len(visitors), GRAPH_BATCH_SIZE):
+                chunk = visitors[index:index + GRAPH_BATCH_SIZE]
+                batch_requests = [visitor._prepare_outlook_batch_request() for visitor in chunk]
+                status, error, responses = self._send_outlook_batch(host, access_token, batch_requests)
+                if status == 401:
+                    access_token = host._get_outlook_access_token(rejected_token=access_token, outlook_config=outlook_config)
+                    if access_token:
+                        status, error, responses = self._send_outlook_batch(host, access_token, batch_requests)
+                if error:
+                    self._log_outlook_error(host, status, error)
+                outcomes.update({visitor.id: (host, responses.get(str(visitor.id)), error) for visitor in chunk})
+
+        results = {visitor.id: (True, None) for visitor in self}
+        if outcomes:
+            with self.pool.cursor() as cr:
+                results.update(self.with_env(self.env(cr=cr))._apply_outlook_outcomes(snapshots, outcomes))
+            self.invalidate_recordset()
+        return results
+
+    def _get_outlook_snapshot(self):
+        """Values telling whether the visitor changed while its operation was sent"""
+        self.ensure_one()
+        return self.outlook_pending_operation, self.outlook_event_id, self.write_date
+
+    def _apply_outlook_outcomes(self, snapshots, outcomes):
+        """Apply the outcome of the Graph calls, if the visitors did not change
+        since their request was prepared. A changed visitor keeps the effect
+        of the call on its event, and is retried with its latest operation.
+
+        :param dict snapshots: {visitor id: _get_outlook_snapshot()} before the calls
+        :param dict outcomes: see _integration_outlook_sync_batch
+        :return: {visitor id: (success, error)}
+        """
+        self.env.cr.execute("SELECT id FROM frontdesk_visitor WHERE id IN %s FOR UPDATE", [tuple(outcomes)])
+        results = {}
+        for visitor in self.browse(list(outcomes)).exists():
+            host, response, error = outcomes[visitor.id]
+            operation = snapshots[visitor.id][0]
+            unchanged = visitor._get_outlook_snapshot() == snapshots[visitor.id]
+            if not host:
+                if unchanged:
+                    visitor.outlook_pending_operation = False
+                results[visitor.id] = (True, None)
+            elif error:
+                if unchanged:
+                    visitor.outlook_sync_status = 'sync_failed'
+                results[visitor.id] = (False, error)
+            elif unchanged:
+                results[visitor.id] = visitor._apply_outlook_response(host, operation, response)
             else:
-                error_msg = response.text
-                if response.status_code == 404 and 'MailboxNotEnabledForRESTAPI' in error_msg:
-                    _logger.error(f'Outlook mailbox not enabled for {host.name}: Mailbox is inactive, soft-deleted, or hosted on-premise (Exchange Server). Microsoft Graph API only works with Microsoft 365 cloud mailboxes.')
-                else:
-                    _logger.error(f'Outlook API error: {response.status_code} - {error_msg}')
-                return False
-                
-        except Exception as e:
-            _logger.error(f'Error sending Outlook request: {e}')
-            return False
-    
-    def _refresh_host_token(self, host):
-        """Refresh host's Outlook access token"""
-        if not host.outlook_refresh_token:
-            return None
-            
-        outlook_config = self.env['outlook.config'].search([('active', '=', True)], limit=1)
-        if not outlook_config:
-            return None
-            
-        token_data = outlook_config.refresh_access_token(host.outlook_refresh_token)
-        if token_data:
-            host.write({
-                'outlook_access_token': token_data['access_token'],
-                'outlook_refresh_token': token_data.get('refresh_token', host.outlook_refresh_token),
-                'outlook_token_expiry': datetime.now() + timedelta(seconds=token_data['expires_in'])
-            })
-            return token_data['access_token']
-        return None
-    
-    @api.model
-    def create(self, vals):
+                results[visitor.id] = visitor._rebase_outlook_operation(host, operation, response)
+        return results
+
+    def _prepare_outlook_batch_request(self):
+        """Graph $batch request of the pending operation, identified by the visitor id"""
+        self.ensure_one()
+        request = {'id': str(self.id)}
+        if self.outlook_pending_operation == 'create':
+            request.update(method='POST', url='/me/events', body=self._prepare_outlook_event_data())
+        elif self.outlook_pending_operation == 'update':
+            request.update(method='PATCH', url=f'/me/events/{self.outlook_event_id}', body=self._prepare_outlook_event_data())
+        else:
+            request.update(method='DELETE', url=f'/me/events/{self.outlook_event_id}')
+        if 'body' in request:
+            request['headers'] = {'Content-Type': 'application/json'}
+        return request
+
+    def _apply_outlook_response(self, host, operation, response):
+        """Apply the response of the pending operation, see _prepare_outlook_batch_request
+
+        :return: tuple (success, error)
+        """
+        self.ensure_one()
+        status = response and response.get('status')
+        body = (response and response.get('body')) or {}
+        if _is_success(operation, status):
+            if operation == 'create':
+                self.write({'outlook_event_id': body.get('id'), 'outlook_sync_status': 'synced', 'outlook_pending_operation': False})
+                _logger.info(f'Created Outlook event {self.outlook_event_id} for visitor {self.partner_id.name}')
+            elif operation == 'update':
+                self.write({'outlook_sync_status': 'synced', 'outlook_pending_operation': False})
+                _logger.info(f'Updated Outlook event {self.outlook_event_id} for visitor {self.partner_id.name}')
+            else:
+                self.write({'outlook_event_id': False, 'outlook_sync_status': 'cancelled', 'outlook_pending_operation': False})
+                _logger.info(f'Cancelled Outlook event for visitor {self.partner_id.name}')
+            return True, None
+        error = json.dumps(body) if body else 'No response'
+        self._log_outlook_error(host, status, error)
+        self.outlook_sync_status = 'sync_failed'
+        return False, f'{status} - {error}'
+
+    def _rebase_outlook_operation(self, host, operation, response):
+        """Keep the effect of ``operation`` on the event of a visitor changed while
+        it was sent, and pend the operation bringing the event up to date
+
+        :return: tuple (success, error), a failure so that the sync is retried
+        """
+        self.ensure_one()
+        status = response and response.get('status')
+        if _is_success(operation, status):
+            if operation == 'create':
+                self.outlook_event_id = ((response and response.get('body')) or {}).get('id')
+            elif operation == 'cancel':
+                self.outlook_event_id = False
+            if self.state == 'canceled':
+                pending = 'cancel' if self.outlook_event_id else False
+            elif self.outlook_event_id:
+                pending = 'update'
+            else:
+                pending = 'create' if self.state in ['planned', 'checked_in'] else False
+            self.outlook_pending_operation = pending
+        _logger.info(f'Visitor {self.partner_id.name} changed during the Outlook sync of {host.name}, sync postponed')
+        return False, 'Visitor changed during the sync'
+
+    @api.model_create_multi
+    def create(self, vals_list):
         """Override create to sync with Outlook when visit is created"""
-        visitor = super(FrontdeskVisitor, self).create(vals)
-        if visitor.state in ['planned', 'checked_in']:
-            visitor.create_outlook_event()
-        return visitor
-    
+        visitors = super(FrontdeskVisitor, self).create(vals_list)
+        visitors.filtered(lambda visitor: visitor.state in ['planned', 'checked_in'])._schedule_outlook_operation('create')
+        return visitors
+
     def write(self, vals):
         """Override write to sync with Outlook when visit is updated"""
         result = super(FrontdeskVisitor, self).write(vals)
-        
+
+        # Calls are coalesced per visitor and made after commit by the integration outbox
         # If visit is approved/accepted, create Outlook event
-        if vals.get('state') in ['planned', 'checked_in'] and not self.outlook_event_id:
-            self.create_outlook_event()
-        
+        if vals.get('state') in ['planned', 'checked_in']:
+            self._schedule_outlook_operation('create')
+
         # If visit details changed, update Outlook event
-        elif self.outlook_event_id and any(field in vals for field in ['planned_date', 'planned_time', 'planned_duration', 'visit_purpose']):
-            self.update_outlook_event()
-        
+        elif any(field in vals for field in ['planned_date', 'planned_time', 'planned_duration', 'visit_purpose']):
+            self._schedule_outlook_operation('update')
+
         # If visit is cancelled, cancel Outlook event
-        elif vals.get('state') == 'canceled' and self.outlook_event_id:
-            self.cancel_outlook_event()
-        
-        return result
\ No newline at end of file
+        elif vals.get('state') == 'canceled':
+            self._schedule_outlook_operation('cancel')
+
+        return result
@@ -1,9 +1,27 @@
 # -*- coding: utf-8 -*-
 # Part of Odoo. See LICENSE file for full copyright and licensing details.
 
+import logging
+import threading
+from datetime import datetime, timedelta
+
 from odoo import models, fields, api, _
 from odoo.exceptions import UserError
 
+_logger = logging.getLogger(__name__)
+
+TOKEN_REFRESH_MARGIN = 300  # seconds, a token is refreshed that long before it expires
+
+_token_locks_guard = threading.Lock()
+_token_locks = {}
+# last tokens obtained by this process: {(db, employee id): (access token, refresh token, expiry)}
+_tokens = {}
+
+
+def _get_token_lock(key):
+    with _token_locks_guard:
+        return _token_locks.setdefault(key, threading.Lock())
+
 
 class HrEmployee(models.Model):
     _inherit = 'hr.employee'
@@ -25,4 +43,48 @@ class HrEmployee(models.Model):
             'type': 'ir.actions.act_url',
             'url': auth_url,
             'target': 'new',
-        }
\ No newline at end of file
+        }
+
+    def _get_outlook_access_token(self, rejected_token=None, outlook_config=None):
+        """Access token of the host, refreshed once it is about to expire.
+
+        Refreshes of a host are serialized: the threads waiting for one reuse
+        the token it obtained instead of refreshing again.
+
+        :param rejected_token: token refused by Graph, refreshed unless another
+          thread already did
+        :param outlook_config: active ``outlook.config``, searched if not given
+        :return: access token or None
+        """
+        self.ensure_one()
+        key = (self.env.cr.dbname, self.id)
+        employee = self.sudo()
+        with _get_token_lock(key):
+            access_token, refresh_token, expiry = _tokens.get(key, (None, None, None))
+            # the stored tokens may be newer, e.g. after a new authorization
+            if not access_token or (employee.outlook_token_expiry and expiry and employee.outlook_token_expiry > expiry):
+                access_token = employee.outlook_access_token
+                refresh_token = employee.outlook_refresh_token
+                expiry = employee.outlook_token_expiry
+            if access_token and access_token != rejected_token and (
+                    not expiry or expiry - timedelta(seconds=TOKEN_REFRESH_MARGIN) > datetime.now()):
+                return access_token
+
+            if not refresh_token:
+                return None
+            outlook_config = outlook_config or self.env['outlook.config'].sudo().search([('active', '=', True)], limit=1)
+            if not outlook_config:
+                return None
+            token_data = outlook_config.refresh_access_token(refresh_token)
+            if not token_data:
+                _logger.error(f'Failed to refresh the Outlook access token of {employee.name}')
+                return None
+            expiry = datetime.now() + timedelta(seconds=token_data['expires_in'])
+            refresh_token = token_data.get('refresh_token') or refresh_token
+            _tokens[key] = (token_data['access_token'], refresh_token, expiry)
+            employee.write({
+                'outlook_access_token': token_data['access_token'],
+                'outlook_refresh_token': refresh_token,
+                'outlook_token_expiry': expiry,
+            })
+            return token_data['access_token']
@@ -205,6 +205,146 @@ class TestOutlookIntegration(TransactionCase):
         self.assertFalse(visitor.outlook_event_id)
         self.assertEqual(visitor.outlook_sync_status, 'cancelled')
     
+    @patch('requests.post')
+    def test_outlook_event_outbox(self, mock_post):
+        mock_response = MagicMock()
+        mock_response.status_code = 503
+        mock_response.text = 'Service Unavailable'
+        mock_post.return_value = mock_response
+
+        visitor = self.FrontdeskVisitor.create({
+            'partner_id': self.visitor_partner.id,
+            'employee_id': self.employee.id,
+            'date': datetime.now().date(),
+            'planned_date': datetime.now().date(),
+            'planned_time': 10.0,
+            'station_id': self.station.id,
+            'state': 'planned',
+        })
+
+        # queued in the transaction, not sent
+        self.assertFalse(mock_post.called)
+        self.assertEqual(visitor.outlook_pending_operation, 'create')
+        job = self.env['frontdesk.integration.job'].search([('res_id', '=', visitor.id), ('integration', '=', 'outlook')])
+        self.assertEqual(len(job), 1)
+        self.assertEqual(job.method, '_integration_outlook_sync')
+        self.assertEqual(job.endpoint, f'outlook:{self.employee.id}')
+
+        job._apply_outcome(*job._dispatch()[job])
+        self.assertTrue(mock_post.called)
+        self.assertEqual(job.state, 'pending')
+        self.assertEqual(job.attempt_count, 1)
+        self.assertGreater(job.next_attempt_at, datetime.now())
+        self.assertEqual(visitor.outlook_sync_status, 'sync_failed')
+        self.assertEqual(visitor.outlook_pending_operation, 'create')
+
+        mock_response.status_code = 200
+        mock_response.json.return_value = {'responses': [{'id': str(visitor.id), 'status': 201, 'body': {'id': 'event-123'}}]}
+        job._apply_outcome(*job._dispatch()[job])
+        self.assertEqual(job.state, 'done')
+        self.assertEqual(visitor.outlook_event_id, 'event-123')
+        self.assertEqual(visitor.outlook_sync_status, 'synced')
+        self.assertFalse(visitor.outlook_pending_operation)
+        self.assertEqual(self.env['frontdesk.integration.job']._get_dispatch_stats()['outlook']['error_rate'], 50.0)
+
+    @patch('requests.post')
+    def test_outlook_operations_coalesced(self, mock_post):
+        visitor_vals = {
+            'partner_id': self.visitor_partner.id,
+            'employee_id': self.employee.id,
+            'date': datetime.now().date(),
+            'planned_date': datetime.now().date(),
+            'planned_time': 10.0,
+            'station_id': self.station.id,
+            'state': 'planned',
+        }
+        created, cancelled = self.FrontdeskVisitor.create([visitor_vals, visitor_vals])
+        synced = self.FrontdeskVisitor.create({
+            **visitor_vals,
+            'outlook_event_id': 'event-123',
+            'outlook_sync_status': 'synced',
+        })
+
+        # a pending creation sends the latest data
+        created.planned_time = 11.0
+        self.assertEqual(created.outlook_pending_operation, 'create')
+        # nothing to cancel before the event is created
+        cancelled.state = 'canceled'
+        self.assertFalse(cancelled.outlook_pending_operation)
+        self.assertFalse(synced.outlook_pending_operation)
+        synced.planned_duration = 90
+        self.assertEqual(synced.outlook_pending_operation, 'update')
+
+        jobs = self.env['frontdesk.integration.job'].search([
+            ('res_id', 'in', (created | cancelled | synced).ids), ('integration', '=', 'outlook')])
+        self.assertEqual(len(jobs), 3)
+
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {'responses': [
+            {'id': str(created.id), 'status': 201, 'body': {'id': 'event-456'}},
+            {'id': str(synced.id), 'status': 200, 'body': {}},
+        ]}
+        mock_post.return_value = mock_response
+        for job, outcome in jobs._dispatch().items():
+            job._apply_outcome(*outcome)
+
+        # one $batch call for the host
+        self.assertEqual(mock_post.call_count, 1)
+        self.assertTrue(mock_post.call_args.args[0].endswith('/$batch'))
+        batch_requests = mock_post.call_args.kwargs['json']['requests']
+        self.assertEqual([(request['id'], request['method']) for request in batch_requests],
+                         [(str(created.id), 'POST'), (str(synced.id), 'PATCH')])
+        self.assertEqual(batch_requests[0]['body']['start']['dateTime'][11:16], '11:00')
+        self.assertEqual(set(jobs.mapped('state')), {'done'})
+        self.assertEqual(created.outlook_event_id, 'event-456')
+        self.assertFalse((created | synced).filtered('outlook_pending_operation'))
+
+    @patch('requests.post')
+    def test_outlook_visitor_changed_during_sync(self, mock_post):
+        visitor = self.FrontdeskVisitor.create({
+            'partner_id': self.visitor_partner.id,
+            'employee_id': self.employee.id,
+            'date': datetime.now().date(),
+            'planned_date': datetime.now().date(),
+            'planned_time': 10.0,
+            'station_id': self.station.id,
+            'state': 'planned',
+        })
+        job = self.env['frontdesk.integration.job'].search([('res_id', '=', visitor.id), ('integration', '=', 'outlook')])
+
+        def cancel_during_call(*args, **kwargs):
+            # the visit is cancelled while the event is being created
+            visitor.state = 'canceled'
+            visitor.flush_recordset()
+            mock_response = MagicMock()
+            mock_response.status_code = 200
+            mock_response.json.return_value = {'responses': [{'id': str(visitor.id), 'status': 201, 'body': {'id': 'event-789'}}]}
+            return mock_response
+
+        mock_post.side_effect = cancel_during_call
+        job._apply_outcome(*job._dispatch()[job])
+
+        # the created event is kept, to be cancelled by the retry
+        self.assertEqual(visitor.outlook_event_id, 'event-789')
+        self.assertEqual(visitor.outlook_pending_operation, 'cancel')
+        self.assertEqual(job.state, 'pending')
+        self.assertEqual(job.attempt_count, 1)
+
+    def test_outlook_token_refreshed_before_expiry(self):
+        self.employee.outlook_token_expiry = datetime.now() + timedelta(minutes=2)
+        token_data = {'access_token': 'new-access-token', 'refresh_token': 'new-refresh-token', 'expires_in': 3600}
+        with patch.object(type(self.outlook_config), 'refresh_access_token', return_value=token_data) as mock_refresh:
+            self.assertEqual(self.employee._get_outlook_access_token(), 'new-access-token')
+            # reused until it is about to expire
+            self.assertEqual(self.employee._get_outlook_access_token(), 'new-access-token')
+            self.assertEqual(mock_refresh.call_count, 1)
+            # a refused token is refreshed once
+            self.assertEqual(self.employee._get_outlook_access_token(rejected_token='new-access-token'), 'new-access-token')
+            self.assertEqual(mock_refresh.call_count, 2)
+        self.assertEqual(self.employee.outlook_refresh_token, 'new-refresh-token')
+        self.assertGreater(self.employee.outlook_token_expiry, datetime.now() + timedelta(minutes=50))
+
     def test_token_refresh_mechanism(self):
         employee = self.HrEmployee.create({
             'name': 'Token Test Employee',
@@ -1 +1,2 @@
-from . import police_api_config
\ No newline at end of file
+from . import police_api_config
+from . import police_api_lookup
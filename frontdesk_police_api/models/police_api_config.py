@@ -1,13 +1,28 @@
 # -*- coding: utf-8 -*-
 from odoo import fields, models, api, _
 from odoo.exceptions import UserError
+from odoo.addons.frontdesk_police_api.tools import rop_client
+import copy
+import json
+import random
 import requests
 import logging
+import time
 import xml.etree.ElementTree as ET
 from datetime import datetime, timedelta, timezone
 
 _logger = logging.getLogger(__name__)
 
+DEFAULT_CARD_EXPIRY = "2030-04-29"
+DEFAULT_DEBUG_LOG = '/tmp/rop_api_debug.log'
+# النتائج المحللة في ذاكرة العملية، مفتاحها (قاعدة البيانات، الإعداد، الرقم المدني، انتهاء البطاقة، اللغة)
+_lookup_cache = rop_client.TTLCache(1024)
+# الحقول التي تغيّر الرمز أو نتيجة الاستعلام
+CACHE_FIELDS = {
+    'auth_base_url', 'api_base_url', 'client_id', 'client_secret', 'scope',
+    'auth_key', 'consumer_code', 'esb_category_code', 'crn_of_request',
+}
+
 
 class PoliceApiConfig(models.Model):
     _name = 'police.api.config'
@@ -51,65 +66,212 @@ class PoliceApiConfig(models.Model):
     timeout = fields.Integer(string='Timeout (seconds)', default=60,
                            help='Request timeout in seconds')
     active = fields.Boolean(string='Active', default=True)
-    
-    def get_oauth_token(self):
+
+    # Cache Settings
+    cache_ttl = fields.Integer(string='Lookup Cache (hours)', default=24,
+                               help='How long the data of a card is reused when it is scanned again, 0 to disable')
+
+    # Debug Settings
+    debug_logging = fields.Boolean(string='Debug Log',
+                                   help='Write the requests and responses to a log file, in the background')
+    debug_log_path = fields.Char(string='Debug Log File', default=DEFAULT_DEBUG_LOG, groups='base.group_system')
+    debug_log_max_size = fields.Integer(string='Debug Log Max Size (MB)', default=10,
+                                        help='The log file is rotated once it reaches that size')
+
+    def write(self, vals):
+        res = super().write(vals)
+        # تغيرت عناوين أو بيانات الاتصال: الرموز والنتائج المحفوظة لم تعد صالحة
+        if CACHE_FIELDS.intersection(vals):
+            self._clear_lookup_cache()
+        return res
+
+    def _get_cache_key(self):
+        self.ensure_one()
+        return (self.env.cr.dbname, self.id)
+
+    def _clear_lookup_cache(self):
+        for config in self:
+            _lookup_cache.discard_prefix(config._get_cache_key())
+            rop_client.drop_token(config._get_cache_key())
+        self.env['police.api.lookup'].sudo().search([('config_id', 'in', self.ids)]).unlink()
+
+    def _debug_log(self, message, *args):
+        """
+        تسجيل مفصل للتحليل في ملف محدود الحجم، يُكتب في الخلفية
         """
-        الحصول على access token من Oracle IDCS
+        if not self.debug_logging:
+            return
+        max_bytes = max(self.debug_log_max_size, 1) * 1024 * 1024
+        rop_client.get_debug_logger(self.sudo().debug_log_path or DEFAULT_DEBUG_LOG, max_bytes).debug(message, *args)
+
+    def _fetch_oauth_token(self):
+        """
+        الحصول على access token جديد من Oracle IDCS
+
+        :return: (access_token, expires_in) أو (None, None) عند الفشل
         """
         try:
             url = f"{self.auth_base_url}/oauth2/v1/token"
-            
+
             headers = {
                 'Content-Type': 'application/x-www-form-urlencoded'
             }
-            
+
             data = {
                 'grant_type': 'client_credentials',
                 'client_id': self.client_id,
                 'client_secret': self.client_secret,
                 'scope': self.scope
             }
-            
+
             _logger.info(f"Getting OAuth token from: {url}")
-            
-            response = requests.post(url, headers=headers, data=data, timeout=self.timeout)
-            
+
+            session = rop_client.get_session(self._get_cache_key())
+            response = session.post(url, headers=headers, data=data, timeout=self.timeout)
+
             if response.status_code == 200:
                 token_data = response.json()
                 access_token = token_data.get('access_token')
                 if access_token:
                     _logger.info("OAuth token obtained successfully")
-                    return access_token
+                    return access_token, token_data.get('expires_in')
                 else:
                     _logger.error("No access token in response")
-                    return None
+                    return None, None
             else:
                 _logger.error(f"OAuth error: {response.status_code} - {response.text}")
-                return None
-                
+                return None, None
+
         except Exception as e:
             _logger.error(f"OAuth token error: {str(e)}")
+            return None, None
+
+    def get_oauth_token(self):
+        """
+        الحصول على access token من Oracle IDCS، يُعاد استخدامه حتى قرب انتهاء صلاحيته (expires_in)
+        """
+        return rop_client.get_token(self._get_cache_key(), self._fetch_oauth_token)
+
+    def _normalize_card_expiry(self, card_expiry):
+        """
+        تحويل تاريخ انتهاء البطاقة إلى التنسيق YYYY-MM-DD
+        """
+        if not card_expiry:
+            return DEFAULT_CARD_EXPIRY  # قيمة افتراضية بتنسيق YYYY-MM-DD
+        try:
+            if '/' in card_expiry:
+                # من MM/DD/YYYY إلى YYYY-MM-DD
+                return datetime.strptime(card_expiry, '%m/%d/%Y').strftime('%Y-%m-%d')
+            elif '-' in card_expiry and len(card_expiry.split('-')[0]) == 2:
+                # من DD-MM-YYYY إلى YYYY-MM-DD
+                return datetime.strptime(card_expiry, '%d-%m-%Y').strftime('%Y-%m-%d')
+        except Exception as e:
+            _logger.error(f"Date format error: {e}, using original: {card_expiry}")
+        return card_expiry
+
+    def _get_cached_lookup(self, civil_id, card_expiry, language):
+        """
+        نتيجة محفوظة لنفس البطاقة: من الذاكرة أولاً ثم من قاعدة البيانات
+        """
+        if self.cache_ttl <= 0:
             return None
+        key = (*self._get_cache_key(), civil_id, card_expiry, language)
+        result = _lookup_cache.get(key)
+        if result is None:
+            now = fields.Datetime.now()
+            lookup = self.env['police.api.lookup'].sudo().search([
+                ('config_id', '=', self.id),
+                ('civil_id', '=', civil_id),
+                ('card_expiry', '=', card_expiry),
+                ('language', '=', language),
+                ('expires_at', '>', now),
+            ], limit=1)
+            if not lookup:
+                return None
+            result = lookup.result
+            _lookup_cache.set(key, result, (lookup.expires_at - now).total_seconds())
+        # the caller may alter the result
+        return copy.deepcopy(result)
+
+    def _set_cached_lookup(self, civil_id, card_expiry, language, result):
+        if self.cache_ttl <= 0:
+            return
+        ttl = self.cache_ttl * 3600
+        _lookup_cache.set((*self._get_cache_key(), civil_id, card_expiry, language), copy.deepcopy(result), ttl)
+        # كشوك متعددة قد تحفظ نفس البطاقة في نفس الوقت
+        self.env.cr.execute("""
+            INSERT INTO police_api_lookup (config_id, civil_id, card_expiry, language, result, expires_at,
+                                           create_uid, create_date, write_uid, write_date)
+                 VALUES (%(config_id)s, %(civil_id)s, %(card_expiry)s, %(language)s, %(result)s, %(expires_at)s,
+                         %(uid)s, %(now)s, %(uid)s, %(now)s)
+            ON CONFLICT (config_id, civil_id, card_expiry, language)
+              DO UPDATE SET result = EXCLUDED.result, expires_at = EXCLUDED.expires_at,
+                            write_uid = EXCLUDED.write_uid, write_date = EXCLUDED.write_date
+        """, {
+            'config_id': self.id,
+            'civil_id': civil_id,
+            'card_expiry': card_expiry,
+            'language': language,
+            'result': json.dumps(result),
+            'expires_at': fields.Datetime.now() + timedelta(seconds=ttl),
+            'uid': self.env.uid,
+            'now': fields.Datetime.now(),
+        })
+        self.env['police.api.lookup'].invalidate_model(['result', 'expires_at'])
 
     def get_visitor_data(self, civil_id, card_expiry=None, context=None):
         """
-        استرجاع بيانات الزائر من ROP API
+        استرجاع بيانات الزائر من ROP API، أو من النتائج المحفوظة لنفس البطاقة
         """
         if not self.active:
             raise UserError(_('ROP API configuration is not active'))
-            
+
         if not civil_id:
             raise UserError(_('Civil ID is required'))
-            
+
         try:
-            # تسجيل مفصل للتحليل
-            debug_file = '/tmp/rop_api_debug.log'
-            with open(debug_file, 'a') as f:
-                f.write(f"\n{'='*80}\n")
-                f.write(f"ROP API DEBUG LOG - {datetime.now()}\n")
-                f.write(f"Civil ID: {civil_id}\n")
-                f.write(f"Card Expiry (input): {card_expiry}\n")
-                
+            civil_id = str(civil_id).strip()
+            original_card_expiry = card_expiry
+            card_expiry = self._normalize_card_expiry(card_expiry)
+            language = self._get_language_preference(context)
+            self._debug_log("%s\nROP API DEBUG LOG\nCivil ID: %s\nCard Expiry (original): %s\nCard Expiry (converted): %s",
+                            '=' * 80, civil_id, original_card_expiry, card_expiry)
+
+            result = self._get_cached_lookup(civil_id, card_expiry, language)
+            if result is not None:
+                _logger.info(f"ROP API result for Civil ID {civil_id} served from cache")
+                self._debug_log("Served from cache\n%s\n", '=' * 80)
+                return result
+
+            result = self._call_rop_api(civil_id, card_expiry, context)
+            if result.get('success'):
+                self._set_cached_lookup(civil_id, card_expiry, language, result)
+            return result
+
+        except requests.RequestException as e:
+            _logger.error(f"ROP API connection error: {str(e)}")
+            return {
+                'success': False,
+                'error': _('Connection error with ROP API')
+            }
+        except Exception as e:
+            _logger.error(f"Unexpected error in ROP API call: {str(e)}")
+            return {
+                'success': False,
+                'error': _('Unexpected error occurred')
+            }
+
+    def _call_rop_api(self, civil_id, card_expiry, context=None):
+        """
+        استدعاء ROP API وتحليل الاستجابة
+        """
+        session = rop_client.get_session(self._get_cache_key())
+        soap_body = rop_client.build_envelope(civil_id, card_expiry, self.crn_of_request)
+        url = self.api_base_url  # URL كامل مع المسار
+        _logger.info(f"Calling ROP API: {url} for Civil ID: {civil_id} with Card Expiry: {card_expiry}")
+        self._debug_log("API URL: %s\nSOAP Body: %s", url, soap_body)
+
+        for attempt in range(2):
             # الحصول على access token
             access_token = self.get_oauth_token()
             if not access_token:
@@ -117,25 +279,15 @@ class PoliceApiConfig(models.Model):
                     'success': False,
                     'error': _('Failed to get OAuth token')
                 }
-            _logger.info(f"OAuth token obtained (length: {len(access_token)}): {access_token[:50]}...")
-            
-            with open(debug_file, 'a') as f:
-                f.write(f"OAuth Token Length: {len(access_token)}\n")
-            
+
             # إعداد timestamp و request ID مطابق للوثائق الرسمية NWS
-            import random
             # توقيت عمان (+4 ساعات من UTC)
-            oman_tz = timezone(timedelta(hours=4))
-            now = datetime.now(oman_tz)
+            now = datetime.now(timezone(timedelta(hours=4)))
             # تنسيق مطابق للوثائق الرسمية: YYYY-MM-DD HH:MM:SS, 24-Hour Format
             request_timestamp = now.strftime('%Y-%m-%d %H:%M:%S')
             # Request ID: First 4 characters of Vendor Code + Random Numeric String (max 36 characters)
-            random_number = str(random.randint(100000000, 999999999))  # 9-digit random number
-            request_id = f"VMS{random_number}"
-            
-            _logger.info(f"Request timestamp: {request_timestamp}")
-            _logger.info(f"Request ID: {request_id}")
-            
+            request_id = f"VMS{random.randint(100000000, 999999999)}"
+
             # إعداد headers مطابق لـ Postman الناجح
             headers = {
                 'Content-Type': 'application/xml',
@@ -148,110 +300,40 @@ class PoliceApiConfig(models.Model):
                 'Accept': 'application/xml',
                 'Cache-Control': 'no-cache'
             }
-            
-            _logger.info(f"Request headers: {headers}")
-            
-            with open(debug_file, 'a') as f:
-                f.write(f"Request Timestamp: {request_timestamp}\n")
-                f.write(f"Request Headers: {headers}\n")
-            
-            # إعداد card_expiry وتحويل التنسيق إلى YYYY-MM-DD
-            original_card_expiry = card_expiry
-            if not card_expiry:
-                card_expiry = "2030-04-29"  # قيمة افتراضية بتنسيق YYYY-MM-DD
-            else:
-                # تحويل التنسيق إلى YYYY-MM-DD
-                try:
-                    if '/' in card_expiry:
-                        # من MM/DD/YYYY إلى YYYY-MM-DD
-                        date_obj = datetime.strptime(card_expiry, '%m/%d/%Y')
-                        card_expiry = date_obj.strftime('%Y-%m-%d')
-                    elif '-' in card_expiry and len(card_expiry.split('-')[0]) == 2:
-                        # من DD-MM-YYYY إلى YYYY-MM-DD
-                        date_obj = datetime.strptime(card_expiry, '%d-%m-%Y')
-                        card_expiry = date_obj.strftime('%Y-%m-%d')
-                    _logger.info(f"Using card expiry date: {card_expiry}")
-                except Exception as e:
-                    _logger.error(f"Date format error: {e}, using original: {card_expiry}")
-            
-            with open(debug_file, 'a') as f:
-                f.write(f"Card Expiry (original): {original_card_expiry}\n")
-                f.write(f"Card Expiry (converted): {card_expiry}\n")
-            
-            # إعداد SOAP body
-            soap_body = f"""<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/" xmlns:urn="urn:rop-gov-om:person">
-   <soapenv:Header/>
-   <soapenv:Body>
-      <urn:PersonInformation>
-         <PersonRequest>
-            <crn>{civil_id}</crn>
-            <cardExpiryDate>{card_expiry}</cardExpiryDate>
-            <crnOfRequest>{self.crn_of_request}</crnOfRequest>
-         </PersonRequest>
-      </urn:PersonInformation>
-   </soapenv:Body>
-</soapenv:Envelope>"""
-            
-            # إرسال الطلب
-            url = self.api_base_url  # URL كامل مع المسار
-            _logger.info(f"Calling ROP API: {url} for Civil ID: {civil_id} with Card Expiry: {card_expiry}")
-            _logger.info(f"SOAP request body: {soap_body}")
-            
-            with open(debug_file, 'a') as f:
-                f.write(f"API URL: {url}\n")
-                f.write(f"SOAP Body: {soap_body}\n")
-            
-            response = requests.post(url, headers=headers, data=soap_body, timeout=self.timeout)
-            
-            with open(debug_file, 'a') as f:
-                f.write(f"Response Status: {response.status_code}\n")
-                f.write(f"Response Headers: {dict(response.headers)}\n")
-                f.write(f"Response Body: {response.text}\n")
-            
-            # معالجة الاستجابة
-            if response.status_code == 200:
-                _logger.info(f"ROP API raw response for Civil ID {civil_id}: {response.text}")
-                
-                # التحقق من وجود خطأ في الاستجابة حتى لو كان status code 200
-                if 'FAILURE' in response.text or 'errorCode' in response.text:
-                    _logger.error(f"ROP API returned error in response: {response.text}")
-                    with open(debug_file, 'a') as f:
-                        f.write(f"ERROR: API returned failure in response\n")
-                        f.write(f"Response: {response.text}\n")
-                        f.write(f"{'='*80}\n\n")
-                    return {
-                        'success': False,
-                        'error': _('ROP API returned an error: ') + self._extract_error_message(response.text)
-                    }
-                
-                result = self._parse_rop_response(response.text, civil_id, context)
-                
-                with open(debug_file, 'a') as f:
-                    f.write(f"Parse Result: {result}\n")
-                    f.write(f"{'='*80}\n\n")
-                
-                return result
-            else:
-                _logger.error(f"ROP API error: {response.status_code} - {response.text}")
-                with open(debug_file, 'a') as f:
-                    f.write(f"ERROR: Status {response.status_code}\n")
-                    f.write(f"{'='*80}\n\n")
+            self._debug_log("Request Timestamp: %s\nRequest ID: %s", request_timestamp, request_id)
+
+            start = time.perf_counter()
+            response = session.post(url, headers=headers, data=soap_body, timeout=self.timeout)
+            _logger.info(f"ROP API answered with {response.status_code} in {(time.perf_counter() - start) * 1000:.0f}ms")
+            self._debug_log("Response Status: %s\nResponse Headers: %s\nResponse Body: %s",
+                            response.status_code, dict(response.headers), response.text)
+
+            if response.status_code == 401 and not attempt:
+                # الرمز المحفوظ رُفض (أُلغي قبل انتهاء صلاحيته): نطلب رمزاً جديداً مرة واحدة
+                rop_client.drop_token(self._get_cache_key(), access_token)
+                continue
+            break
+
+        # معالجة الاستجابة
+        if response.status_code == 200:
+            # التحقق من وجود خطأ في الاستجابة حتى لو كان status code 200
+            if 'FAILURE' in response.text or 'errorCode' in response.text:
+                _logger.error(f"ROP API returned error in response: {response.text}")
+                self._debug_log("ERROR: API returned failure in response\n%s\n", '=' * 80)
                 return {
                     'success': False,
-                    'error': _('Failed to retrieve data from ROP API')
+                    'error': _('ROP API returned an error: ') + self._extract_error_message(response.text)
                 }
-                
-        except requests.RequestException as e:
-            _logger.error(f"ROP API connection error: {str(e)}")
-            return {
-                'success': False,
-                'error': _('Connection error with ROP API')
-            }
-        except Exception as e:
-            _logger.error(f"Unexpected error in ROP API call: {str(e)}")
+
+            result = self._parse_rop_response(response.text, civil_id, context)
+            self._debug_log("Parse Result: %s\n%s\n", result, '=' * 80)
+            return result
+        else:
+            _logger.error(f"ROP API error: {response.status_code} - {response.text}")
+            self._debug_log("ERROR: Status %s\n%s\n", response.status_code, '=' * 80)
             return {
                 'success': False,
-                'error': _('Unexpected error occurred')
+                'error': _('Failed to retrieve data from ROP API')
             }
 
     def _get_language_preference(self, context=None):
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+from odoo import fields, models, api
+
+
+class PoliceApiLookup(models.Model):
+    """
+    نتائج استعلامات ROP المحفوظة مؤقتاً، لتجنب إعادة الاستعلام عند إعادة
+    مسح نفس البطاقة في الكشك. مشتركة بين جميع العمليات (workers).
+    """
+    _name = 'police.api.lookup'
+    _description = 'ROP API Lookup Cache'
+    _order = 'id desc'
+
+    config_id = fields.Many2one('police.api.config', string='Configuration', required=True, ondelete='cascade')
+    civil_id = fields.Char(string='Civil ID', required=True)
+    card_expiry = fields.Char(string='Card Expiry', required=True)
+    language = fields.Char(string='Language', required=True)
+    result = fields.Json(string='Parsed Result')
+    expires_at = fields.Datetime(string='Expires At', required=True, index=True)
+
+    _sql_constraints = [
+        ('lookup_unique', 'UNIQUE(config_id, civil_id, card_expiry, language)',
+         'A lookup is cached once per configuration, card and language.'),
+    ]
+
+    @api.autovacuum
+    def _gc_expired_lookups(self):
+        self.sudo().search([('expires_at', '<', fields.Datetime.now())]).unlink()
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+from datetime import timedelta
+from unittest.mock import MagicMock, patch
+
+from odoo import fields
+from odoo.tests.common import TransactionCase
+
+from odoo.addons.frontdesk_police_api.models import police_api_config
+from odoo.addons.frontdesk_police_api.tools import rop_client
+
+ROP_RESPONSE = """<?xml version="1.0" encoding="UTF-8"?>
+<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">
+<soapenv:Body><PersonInformationResponse><responseBody><Response><Person>
+<ID_Card><Name><name_1_ar>محمد</name_1_ar><name_4_ar>البلوشي</name_4_ar><name_1_en>Mohammed</name_1_en>
+<name_4_en>Al Balushi</name_4_en></Name><Birth><dateOfBirth>1990-01-01</dateOfBirth></Birth></ID_Card>
+<Address><Permanent><telephoneNumber xsi:nil="true"/><mobileNumber>99999999</mobileNumber></Permanent></Address>
+</Person></Response></responseBody></PersonInformationResponse></soapenv:Body></soapenv:Envelope>"""
+
+
+def _response(status_code, text='', json_data=None):
+    response = MagicMock()
+    response.status_code = status_code
+    response.text = text
+    response.headers = {}
+    response.json.return_value = json_data or {}
+    return response
+
+
+class TestRopCache(TransactionCase):
+
+    def setUp(self):
+        super().setUp()
+        self.config = self.env['police.api.config'].create({
+            'name': 'ROP Stub',
+            'auth_base_url': 'https://idcs.example.com',
+            'api_base_url': 'https://rop.example.com/api/getpersoninformation',
+        })
+        police_api_config._lookup_cache.clear()
+        self.addCleanup(police_api_config._lookup_cache.clear)
+        self.addCleanup(rop_client.drop_token, self.config._get_cache_key())
+        self.session = MagicMock()
+        self.token_count = 0
+        self.lookup_headers = []
+        self.lookup_responses = []
+        self.session.post.side_effect = self._post
+        patcher = patch.object(rop_client, 'get_session', return_value=self.session)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _post(self, url, headers=None, data=None, timeout=None):
+        if url.endswith('/oauth2/v1/token'):
+            self.token_count += 1
+            return _response(200, json_data={'access_token': f'token-{self.token_count}', 'expires_in': 3600})
+        self.lookup_headers.append(headers)
+        return self.lookup_responses.pop(0) if self.lookup_responses else _response(200, ROP_RESPONSE)
+
+    def test_lookup_cached_in_memory_and_database(self):
+        result = self.config.get_visitor_data('12345678', '04/29/2030')
+        self.assertTrue(result['success'])
+        self.assertEqual((self.token_count, len(self.lookup_headers)), (1, 1))
+
+        # re-scanned card: served from memory
+        self.assertEqual(self.config.get_visitor_data('12345678', '04/29/2030'), result)
+        self.assertEqual(len(self.lookup_headers), 1)
+
+        # another worker: served from the database
+        police_api_config._lookup_cache.clear()
+        self.assertEqual(self.config.get_visitor_data('12345678', '04/29/2030'), result)
+        self.assertEqual(len(self.lookup_headers), 1)
+
+        # expired: looked up again, with the token still valid
+        police_api_config._lookup_cache.clear()
+        lookup = self.env['police.api.lookup'].search([('config_id', '=', self.config.id)])
+        self.assertEqual(lookup.card_expiry, '2030-04-29')
+        lookup.expires_at = fields.Datetime.now() - timedelta(seconds=1)
+        self.config.get_visitor_data('12345678', '04/29/2030')
+        self.assertEqual((self.token_count, len(self.lookup_headers)), (1, 2))
+
+    def test_token_refreshed_on_401(self):
+        self.lookup_responses = [_response(401, 'Unauthorized')]
+        result = self.config.get_visitor_data('12345678', '2030-04-29')
+        self.assertTrue(result['success'])
+        self.assertEqual(self.token_count, 2)
+        self.assertEqual([headers['Authorization'] for headers in self.lookup_headers],
+                         ['Bearer token-1', 'Bearer token-2'])
+
+    def test_cache_invalidated_on_connection_change(self):
+        self.config.get_visitor_data('12345678', '2030-04-29')
+        Lookup = self.env['police.api.lookup']
+        self.config.write({'timeout': 30, 'cache_ttl': 12, 'debug_logging': False})
+        self.assertTrue(Lookup.search([('config_id', '=', self.config.id)]))
+        self.config.get_visitor_data('12345678', '2030-04-29')
+        self.assertEqual((self.token_count, len(self.lookup_headers)), (1, 1))
+
+        self.config.client_secret = 'new-secret'
+        self.assertFalse(Lookup.search([('config_id', '=', self.config.id)]))
+        self.config.get_visitor_data('12345678', '2030-04-29')
+        self.assertEqual((self.token_count, len(self.lookup_headers)), (2, 2))
+
+    def test_ttl_cache(self):
+        cache = rop_client.TTLCache(2)
+        cache.set(('db', 1, 'a'), 'A', 60)
+        cache.set(('db', 2, 'b'), 'B', 60)
+        cache.set(('db', 1, 'c'), 'C', 0)
+        # expired entries are not served, the least recently used one is evicted
+        self.assertIsNone(cache.get(('db', 1, 'c')))
+        self.assertIsNone(cache.get(('db', 1, 'a')))
+        self.assertEqual(cache.get(('db', 2, 'b')), 'B')
+        cache.set(('db', 1, 'd'), 'D', 60)
+        cache.discard_prefix(('db', 1))
+        self.assertIsNone(cache.get(('db', 1, 'd')))
+        self.assertEqual(cache.get(('db', 2, 'b')), 'B')
+
+    def test_token_fetched_once_by_concurrent_threads(self):
+        key = ('test_rop_cache', 'concurrent')
+        self.addCleanup(rop_client.drop_token, key)
+        fetches = []
+
+        def fetch():
+            fetches.append(1)
+            time.sleep(0.05)
+            return 'shared-token', 3600
+
+        tokens = []
+        threads = [threading.Thread(target=lambda: tokens.append(rop_client.get_token(key, fetch)))
+                   for _i in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(fetches), 1)
+        self.assertEqual(tokens, ['shared-token'] * 5)
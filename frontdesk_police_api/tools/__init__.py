@@ -0,0 +1 @@
+from . import rop_client
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+HTTP side of the ROP person lookup.
+
+- OAuth tokens are reused until shortly before their ``expires_in``;
+- calls go through one keep-alive session per configuration;
+- parsed lookups are kept in a bounded in-memory TTL cache;
+- the debug log is written by a background thread to a size-bounded file.
+
+Nothing here touches the ORM.
+"""
+
+import logging
+import logging.handlers
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+from odoo.addons.frontdesk.tools import http_pool
+
+TOKEN_MARGIN = 60  # seconds, a token is renewed that long before it expires
+
+_lock = threading.Lock()
+_tokens = {}
+_token_locks = {}
+_debug_loggers = {}
+
+
+class TTLCache:
+    """ Thread-safe LRU cache whose entries expire after their own ttl. """
+
+    def __init__(self, size):
+        self.size = size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def discard_prefix(self, prefix):
+        """ Remove the entries whose key (a tuple) starts with ``prefix``. """
+        with self.lock:
+            for key in [key for key in self.entries if key[:len(prefix)] == prefix]:
+                del self.entries[key]
+
+
+def get_session(key):
+    """ Keep-alive session of the configuration ``key``. """
+    return http_pool.get_session(('rop', key))
+
+
+def _get_token_lock(key):
+    with _lock:
+        return _token_locks.setdefault(key, threading.Lock())
+
+
+def _get_valid_token(key):
+    with _lock:
+        token, expires_at = _tokens.get(key, (None, 0.0))
+    if token and expires_at - TOKEN_MARGIN > time.monotonic():
+        return token
+    return None
+
+
+def get_token(key, fetch):
+    """ Token of ``key``, reused while valid. Fetches of a same key are
+    serialized: the threads waiting for one reuse the token it obtained.
+
+    :param fetch: callable returning (access token or None, expires_in in
+      seconds or None); tokens without ``expires_in`` are not reused
+    """
+    token = _get_valid_token(key)
+    if token:
+        return token
+    with _get_token_lock(key):
+        token = _get_valid_token(key)
+        if token:
+            return token
+        token, expires_in = fetch()
+        if token and expires_in:
+            with _lock:
+                _tokens[key] = (token, time.monotonic() + float(expires_in))
+        return token
+
+
+def drop_token(key, token=None):
+    """ Forget the token of ``key``, e.g. when the API refused it; with
+    ``token``, only if it is still the one of ``key``. """
+    with _lock:
+        if token is None or _tokens.get(key, (None,))[0] == token:
+            _tokens.pop(key, None)
+
+
+def build_envelope(civil_id, card_expiry, crn_of_request):
+    return f"""<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/" xmlns:urn="urn:rop-gov-om:person">
+   <soapenv:Header/>
+   <soapenv:Body>
+      <urn:PersonInformation>
+         <PersonRequest>
+            <crn>{civil_id}</crn>
+            <cardExpiryDate>{card_expiry}</cardExpiryDate>
+            <crnOfRequest>{crn_of_request}</crnOfRequest>
+         </PersonRequest>
+      </urn:PersonInformation>
+   </soapenv:Body>
+</soapenv:Envelope>"""
+
+
+def get_debug_logger(path, max_bytes, backup_count=2):
+    """ Logger writing to ``path`` from a background thread, the file being
+    rotated once it reaches ``max_bytes``. """
+    with _lock:
+        logger = _debug_loggers.get((path, max_bytes))
+        if logger is None:
+            handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count)
+            handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+            records = queue.SimpleQueue()
+            listener = logging.handlers.QueueListener(records, handler)
+            listener.start()
+            logger = logging.getLogger(f'{__name__}.debug.{len(_debug_loggers)}')
+            logger.propagate = False
+            logger.setLevel(logging.DEBUG)
+            logger.addHandler(logging.handlers.QueueHandler(records))
+            _debug_loggers[(path, max_bytes)] = logger
+        return logger
+
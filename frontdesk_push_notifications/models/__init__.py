@@ -4,4 +4,5 @@
 from . import frontdesk_visitor
 from . import push_notification_config
 from . import res_config_settings
-from . import hr_employee
\ No newline at end of file
+from . import hr_employee
+from . import frontdesk_integration_job
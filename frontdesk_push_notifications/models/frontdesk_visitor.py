@@ -1,7 +1,10 @@
 # -*- coding: utf-8 -*-
 # Part of Odoo. See LICENSE file for full copyright and licensing details.
 
+from collections import defaultdict
+
 from odoo import models, fields, api
+from odoo.addons.frontdesk_push_notifications.tools import push_client
 import logging
 
 _logger = logging.getLogger(__name__)
@@ -17,56 +20,87 @@ class FrontdeskVisitor(models.Model):
         help='Indicates whether push notification was sent for this visit'
     )
     
-    @api.model
+    @api.model_create_multi
     def create(self, vals_list):
-        """Override create to send push notifications for new visits"""
+        """Override create to queue push notifications for new visits"""
         visitors = super(FrontdeskVisitor, self).create(vals_list)
         
-        # Send push notifications for new visits
-        for visitor in visitors:
-            _logger.error(f"_send_push_notification_if_enabled for visitor ID: {visitor.id}")
-            visitor._send_push_notification_if_enabled()
+        # Sent after commit by the integration outbox, in bulk
+        push_config = self.env['res.config.settings'].get_push_config()
+        if push_config.get('enabled'):
+            self.env['frontdesk.integration.job']._enqueue(
+                visitors.filtered('employee_id'), 'push', '_integration_push_notification',
+                endpoint=f"push:{push_config['api_url']}")
         
         return visitors
+
+    def _integration_push_notification(self):
+        """Integration outbox handler, False when the notification must be retried"""
+        self.ensure_one()
+        return self._send_push_notifications()[self.id][0]
+
+    def _integration_push_notification_batch(self):
+        """Integration outbox handler of several visitors, see _send_push_notifications"""
+        return self._send_push_notifications()
     
     def _send_push_notification_if_enabled(self):
-        """Send push notification if enabled and conditions are met"""
+        """Send push notification if enabled and conditions are met
+
+        :return: False if the push API could not be reached, True otherwise
+        """
         self.ensure_one()
-        
-        # Check if push notifications are enabled
-        config_settings = self.env['res.config.settings']
-        push_config = config_settings.get_push_config()
-        _logger.error(f"_send_push_notification_if_enabled Push notification config: {push_config}")
-        
+        return self._send_push_notifications()[self.id][0]
+
+    def _send_push_notifications(self):
+        """Send the notifications of the visitors not notified yet: the visits
+        of a host user are aggregated into one notification, and notifications
+        are sent in bulk calls over a pooled session. The visitors notified are
+        flagged in one update.
+
+        :return: {visitor id: (success, error)}
+        """
+        results = {visitor.id: (True, None) for visitor in self}
+        push_config = self.env['res.config.settings'].get_push_config()
         if not push_config.get('enabled'):
-            _logger.error("Push notifications are disabled")
-            return
-        
-        # Check if employee exists and has necessary information
-        if not self.employee_id:
-            _logger.error(f"No employee assigned to visitor {self.id}, skipping push notification")
-            return
-        
-        # Get employee's USER_ID (we'll use employee ID as USER_ID for now)
-        # In a real implementation, you might have a specific field mapping employee to USER_ID
-        user_id = self._get_employee_user_id()
-        if not user_id:
-            _logger.error(f"No USER_ID found for employee {self.employee_id.name}, skipping push notification")
-            return
-        
-        # Prepare notification content
-        title = "New Visit Request"
-        message = f"You have a new visit request from {self.partner_id.name}"
-        
-        # Send the notification
-        result = self._send_push_notification_api(user_id, title, message, push_config)
-        
-        # Update the flag based on result
-        if result.get('success'):
-            self.push_notification_sent = True
-            _logger.error(f"Push notification sent successfully for visitor {self.id}")
+            _logger.info("Push notifications are disabled")
+            return results
+
+        # Get employee's USER_ID (employee ID unless a push_user_id is set)
+        visitors_by_user = defaultdict(lambda: self.browse())
+        for visitor in self.filtered(lambda visitor: not visitor.push_notification_sent and visitor.employee_id):
+            user_id = visitor._get_employee_user_id()
+            if not user_id:
+                _logger.info(f"No USER_ID found for employee {visitor.employee_id.name}, skipping push notification")
+                continue
+            visitors_by_user[user_id] |= visitor
+
+        notified = self.browse()
+        user_ids = list(visitors_by_user)
+        for index in range(0, len(user_ids), push_client.BULK_SIZE):
+            chunk = user_ids[index:index + push_client.BULK_SIZE]
+            result = push_client.send(push_config, [
+                visitors_by_user[user_id]._prepare_push_notification(user_id) for user_id in chunk
+            ])
+            visitors = self.browse().union(*(visitors_by_user[user_id] for user_id in chunk))
+            if result.get('success'):
+                _logger.info(f"Push notifications sent to {len(chunk)} users for {len(visitors)} visitors")
+                notified |= visitors
+            else:
+                _logger.error(f"Failed to send push notifications for visitors {visitors.ids}: {result.get('error')}")
+                results.update({visitor.id: (False, result.get('error')) for visitor in visitors})
+        if notified:
+            notified.push_notification_sent = True
+        return results
+
+    def _prepare_push_notification(self, user_id):
+        """Notification of the host user ``user_id`` about the visits of ``self``"""
+        if len(self) == 1:
+            title = "New Visit Request"
+            message = f"You have a new visit request from {self.partner_id.name}"
         else:
-            _logger.error(f"Failed to send push notification for visitor {self.id}: {result.get('error')}")
+            title = "New Visit Requests"
+            message = f"You have {len(self)} new visit requests from {', '.join(name for name in self.mapped('partner_id.name') if name)}"
+        return push_client.build_notification(user_id, title, message)
     
     def _get_employee_user_id(self):
         """Get the USER_ID for push notifications from employee"""
@@ -83,60 +117,6 @@ class FrontdeskVisitor(models.Model):
         # Fallback to employee ID
         return self.employee_id.id
     
-    def _send_push_notification_api(self, user_id, title, message, push_config):
-        """Send push notification via API"""
-        try:
-            import requests
-            import json
-            
-            # Prepare the request payload
-            payload = {
-                "data": [
-                    {
-                        "USER_ID": user_id,
-                        "TITTLE": title,  # Note: API uses "TITTLE" (with double T)
-                        "MESSAGE": message
-                    }
-                ]
-            }
-            
-            # Prepare authentication
-            auth = None
-            if push_config.get('username') and push_config.get('password'):
-                auth = (push_config['username'], push_config['password'])
-            
-            # Make the API request
-            response = requests.post(
-                push_config['api_url'],
-                json=payload,
-                auth=auth,
-                timeout=push_config.get('timeout', 30),
-                headers={'Content-Type': 'application/json'}
-            )
-            
-            # Log the request and response
-            _logger.error(f"Push notification request payload: {json.dumps(payload)}")
-            _logger.error(f"Push notification response status: {response.status_code}, Response: {response.text}")
-            
-            if response.status_code == 200:
-                return {
-                    'success': True,
-                    'response': response.json() if response.content else {},
-                    'status_code': response.status_code
-                }
-            else:
-                return {
-                    'success': False,
-                    'error': f'HTTP {response.status_code}: {response.text}',
-                    'status_code': response.status_code
-                }
-                
-        except Exception as e:
-            return {
-                'success': False,
-                'error': str(e)
-            }
-    
     def resend_push_notification(self):
         """Manual action to resend push notification"""
         self.ensure_one()
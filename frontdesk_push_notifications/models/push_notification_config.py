@@ -2,9 +2,8 @@
 # Part of Odoo. See LICENSE file for full copyright and licensing details.
 
 from odoo import models, fields, api
-import requests
+from odoo.addons.frontdesk_push_notifications.tools import push_client
 import logging
-import json
 
 _logger = logging.getLogger(__name__)
 
@@ -45,63 +44,17 @@ class PushNotificationConfig(models.Model):
             _logger.info("Push notification config is not active, skipping notification")
             return {'success': False, 'error': 'Configuration not active'}
         
-        try:
-            # Prepare the request payload
-            payload = {
-                "data": [
-                    {
-                        "USER_ID": user_id,
-                        "TITTLE": title,  # Note: API uses "TITTLE" (with double T)
-                        "MESSAGE": message
-                    }
-                ]
-            }
-            
-            # Prepare authentication
-            auth = (self.username, self.password) if self.username and self.password else None
-            
-            # Make the API request
-            response = requests.post(
-                self.api_url,
-                json=payload,
-                auth=auth,
-                timeout=self.timeout,
-                headers={'Content-Type': 'application/json'}
-            )
-            
-            # Log the request and response
+        result = push_client.send({
+            'api_url': self.api_url,
+            'username': self.username,
+            'password': self.password,
+            'timeout': self.timeout,
+        }, [push_client.build_notification(user_id, title, message)])
+        if result.get('success'):
             _logger.info(f"Push notification sent to user {user_id}: {title}")
-            _logger.debug(f"Request payload: {json.dumps(payload)}")
-            _logger.debug(f"Response status: {response.status_code}, Response: {response.text}")
-            
-            if response.status_code == 200:
-                return {
-                    'success': True,
-                    'response': response.json() if response.content else {},
-                    'status_code': response.status_code
-                }
-            else:
-                _logger.error(f"Push notification failed with status {response.status_code}: {response.text}")
-                return {
-                    'success': False,
-                    'error': f'HTTP {response.status_code}: {response.text}',
-                    'status_code': response.status_code
-                }
-                
-        except requests.exceptions.Timeout:
-            error_msg = f"Push notification timeout after {self.timeout} seconds"
-            _logger.error(error_msg)
-            return {'success': False, 'error': error_msg}
-            
-        except requests.exceptions.RequestException as e:
-            error_msg = f"Push notification request failed: {str(e)}"
-            _logger.error(error_msg)
-            return {'success': False, 'error': error_msg}
-            
-        except Exception as e:
-            error_msg = f"Unexpected error sending push notification: {str(e)}"
-            _logger.error(error_msg)
-            return {'success': False, 'error': error_msg}
+        else:
+            _logger.error(f"Push notification to user {user_id} failed: {result.get('error')}")
+        return result
     
     def test_connection(self):
         """Test the push notification API connection"""
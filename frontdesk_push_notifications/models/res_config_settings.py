@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 # Part of Odoo. See LICENSE file for full copyright and licensing details.
 
-from odoo import models, fields, api
+from odoo import models, fields, api, tools
 
 
 class ResConfigSettings(models.TransientModel):
@@ -39,13 +39,20 @@ class ResConfigSettings(models.TransientModel):
     @api.model
     def get_push_config(self):
         """Get current push notification configuration"""
+        return dict(self._get_push_config_cached())
+
+    @api.model
+    @tools.ormcache()
+    def _get_push_config_cached(self):
+        # cleared whenever a system parameter is changed
+        ICP = self.env['ir.config_parameter'].sudo()
         return {
-            'enabled': self.env['ir.config_parameter'].sudo().get_param('frontdesk_push_notifications.enabled', False),
-            'api_url': self.env['ir.config_parameter'].sudo().get_param(
+            'enabled': ICP.get_param('frontdesk_push_notifications.enabled', False),
+            'api_url': ICP.get_param(
                 'frontdesk_push_notifications.api_url', 
                 'https://owwscccsp.nws.nama.om/api/custom/nwscustompushnotification/fusiontrigger'
             ),
-            'username': self.env['ir.config_parameter'].sudo().get_param('frontdesk_push_notifications.username'),
-            'password': self.env['ir.config_parameter'].sudo().get_param('frontdesk_push_notifications.password'),
-            'timeout': int(self.env['ir.config_parameter'].sudo().get_param('frontdesk_push_notifications.timeout', 30)),
-        }
\ No newline at end of file
+            'username': ICP.get_param('frontdesk_push_notifications.username'),
+            'password': ICP.get_param('frontdesk_push_notifications.password'),
+            'timeout': int(ICP.get_param('frontdesk_push_notifications.timeout', 30)),
+        }
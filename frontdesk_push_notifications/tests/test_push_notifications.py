@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+from unittest.mock import patch
+
+from odoo.tests.common import TransactionCase
+
+from odoo.addons.frontdesk_push_notifications.tools import push_client
+
+
+class TestPushNotifications(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.station = cls.env['frontdesk.frontdesk'].create({'name': 'Gate'})
+        cls.host_1, cls.host_2 = cls.env['hr.employee'].create([{'name': 'Host 1'}, {'name': 'Host 2'}])
+        # push notifications are disabled, nothing is queued
+        cls.visitors = cls.env['frontdesk.visitor'].create([{
+            'name': name,
+            'station_id': cls.station.id,
+            'employee_id': host.id if host else False,
+        } for name, host in [('Visitor 1', cls.host_1), ('Visitor 2', cls.host_1), ('Visitor 3', cls.host_2),
+                             ('Visitor 4', False)]])
+        cls.push_config = {'enabled': True, 'api_url': 'http://push.example.com/notify', 'timeout': 5}
+
+    def _send(self, results):
+        """ Run the outbox batch handler, the push API answering ``results`` in turn. """
+        calls = []
+
+        def send(push_config, notifications):
+            calls.append(notifications)
+            return results[len(calls) - 1]
+
+        with patch.object(self.registry['res.config.settings'], 'get_push_config', return_value=self.push_config), \
+                patch.object(push_client, 'send', side_effect=send):
+            return self.visitors._integration_push_notification_batch(), calls
+
+    def test_visits_aggregated_per_host(self):
+        results, calls = self._send([{'success': True}])
+        self.assertEqual(len(calls), 1, "the notifications are sent in one bulk call")
+        self.assertEqual([notification['USER_ID'] for notification in calls[0]], [self.host_1.id, self.host_2.id])
+        self.assertIn('2 new visit requests', calls[0][0]['MESSAGE'])
+        self.assertEqual(results, {visitor.id: (True, None) for visitor in self.visitors})
+        self.assertEqual(self.visitors.mapped('push_notification_sent'), [True, True, True, False])
+
+        # notified visitors are not notified again
+        results, calls = self._send([])
+        self.assertFalse(calls)
+        self.assertEqual(len(results), len(self.visitors))
+
+    def test_failed_chunk_is_retried(self):
+        with patch.object(push_client, 'BULK_SIZE', 1):
+            results, calls = self._send([{'success': True}, {'success': False, 'error': 'HTTP 500: unavailable'}])
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(results, {
+            self.visitors[0].id: (True, None),
+            self.visitors[1].id: (True, None),
+            self.visitors[2].id: (False, 'HTTP 500: unavailable'),
+            self.visitors[3].id: (True, None),
+        })
+        self.assertEqual(self.visitors.mapped('push_notification_sent'), [True, True, False, False])
@@ -0,0 +1 @@
+from . import push_client
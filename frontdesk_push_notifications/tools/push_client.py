@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+HTTP side of the push notifications.
+
+The push API accepts a list of notifications in its ``data`` array, so that
+notifications are sent by chunks of ``BULK_SIZE`` through one keep-alive
+session per API url. Nothing here touches the ORM.
+"""
+
+import json
+import logging
+
+import requests
+
+from odoo.addons.frontdesk.tools import http_pool
+
+_logger = logging.getLogger(__name__)
+
+BULK_SIZE = 100  # notifications per call
+POOL_SIZE = 8
+
+
+def get_session(api_url):
+    """ Keep-alive session of the push API ``api_url``. """
+    return http_pool.get_session(('push', api_url), POOL_SIZE)
+
+
+def build_notification(user_id, title, message):
+    # the API expects "TITTLE" (with double T)
+    return {"USER_ID": user_id, "TITTLE": title, "MESSAGE": message}
+
+
+def send(push_config, notifications):
+    """
+    Send ``notifications`` in one call.
+
+    :param dict push_config: ``api_url``, ``username``, ``password`` and
+      ``timeout`` of the push API
+    :param list notifications: see ``build_notification``
+    :return: dict with ``success``, and ``error`` or ``response``
+    """
+    auth = None
+    if push_config.get('username') and push_config.get('password'):
+        auth = (push_config['username'], push_config['password'])
+    timeout = push_config.get('timeout') or 30
+    payload = {"data": notifications}
+    try:
+        response = get_session(push_config['api_url']).post(
+            push_config['api_url'],
+            json=payload,
+            auth=auth,
+            timeout=timeout,
+            headers={'Content-Type': 'application/json'},
+        )
+    except requests.exceptions.Timeout:
+        return {'success': False, 'error': f"Push notification timeout after {timeout} seconds"}
+    except requests.exceptions.RequestException as e:
+        return {'success': False, 'error': f"Push notification request failed: {str(e)}"}
+
+    _logger.debug("Push notification request payload: %s", json.dumps(payload))
+    _logger.debug("Push notification response status: %s, Response: %s", response.status_code, response.text)
+    if response.status_code == 200:
+        try:
+            body = response.json() if response.content else {}
+        except ValueError:
+            body = {}
+        return {'success': True, 'response': body, 'status_code': response.status_code}
+    return {
+        'success': False,
+        'error': f'HTTP {response.status_code}: {response.text}',
+        'status_code': response.status_code,
+    }
@@ -91,6 +91,7 @@ Dashboard Ninja v16.0,
 		'security/ks_security_groups.xml',
 		'data/ks_default_data.xml',
 		'data/ks_mail_cron.xml',
+		'data/ks_summary_cron.xml',
 		'data/dn_data.xml',
 		'data/sequence.xml',
 		'views/res_settings.xml',
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+Streaming loader for the tables backing Excel/CSV dashboard items.
+
+Rows are read incrementally from the uploaded file, converted with one
+converter per column chosen once from the declared column type, and pushed
+through PostgreSQL ``COPY`` in chunks within the caller's transaction.
+"""
+
+import csv
+import datetime
+import hashlib
+import io
+import re
+import unicodedata
+
+from dateutil import parser as date_parser
+
+KS_COPY_CHUNK_SIZE = 10000
+KS_NULL_TOKENS = {'', 'nan', 'nat', 'none', 'null'}
+KS_IDENTIFIER = re.compile(r'^[a-z_][a-z0-9_]*$')
+
+
+def ks_custom_column_name(name):
+    """ Technical name of the column created for the header ``name``: an
+    ASCII slug of the header. Headers losing characters in the slug (e.g.
+    Arabic ones) get a digest of the header, so that they stay distinct. """
+    name = str(name)
+    decomposed = unicodedata.normalize('NFKD', name.replace('(', '').replace(')', ''))
+    # accents are dropped, other non-ASCII letters and digits are lost
+    lost = any(ord(char) > 127 and unicodedata.category(char)[0] in 'LN' for char in decomposed)
+    slug = re.sub(r'[^a-z0-9]+', '_', decomposed.encode('ascii', 'ignore').decode().lower()).strip('_')
+    if slug == 'name':
+        slug = 'name1'
+    if lost or not slug:
+        digest = hashlib.sha1(name.encode()).hexdigest()[:8]
+        slug = '%s_%s' % (slug[:40], digest) if slug else 'c' + digest
+    # PostgreSQL identifiers are limited to 63 bytes
+    return 'x_' + slug[:61]
+
+
+def _ks_is_null(value):
+    if value is None:
+        return True
+    if isinstance(value, float) and value != value:
+        return True
+    return isinstance(value, str) and value.strip().lower() in KS_NULL_TOKENS
+
+
+def _ks_number(value, cast, default):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return cast(value)
+    text = str(value).strip()
+    # accounting notation and thousands separators
+    text = text.replace('$', '').replace(',', '').replace('(', '-').replace(')', '')
+    try:
+        return cast(float(text))
+    except ValueError:
+        return default
+
+
+def _ks_datetime(value):
+    if isinstance(value, datetime.datetime):
+        return value
+    if isinstance(value, datetime.date):
+        return datetime.datetime.combine(value, datetime.time.min)
+    try:
+        return date_parser.parse(str(value).strip())
+    except (ValueError, OverflowError):
+        return None
+
+
+def _ks_to_char(value):
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value)
+
+
+def _ks_to_date(value):
+    value = _ks_datetime(value)
+    return value.date().isoformat() if value else None
+
+
+def _ks_to_datetime(value):
+    value = _ks_datetime(value)
+    return value.strftime('%Y-%m-%d %H:%M:%S') if value else None
+
+
+KS_CONVERTERS = {
+    'char': _ks_to_char,
+    'integer': lambda value: _ks_number(value, int, 0),
+    'float': lambda value: _ks_number(value, float, 0.0),
+    'date': _ks_to_date,
+    'datetime': _ks_to_datetime,
+}
+
+
+class KsCopyLoader:
+    """
+    Load rows into ``table`` with ``COPY ... FROM STDIN``.
+    :param columns: list of (column name, column type), in file order
+    :param progress: optional callable receiving the number of rows loaded
+    """
+
+    def __init__(self, cr, table, columns, chunk_size=KS_COPY_CHUNK_SIZE, progress=None):
+        for identifier in [table] + [name for name, _ttype in columns]:
+            if not KS_IDENTIFIER.match(identifier):
+                raise ValueError("Invalid column or table name: %s" % identifier)
+        self.cr = cr
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.converters = [KS_CONVERTERS.get(ttype, _ks_to_char) for _name, ttype in columns]
+        self.query = 'COPY "%s" (%s) FROM STDIN WITH (FORMAT csv)' % (
+            table, ', '.join('"%s"' % name for name, _ttype in columns))
+
+    def _convert(self, row):
+        row = list(row)[:len(self.converters)]
+        row += [None] * (len(self.converters) - len(row))
+        return [None if _ks_is_null(value) else convert(value) for convert, value in zip(self.converters, row)]
+
+    def _flush(self, buffer):
+        buffer.seek(0)
+        self.cr.copy_expert(self.query, buffer)
+
+    def load(self, rows):
+        """ Load all ``rows`` (sequences of cell values), return their count. """
+        count = 0
+        buffer = io.StringIO()
+        # an unquoted empty field is NULL for COPY, blank strings are already
+        # turned into None by the converters so nothing else is written empty
+        writer = csv.writer(buffer)
+        for row in rows:
+            if all(_ks_is_null(value) for value in row):
+                continue
+            writer.writerow(self._convert(row))
+            count += 1
+            if count % self.chunk_size == 0:
+                self._flush(buffer)
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                if self.progress:
+                    self.progress(count)
+        if count % self.chunk_size:
+            self._flush(buffer)
+        if self.progress:
+            self.progress(count)
+        return count
+
+
+def ks_iter_csv_rows(data):
+    """ Data rows of a CSV file content, header excluded. """
+    reader = csv.reader(io.TextIOWrapper(io.BytesIO(data), encoding='utf-8-sig', newline=''))
+    next(reader, None)
+    yield from reader
+
+
+def ks_iter_excel_rows(data, extension):
+    """ Data rows of the first sheet of an XLSX/XLS file content, header excluded. """
+    if extension == '.xlsx':
+        import openpyxl
+        workbook = openpyxl.load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            next(rows, None)
+            yield from rows
+        finally:
+            workbook.close()
+    elif extension == '.xls':
+        import xlrd
+        book = xlrd.open_workbook(file_contents=data)
+        sheet = book.sheet_by_index(0)
+        for row_no in range(1, sheet.nrows):
+            yield [
+                xlrd.xldate_as_datetime(cell.value, book.datemode) if cell.ctype == xlrd.XL_CELL_DATE else cell.value
+                for cell in sheet.row(row_no)
+            ]
+    else:
+        raise ValueError("Unsupported file format. Only XLSX and XLS are supported.")
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+Columnar assembly of chart data from ``read_group`` results.
+
+Rows are turned into one label column and one value column per measure,
+labels are mapped to their chart position through a dict, and values of
+rows sharing a label are merged in a single pass.
+"""
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def ks_measure_column(rows, field, count_field, same_as_groupby, chart_count):
+    """
+    Values of one measure, one per row.
+    :param count_field: '<groupby field>_count' key of the rows
+    :param same_as_groupby: the measure is the group by field itself
+    :param chart_count: 'sum' multiplies the value by the group count
+    """
+    column = []
+    for res in rows:
+        group_count = res.get('__count', False)
+        if not group_count:
+            column.append(0)
+            continue
+        if chart_count != 'sum':
+            column.append(res[field])
+            continue
+        field_count = res.get(count_field, False)
+        multiplier = (field_count or group_count) if field_count or same_as_groupby else 1
+        column.append(res[field] * multiplier)
+    return column
+
+
+def ks_count_column(rows, count_field):
+    """ Record count of each row. """
+    return [(res.get(count_field, False) or res['__count']) if res.get('__count') else 0 for res in rows]
+
+
+def ks_merge_chart_rows(ks_chart_data, row_labels, columns, chart_count):
+    """
+    Append the rows to ``ks_chart_data`` (in place). Rows whose label is
+    already on the chart are merged into it: summed for 'sum' charts,
+    averaged pairwise in row order otherwise.
+    :param row_labels: label of each row
+    :param columns: list of (dataset index, values of each row)
+    """
+    labels = ks_chart_data['labels']
+    label_index = {}
+    for position, label in enumerate(labels):
+        label_index.setdefault(label, position)
+
+    new_rows = []
+    duplicate_rows = []
+    duplicate_positions = []
+    for row, label in enumerate(row_labels):
+        position = label_index.get(label)
+        if position is None:
+            label_index[label] = len(labels)
+            labels.append(label)
+            new_rows.append(row)
+        else:
+            duplicate_rows.append(row)
+            duplicate_positions.append(position)
+
+    for dataset_index, values in columns:
+        data = ks_chart_data['datasets'][dataset_index]['data']
+        if not duplicate_rows:
+            data.extend(values)
+            continue
+        # every merge targets a label first seen earlier, appending all new
+        # values first and merging afterwards keeps the row order semantics
+        data.extend(values[row] for row in new_rows)
+        duplicate_values = [values[row] for row in duplicate_rows]
+        if chart_count == 'sum':
+            for position, total in _ks_sum_by_position(duplicate_positions, duplicate_values):
+                data[position] += total
+        else:
+            for position, value in zip(duplicate_positions, duplicate_values):
+                data[position] = (data[position] + value) / 2
+    return ks_chart_data
+
+
+def _ks_sum_by_position(positions, values):
+    if numpy is not None and all(isinstance(value, (int, float)) for value in values):
+        totals = numpy.bincount(positions, weights=values)
+        as_int = all(isinstance(value, int) for value in values)
+        return [(position, int(totals[position]) if as_int else float(totals[position]))
+                for position in dict.fromkeys(positions)]
+    totals = {}
+    for position, value in zip(positions, values):
+        totals[position] = totals[position] + value if position in totals else value
+    return totals.items()
+
@@ -3,13 +3,18 @@
 from odoo.fields import datetime
 from odoo import _
 from odoo.exceptions import ValidationError
+from odoo.tools.lru import LRU
 from datetime import timedelta
+import functools
 import pytz
 import os
 import os.path
 from dateutil import rrule
 from dateutil.relativedelta import relativedelta
 
+# date ranges of the filter selections that only depend on the current day:
+# {(selection, timezone, type, local day, server day, week start): range}
+_ks_date_range_cache = LRU(512)
 
 
 def ks_get_date(ks_date_filter_selection, self, type):
@@ -19,27 +24,58 @@ def ks_get_date(ks_date_filter_selection, self, type):
         timezone = self.env.user.tz
 
     if not timezone:
-        ks_tzone = os.environ.get('TZ')
-        if ks_tzone:
-            timezone = ks_tzone
-        elif os.path.exists('/etc/timezone'):
-            ks_tzone = open('/etc/timezone').read()
-            timezone = ks_tzone[0:-1]
-            try:
-                datetime.now(pytz.timezone(timezone))
-            except Exception as e:
-                raise ValidationError(_("Please set the local timezone."))
-
-        else:
+        timezone = os.environ.get('TZ') or ks_system_timezone()
+        if not timezone:
             raise ValidationError(_("Please set the local timezone."))
 
-    series = ks_date_filter_selection
-    if ks_date_filter_selection in ['t_fiscal_year', 'n_fiscal_year', 'ls_fiscal_year']:
-        return eval("ks_date_series_" + series.split("_")[0])(series.split("_")[1], timezone, type,self)
-    else:
-        return eval("ks_date_series_" + series.split("_")[0])(series.split("_")[1], timezone, type, self)
+    range_function, per_day = ks_date_range_function(ks_date_filter_selection)
+    if not per_day:
+        return range_function(timezone, type, self)
+    week_start = False
+    if ks_date_filter_selection.split("_")[1] == 'week':
+        week_start = self.env['res.lang']._lang_get(self.env.user.lang).week_start
+    key = (ks_date_filter_selection, timezone, type, datetime.now(pytz.timezone(timezone)).date(),
+           datetime.today().date(), week_start)
+    ks_date_data = _ks_date_range_cache.get(key)
+    if ks_date_data is None:
+        ks_date_data = _ks_date_range_cache[key] = range_function(timezone, type, self)
+    return dict(ks_date_data)
+
+
+@functools.lru_cache(maxsize=1)
+def ks_system_timezone():
+    """ Timezone configured in /etc/timezone, read once per process. """
+    if not os.path.exists('/etc/timezone'):
+        return False
+    with open('/etc/timezone') as ks_tzone:
+        timezone = ks_tzone.read()[0:-1]
+    try:
+        datetime.now(pytz.timezone(timezone))
+    except Exception as e:
+        return False
+    return timezone
+
+
+def ks_date_range_function(ks_date_filter_selection):
+    """
+    Function computing the range of a date filter selection, called with
+    (timezone, type, self), and whether its result stays the same for the
+    whole day (ranges ending or starting now do not).
+    """
+    series, ks_date_selection = ks_date_filter_selection.split("_")[:2]
+    try:
+        if series == 'l':
+            return functools.partial(ks_date_series_l, ks_date_selection), True
+        if series == 'td':
+            return KS_TO_DATE_RANGES[ks_date_selection], False
+        return (functools.partial(KS_DATE_RANGES[ks_date_selection], KS_DATE_STATES[series]),
+                ks_date_selection not in KS_LIVE_DATE_RANGES)
+    except KeyError:
+        raise ValueError("Unknown date filter selection: %s" % ks_date_filter_selection)
+
+
 def ks_date_series_td(ks_date_selection, timezone, type, self=None):
-    return eval("ks_get_date_range_from_td_" + ks_date_selection)(timezone, type, self)
+    return KS_TO_DATE_RANGES[ks_date_selection](timezone, type, self)
 
 def ks_get_date_range_from_td_year(timezone, type,self):
     ks_date_data = {}
@@ -130,17 +166,17 @@ def ks_date_series_l(ks_date_selection, timezone, type, self=None):
 
 # Current Date Ranges : Week, Month, Quarter, year
 def ks_date_series_t(ks_date_selection, timezone, type, self=None):
-    return eval("ks_get_date_range_from_" + ks_date_selection)("current", timezone, type,self)
+    return KS_DATE_RANGES[ks_date_selection]("current", timezone, type, self)
 
 
 # Previous Date Ranges : Week, Month, Quarter, year
 def ks_date_series_ls(ks_date_selection, timezone, type,self=None):
-    return eval("ks_get_date_range_from_" + ks_date_selection)("previous", timezone, type,self)
+    return KS_DATE_RANGES[ks_date_selection]("previous", timezone, type, self)
 
 
 # Next Date Ranges : Day, Week, Month, Quarter, year
 def ks_date_series_n(ks_date_selection, timezone, type,self=None):
-    return eval("ks_get_date_range_from_" + ks_date_selection)("next", timezone, type, self)
+    return KS_DATE_RANGES[ks_date_selection]("next", timezone, type, self)
 
 
 def ks_get_date_range_from_day(date_state, timezone, type,self):
@@ -325,6 +361,28 @@ def ks_get_date_range_from_futurestarting(date_state, self_tz, type,self):
         ks_date_data["selected_end_date"] = False
     return ks_date_data
 
+KS_DATE_STATES = {'t': 'current', 'ls': 'previous', 'n': 'next'}
+KS_DATE_RANGES = {
+    'day': ks_get_date_range_from_day,
+    'week': ks_get_date_range_from_week,
+    'month': ks_get_date_range_from_month,
+    'quarter': ks_get_date_range_from_quarter,
+    'year': ks_get_date_range_from_year,
+    'past': ks_get_date_range_from_past,
+    'pastwithout': ks_get_date_range_from_pastwithout,
+    'future': ks_get_date_range_from_future,
+    'futurestarting': ks_get_date_range_from_futurestarting,
+}
+KS_TO_DATE_RANGES = {
+    'week': ks_get_date_range_from_td_week,
+    'month': ks_get_date_range_from_td_month,
+    'quarter': ks_get_date_range_from_td_quarter,
+    'year': ks_get_date_range_from_td_year,
+}
+# ranges bounded by the current time
+KS_LIVE_DATE_RANGES = ('past', 'future')
+
+
 def ks_convert_into_utc(datetime, timezone):
     ks_tz = timezone and pytz.timezone(timezone) or pytz.UTC
     return ks_tz.localize(datetime.replace(tzinfo=None), is_dst=False).astimezone(pytz.UTC).replace(tzinfo=None)
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+Domains of the dashboard items, parsed once per domain text.
+
+A domain written as a plain literal is parsed into a template where the
+``%UID`` and ``%MYCOMPANY`` placeholders are slots; rendering it for a user
+only fills the slots of a copy. Domains that are not plain literals are not
+cached and go through text replacement and evaluation every time.
+"""
+
+import ast
+
+from odoo.tools.lru import LRU
+
+KS_DOMAIN_PLACEHOLDERS = ('%UID', '%MYCOMPANY')
+# {domain text: template, or False for texts that are not plain literals}
+_ks_domain_templates = LRU(1024)
+
+
+class KsDomainSlot:
+    __slots__ = ('placeholder',)
+
+    def __init__(self, placeholder):
+        self.placeholder = placeholder
+
+
+def _ks_compile(node):
+    if isinstance(node, str) and node in KS_DOMAIN_PLACEHOLDERS:
+        return KsDomainSlot(node)
+    if isinstance(node, (list, tuple)):
+        return type(node)(_ks_compile(item) for item in node)
+    return node
+
+
+def ks_domain_template(text):
+    """ Template of the domain ``text``, None if it is not a plain literal. """
+    template = _ks_domain_templates.get(text)
+    if template is None:
+        try:
+            template = _ks_compile(ast.literal_eval(text.strip()))
+        except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+            template = False
+        _ks_domain_templates[text] = template
+    return template if template is not False else None
+
+
+def ks_render_domain(template, values):
+    """ Fresh copy of ``template`` with its slots set from ``values``
+    ({placeholder: value}). """
+    if isinstance(template, KsDomainSlot):
+        return values[template.placeholder]
+    if isinstance(template, (list, tuple)):
+        return type(template)(ks_render_domain(item, values) for item in template)
+    return template
+
+
+def ks_fill_placeholders(text, values):
+    """ Text replacement of the quoted placeholders, for non-literal domains. """
+    for placeholder, value in values.items():
+        if placeholder in text:
+            text = text.replace('"%s"' % placeholder, str(value)).replace("'%s'" % placeholder, str(value))
+    return text
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+Time buckets of date-grouped charts, generated directly at the requested
+granularity instead of walking an hourly ``generate_series`` and grouping
+the truncated timestamps.
+"""
+
+from datetime import timedelta
+
+from dateutil.relativedelta import relativedelta
+
+KS_BUCKET_STEPS = {
+    'hour': relativedelta(hours=1),
+    'day': relativedelta(days=1),
+    'week': relativedelta(weeks=1),
+    'month': relativedelta(months=1),
+    'quarter': relativedelta(months=3),
+    'year': relativedelta(years=1),
+}
+
+
+def ks_truncate(value, granularity):
+    """ Python counterpart of PostgreSQL ``date_trunc`` on a timestamp. """
+    if granularity == 'minute':
+        return value.replace(second=0, microsecond=0)
+    if granularity == 'hour':
+        return value.replace(minute=0, second=0, microsecond=0)
+    value = value.replace(hour=0, minute=0, second=0, microsecond=0)
+    if granularity == 'day':
+        return value
+    if granularity == 'week':
+        return value - timedelta(days=value.weekday())
+    if granularity == 'month':
+        return value.replace(day=1)
+    if granularity == 'quarter':
+        return value.replace(month=(value.month - 1) // 3 * 3 + 1, day=1)
+    if granularity == 'year':
+        return value.replace(month=1, day=1)
+    raise ValueError("Unknown granularity: %s" % granularity)
+
+
+def ks_time_buckets(begin, end, granularity):
+    """
+    Start of every ``granularity`` bucket met by an hourly walk from ``begin``
+    to ``end`` (both included), in chronological order.
+    """
+    if end < begin:
+        return []
+    hours = int((end - begin).total_seconds() // 3600)
+    if granularity == 'minute':
+        # finer than the walk: one bucket per visited hour
+        return [ks_truncate(begin + timedelta(hours=hour), 'minute') for hour in range(hours + 1)]
+    last = ks_truncate(begin + timedelta(hours=hours), granularity)
+    step = KS_BUCKET_STEPS[granularity]
+    buckets = []
+    bucket = ks_truncate(begin, granularity)
+    while bucket <= last:
+        buckets.append(bucket)
+        bucket += step
+    return buckets
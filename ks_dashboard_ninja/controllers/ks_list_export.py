@@ -1,21 +1,27 @@
 
 import re
-import io
 import json
 import operator
 import logging
-from odoo.addons.web.controllers.main import ExportFormat, ExportXlsxWriter
+import tempfile
+from odoo.addons.web.controllers.main import ExportFormat
 from odoo.tools.misc import DEFAULT_SERVER_DATETIME_FORMAT, DEFAULT_SERVER_DATE_FORMAT , xlsxwriter
 import datetime
-from odoo import http
+from odoo import http, _
+from odoo.exceptions import UserError
 from odoo.http import content_disposition, request
 from odoo.tools import pycompat
 from ..common_lib.ks_date_filter_selections import ks_get_date, ks_convert_into_utc, ks_convert_into_local
 import os
 import pytz
 from werkzeug.exceptions import InternalServerError
+from werkzeug.wsgi import wrap_file
 _logger = logging.getLogger(__name__)
 
+# limits of the XLSX format, header row included
+XLSX_MAX_ROWS = 1048576
+XLSX_MAX_CELL_LENGTH = 32767
+
 
 class KsListExport(http.Controller):
 
@@ -99,35 +105,41 @@ class KsListExport(http.Controller):
 
         # chart_data['labels'].insert(0,'Measure')
         columns_headers = list_data['label']
-        import_data = []
-
-        for dataset in list_data['data_rows']:
-            if not list_data['type'] == 'grouped':
-                for count, index in enumerate(dataset['ks_column_type']):
-                    if index == 'datetime':
-                        ks_converted_date = False
-                        date_string = dataset['data'][count]
-                        if dataset['data'][count]:
-                            ks_converted_date = ks_convert_into_local(datetime.datetime.strptime(date_string, '%m/%d/%y %H:%M:%S'),ks_timezone)
-                        dataset['data'][count] = ks_converted_date
-            for ks_count, val in enumerate(dataset['data']):
-                if isinstance(val, (float, int)):
-                    if val >= 0:
-                        try:
-                            ks_precision = item.sudo().env.ref('ks_dashboard_ninja.ks_dashboard_ninja_precision').digits
-                        except Exception as e:
-                            ks_precision = 2
-                        dataset['data'][ks_count] = item.env['ir.qweb.field.float'].sudo().value_to_html(val,
-                                                                             {'precision': ks_precision})
-            import_data.append(dataset['data'])
-
-        return request.make_response(self.from_data(columns_headers, import_data),
+        try:
+            ks_precision = item.sudo().env.ref('ks_dashboard_ninja.ks_dashboard_ninja_precision').digits
+        except Exception as e:
+            ks_precision = 2
+        # rows are formatted one at a time while the writer consumes them, the
+        # ungrouped lists of exported items being streamed from the database
+        import_data = (self._ks_export_row(dataset, list_data['type'], item, ks_timezone, ks_precision)
+                       for dataset in list_data['data_rows'])
+        fp = self.from_data(columns_headers, import_data)
+        size = fp.seek(0, os.SEEK_END)
+        fp.seek(0)
+        return request.make_response(wrap_file(request.httprequest.environ, fp),
             headers=[('Content-Disposition',
                             content_disposition(self.filename(header))),
-                     ('Content-Type', self.content_type)],
+                     ('Content-Type', self.content_type),
+                     ('Content-Length', size)],
             # cookies={'fileToken': token}
                                      )
 
+    def _ks_export_row(self, dataset, list_type, item, ks_timezone, ks_precision):
+        if not list_type == 'grouped':
+            for count, index in enumerate(dataset['ks_column_type']):
+                if index == 'datetime':
+                    ks_converted_date = False
+                    date_string = dataset['data'][count]
+                    if dataset['data'][count]:
+                        ks_converted_date = ks_convert_into_local(datetime.datetime.strptime(date_string, '%m/%d/%y %H:%M:%S'),ks_timezone)
+                    dataset['data'][count] = ks_converted_date
+        for ks_count, val in enumerate(dataset['data']):
+            if isinstance(val, (float, int)):
+                if val >= 0:
+                    dataset['data'][ks_count] = item.env['ir.qweb.field.float'].sudo().value_to_html(val,
+                                                                         {'precision': ks_precision})
+        return dataset['data']
+
 
 class KsListExcelExport(KsListExport, http.Controller):
 
@@ -155,12 +167,41 @@ class KsListExcelExport(KsListExport, http.Controller):
         return base + '.xlsx'
 
     def from_data(self, fields, rows):
-        with ExportXlsxWriter(fields, len(rows)) as xlsx_writer:
-            for row_index, row in enumerate(rows):
-                for cell_index, cell_value in enumerate(row):
-                    xlsx_writer.write_cell(row_index + 1, cell_index, cell_value)
-
-        return xlsx_writer.value
+        """ Write the rows one by one into a temporary file, the workbook being
+        built in constant memory mode, and return that file. """
+        fp = tempfile.TemporaryFile()
+        workbook = xlsxwriter.Workbook(fp, {'constant_memory': True})
+        worksheet = workbook.add_worksheet()
+        header_style = workbook.add_format({'bold': True})
+        base_style = workbook.add_format({'text_wrap': True})
+        date_style = workbook.add_format({'text_wrap': True, 'num_format': 'yyyy-mm-dd'})
+        datetime_style = workbook.add_format({'text_wrap': True, 'num_format': 'yyyy-mm-dd hh:mm:ss'})
+        for column, field in enumerate(fields):
+            worksheet.write(0, column, field, header_style)
+        worksheet.set_column(0, max(0, len(fields) - 1), 30)
+
+        for row_index, row in enumerate(rows, 1):
+            if row_index >= XLSX_MAX_ROWS:
+                raise UserError(_('There are too many rows (more than %s) to export as Excel 2007-2013 (.xlsx) '
+                                  'format. Consider splitting the export.', XLSX_MAX_ROWS - 1))
+            for cell_index, cell_value in enumerate(row):
+                cell_style = base_style
+                if isinstance(cell_value, bytes):
+                    cell_value = pycompat.to_text(cell_value)
+                if isinstance(cell_value, str):
+                    if len(cell_value) > XLSX_MAX_CELL_LENGTH:
+                        cell_value = _("The content of this cell is too long for an XLSX file (more than %s "
+                                       "characters). Please use the CSV format for this export.",
+                                       XLSX_MAX_CELL_LENGTH)
+                elif isinstance(cell_value, datetime.datetime):
+                    cell_style = datetime_style
+                elif isinstance(cell_value, datetime.date):
+                    cell_style = date_style
+                elif isinstance(cell_value, (list, tuple, dict)):
+                    cell_value = pycompat.to_text(cell_value)
+                worksheet.write(row_index, cell_index, cell_value, cell_style)
+        workbook.close()
+        return fp
 
 
 class KsListCsvExport(KsListExport, http.Controller):
@@ -186,7 +227,7 @@ class KsListCsvExport(KsListExport, http.Controller):
         return base + '.csv'
 
     def from_data(self, fields, rows):
-        fp = io.BytesIO()
+        fp = tempfile.TemporaryFile()
         writer = pycompat.csv_writer(fp, quoting=1)
 
         writer.writerow(fields)
@@ -201,4 +242,4 @@ class KsListCsvExport(KsListExport, http.Controller):
                 row.append(pycompat.to_text(d))
             writer.writerow(row)
 
-        return fp.getvalue()
+        return fp
@@ -1,5 +1,6 @@
 from . import ks_dashboard_ninja
 from . import ks_dashboard_ninja_items
+from . import ks_dashboard_ninja_item_summary
 from . import ks_item_action
 from . import ks_child_dashboard
 from . import ks_dashboard_filters
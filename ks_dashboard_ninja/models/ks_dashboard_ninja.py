@@ -400,6 +400,7 @@ class KsDashboardNinjaBoard(models.Model):
                 ks_currency_symbol = False
                 ks_currency_position = False
 
+        ks_results = rec._ks_get_item_results(item_domain1, item_domain2)
         item = {
             'name': rec.name if rec.name else rec.ks_model_id.name if rec.ks_model_id else "Name",
             'ks_background_color': rec.ks_background_color,
@@ -414,7 +415,7 @@ class KsDashboardNinjaBoard(models.Model):
             'ks_model_name': rec.ks_model_name,
             'ks_model_display_name': rec.ks_model_id.name,
             'ks_record_count_type': rec.ks_record_count_type,
-            'ks_record_count': rec._ksGetRecordCount(item_domain1),
+            'ks_record_count': ks_results['ks_record_count'],
             'id': rec.id,
             'ks_layout': rec.ks_layout,
             'ks_icon_select': rec.ks_icon_select,
@@ -428,15 +429,15 @@ class KsDashboardNinjaBoard(models.Model):
             'ks_chart_relation_groupby_name': rec.ks_chart_relation_groupby.name,
             'ks_chart_date_groupby': rec.ks_chart_date_groupby,
             'ks_record_field': rec.ks_record_field.id if rec.ks_record_field else False,
-            'ks_chart_data': rec._ks_get_chart_data(item_domain1),
-            'ks_list_view_data': rec._ksGetListViewData(item_domain1),
+            'ks_chart_data': ks_results['ks_chart_data'],
+            'ks_list_view_data': ks_results['ks_list_view_data'],
             'ks_chart_data_count_type': rec.ks_chart_data_count_type,
             'ks_bar_chart_stacked': rec.ks_bar_chart_stacked,
             'ks_semi_circle_chart': rec.ks_semi_circle_chart,
             'ks_list_view_type': rec.ks_list_view_type,
             'ks_list_view_group_fields': rec.ks_list_view_group_fields.ids if rec.ks_list_view_group_fields else False,
             'ks_previous_period': rec.ks_previous_period,
-            'ks_kpi_data': rec._ksGetKpiData(item_domain1, item_domain2),
+            'ks_kpi_data': ks_results['ks_kpi_data'],
             'ks_goal_enable': rec.ks_goal_enable,
             'ks_model_id_2': rec.ks_model_id_2.id,
             'ks_record_field_2': rec.ks_record_field_2.id,
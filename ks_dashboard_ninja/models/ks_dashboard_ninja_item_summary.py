@@ -0,0 +1,456 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import logging
+from datetime import datetime, time, timedelta
+
+from odoo import models, fields, api
+from odoo.osv import expression
+from odoo.tools.safe_eval import safe_eval
+
+_logger = logging.getLogger("DS_NINJA")
+
+# changes committed by transactions running while the summary is refreshed
+# carry an earlier write date, they are picked up again by the next run
+KS_MATERIALIZED_OVERLAP = timedelta(minutes=10)
+# an incremental refresh touching more days than this rebuilds the summary
+KS_MATERIALIZED_MAX_DAYS = 62
+KS_MATERIALIZED_MEASURE_TYPES = ('integer', 'float', 'monetary')
+KS_RULE_COMPANY_OPERATORS = ('=', '!=', 'in', 'not in', 'child_of', 'parent_of')
+
+
+class KsDashboardItemSummary(models.Model):
+    _name = 'ks_dashboard_ninja.item_summary'
+    _description = 'Dashboard Ninja Items Materialized Summary'
+    _log_access = False
+
+    item_id = fields.Many2one('ks_dashboard_ninja.item', required=True, index=True, ondelete='cascade')
+    bucket = fields.Datetime(index=True, help="Start of the hour (datetime fields) or day (date fields)")
+    company_id = fields.Integer()
+    group_key = fields.Char()
+    record_count = fields.Integer()
+    measures = fields.Json(help="{measure field: [sum, count of set values]}")
+
+    def _ks_clear(self, item_id, start=None, end=None, null_bucket=False):
+        query = "DELETE FROM ks_dashboard_ninja_item_summary WHERE item_id = %s"
+        params = [item_id]
+        if null_bucket:
+            query += " AND bucket IS NULL"
+        if start:
+            query += " AND bucket >= %s"
+            params.append(start)
+        if end:
+            query += " AND bucket < %s"
+            params.append(end)
+        self.env.cr.execute(query, params)
+        self.invalidate_model()
+
+
+class KsDashboardNinjaItems(models.Model):
+    _inherit = 'ks_dashboard_ninja.item'
+
+    ks_materialized = fields.Boolean('Materialized',
+                                     help="Answer the item from a pre-aggregated summary refreshed by a scheduled "
+                                          "action instead of aggregating the records on every view. Only used when "
+                                          "the dashboard filters can be answered from the summary.")
+    ks_materialized_refresh_date = fields.Datetime('Summary Refreshed On', readonly=True, copy=False)
+    ks_materialized_signature = fields.Char(readonly=True, copy=False)
+
+    # ------------------------------------------------------------
+    # Summary definition
+    # ------------------------------------------------------------
+
+    def _ks_materialized_spec(self):
+        """ What the summary of the item aggregates, None when the item cannot
+        be materialized (custom query, user dependent domain, ...). """
+        self.ensure_one()
+        if not self.ks_materialized or self.data_source not in (False, 'odoo') \
+                or self.ks_data_calculation_type == 'query' or self.ks_dashboard_item_type in ('ks_list_view', 'ks_to_do') \
+                or not self.ks_model_name or self.ks_model_name not in self.env:
+            return None
+        domain_text = self.ks_domain or '[]'
+        if '%UID' in domain_text or '%MYCOMPANY' in domain_text or self.ks_domain_extension:
+            return None
+        try:
+            base_domain = safe_eval(domain_text)
+        except Exception:
+            return None
+        model = self.env[self.ks_model_name]
+        if model._abstract or not model._auto:
+            return None
+
+        date_field = model._fields.get(self.ks_date_filter_field.name) if self.ks_date_filter_field else None
+        if date_field and not (date_field.store and date_field.type in ('date', 'datetime')):
+            return None
+        group_field = False
+        if self.ks_dashboard_item_type not in ('ks_tile', 'ks_kpi') and not self.ks_chart_relation_sub_groupby \
+                and self.ks_chart_groupby_type in ('relational_type', 'selection'):
+            field = model._fields.get(self.ks_chart_relation_groupby.name)
+            if field and field.store and field.type in ('many2one', 'selection'):
+                group_field = field.name
+        measures = set()
+        for field_rec in self.ks_record_field | self.ks_chart_measure_field | self.ks_chart_measure_field_2 \
+                | self.ks_sort_by_field:
+            field = model._fields.get(field_rec.name)
+            if field and field.store and field.type in KS_MATERIALIZED_MEASURE_TYPES \
+                    and field.group_operator in (None, 'sum'):
+                measures.add(field.name)
+        company_field = model._fields.get('company_id')
+        return {
+            'model': model._name,
+            'domain': base_domain,
+            'date_field': date_field.name if date_field else False,
+            'date_type': date_field.type if date_field else False,
+            'group_field': group_field,
+            'measures': sorted(measures),
+            'company_field': bool(company_field and company_field.store and company_field.type == 'many2one'
+                                  and company_field.comodel_name == 'res.company'),
+        }
+
+    @api.model
+    def _ks_materialized_signature(self, spec):
+        return hashlib.sha1(repr(sorted(spec.items())).encode()).hexdigest()
+
+    # ------------------------------------------------------------
+    # Refresh
+    # ------------------------------------------------------------
+
+    @api.model
+    def _ks_cron_refresh_materialized(self, full=False):
+        items = self.search(['|', ('ks_materialized', '=', True), ('ks_materialized_signature', '!=', False)])
+        for item in items:
+            try:
+                with self.env.cr.savepoint():
+                    item._ks_refresh_materialized(full=full)
+            except Exception:
+                _logger.exception("Refresh of the summary of item %s failed", item.id)
+
+    def _ks_refresh_materialized(self, full=False):
+        """ Bring the summary up to date: buckets holding records written since
+        the last refresh are recomputed, the whole summary is rebuilt when the
+        item definition changed, on ``full`` or when records were deleted. """
+        summary = self.env['ks_dashboard_ninja.item_summary'].sudo()
+        for item in self:
+            spec = item._ks_materialized_spec()
+            if not spec:
+                if item.ks_materialized_signature:
+                    summary._ks_clear(item.id)
+                    item.write({'ks_materialized_signature': False, 'ks_materialized_refresh_date': False})
+                continue
+            signature = self._ks_materialized_signature(spec)
+            refresh_date = fields.Datetime.now()
+            rebuild = full or signature != item.ks_materialized_signature or not item.ks_materialized_refresh_date
+            if not rebuild:
+                ranges = item._ks_materialized_changed_ranges(spec, item.ks_materialized_refresh_date -
+                                                              KS_MATERIALIZED_OVERLAP)
+                if ranges is None:
+                    rebuild = True
+                elif not ranges:
+                    continue
+                else:
+                    for start, end, null_bucket in ranges:
+                        summary._ks_clear(item.id, start, end, null_bucket)
+                        item._ks_materialize(spec, start, end, null_bucket)
+                    rebuild = item._ks_materialized_count() != \
+                        self.env[spec['model']].sudo().search_count(spec['domain'])
+            if rebuild:
+                summary._ks_clear(item.id)
+                item._ks_materialize(spec)
+            item.write({'ks_materialized_signature': signature, 'ks_materialized_refresh_date': refresh_date})
+            _logger.info("Summary of item %s refreshed (%s)", item.id, 'rebuilt' if rebuild else 'incremental')
+
+    def _ks_materialized_changed_ranges(self, spec, since):
+        """ Bucket ranges (start, end, null bucket) holding records written
+        since ``since``, None when the whole summary should be rebuilt. """
+        model = self.env[spec['model']].sudo().with_context(active_test=False)
+        if not spec['date_field']:
+            return None if model.search_count([('write_date', '>=', since)], limit=1) else []
+        days = set()
+        null_bucket = False
+        for value in model.search_fetch([('write_date', '>=', since)], [spec['date_field']]).mapped(
+                lambda record: record[spec['date_field']]):
+            if value:
+                days.add(value if spec['date_type'] == 'date' else value.date())
+            else:
+                null_bucket = True
+        if len(days) > KS_MATERIALIZED_MAX_DAYS:
+            return None
+        ranges = [(None, None, True)] if null_bucket else []
+        for day in sorted(days):
+            start = datetime.combine(day, time.min)
+            if ranges and ranges[-1][1] == start:
+                ranges[-1] = (ranges[-1][0], start + timedelta(days=1), False)
+            else:
+                ranges.append((start, start + timedelta(days=1), False))
+        return ranges
+
+    def _ks_materialize(self, spec, start=None, end=None, null_bucket=False):
+        """ Aggregate the source records of the given bucket range into the summary. """
+        model = self.env[spec['model']].sudo().with_context(tz='UTC')
+        date_field = spec['date_field']
+        domain = list(spec['domain'])
+        if null_bucket:
+            domain.append((date_field, '=', False))
+        if start:
+            domain.append((date_field, '>=', start.date() if spec['date_type'] == 'date' else start))
+        if end:
+            domain.append((date_field, '<', end.date() if spec['date_type'] == 'date' else end))
+        groupby = []
+        if date_field:
+            groupby.append('%s:%s' % (date_field, 'day' if spec['date_type'] == 'date' else 'hour'))
+        if spec['group_field']:
+            groupby.append(spec['group_field'])
+        if spec['company_field']:
+            groupby.append('company_id')
+        measures = spec['measures']
+        aggregates = ['__count'] + ['%s:sum' % name for name in measures] + ['%s:count' % name for name in measures]
+
+        vals_list = []
+        for row in model._read_group(domain, groupby, aggregates):
+            values = list(row)
+            bucket = values.pop(0) if date_field else False
+            group_value = values.pop(0) if spec['group_field'] else False
+            company = values.pop(0) if spec['company_field'] else False
+            record_count = values.pop(0)
+            if not record_count:
+                continue
+            if bucket and spec['date_type'] == 'date':
+                bucket = datetime.combine(bucket, time.min)
+            if isinstance(group_value, models.BaseModel):
+                group_value = group_value.id
+            vals_list.append({
+                'item_id': self.id,
+                'bucket': bucket or False,
+                'company_id': company.id if company else False,
+                'group_key': str(group_value) if group_value else False,
+                'record_count': record_count,
+                'measures': {name: [values[index] or 0, values[len(measures) + index]]
+                             for index, name in enumerate(measures)},
+            })
+        self.env['ks_dashboard_ninja.item_summary'].sudo().create(vals_list)
+
+    def _ks_materialized_count(self):
+        self.env.cr.execute("SELECT SUM(record_count) FROM ks_dashboard_ninja_item_summary WHERE item_id = %s",
+                            [self.id])
+        return self.env.cr.fetchone()[0] or 0
+
+    # ------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------
+
+    def _ks_materialized_read(self, domain, group_field=False):
+        """ Aggregates of the records matching ``domain`` read from the summary,
+        as {group key: (count, {measure: (sum, count of set values)})}, or None
+        when ``domain`` cannot be answered from the buckets. """
+        self.ensure_one()
+        if not self.ks_materialized or not self.ks_materialized_refresh_date:
+            return None
+        spec = self._ks_materialized_spec()
+        if not spec or self._ks_materialized_signature(spec) != self.ks_materialized_signature \
+                or (group_field and group_field != spec['group_field']):
+            return None
+        if not self.env[spec['model']].check_access_rights('read', raise_exception=False):
+            return None
+        bounds = self._ks_materialized_bounds(spec, domain)
+        companies = self._ks_materialized_companies(spec)
+        if bounds is None or companies is None:
+            return None
+
+        measures = spec['measures']
+        columns = ["group_key" if group_field else "NULL", "SUM(record_count)"]
+        params = []
+        for name in measures:
+            columns.append("SUM((measures->%s->>0)::float8)")
+            columns.append("SUM((measures->%s->>1)::int8)")
+            params.extend([name, name])
+        query = "SELECT %s FROM ks_dashboard_ninja_item_summary WHERE item_id = %%s" % ", ".join(columns)
+        params.append(self.id)
+        start, end = bounds
+        if start:
+            query += " AND bucket >= %s"
+            params.append(start)
+        if end:
+            query += " AND bucket < %s"
+            params.append(end)
+        company_ids, include_null = companies
+        if company_ids is not None:
+            query += " AND (company_id = ANY(%s) OR company_id IS NULL)" if include_null else \
+                " AND company_id = ANY(%s)"
+            params.append(company_ids)
+        if group_field:
+            query += " GROUP BY group_key"
+        self.env.cr.execute(query, params)
+
+        fields_map = self.env[spec['model']]._fields
+        result = {}
+        for row in self.env.cr.fetchall():
+            totals = {}
+            for index, name in enumerate(measures):
+                total = row[2 + 2 * index] or 0
+                totals[name] = (int(total) if fields_map[name].type == 'integer' else total,
+                                row[3 + 2 * index] or 0)
+            result[row[0]] = (row[1] or 0, totals)
+        return result
+
+    def _ks_materialized_bounds(self, spec, domain):
+        """ Bucket range (start, end excluded) selected by the date leaves
+        appended to the item domain, None when they do not fall on bucket
+        boundaries or the domain holds anything else. """
+        base_domain = spec['domain']
+        if list(domain[:len(base_domain)]) != list(base_domain):
+            return None
+        start = end = None
+        for leaf in domain[len(base_domain):]:
+            if not (isinstance(leaf, (list, tuple)) and len(leaf) == 3 and leaf[0] == spec['date_field']
+                    and leaf[1] in ('>=', '<=')):
+                return None
+            try:
+                value = fields.Datetime.to_datetime(leaf[2])
+            except (ValueError, TypeError):
+                return None
+            if not value:
+                return None
+            if spec['date_type'] == 'date':
+                value = datetime.combine(value.date(), time.min)
+                if leaf[1] == '<=':
+                    value += timedelta(days=1)
+            else:
+                if leaf[1] == '<=':
+                    # datetimes are stored to the second
+                    value += timedelta(seconds=1)
+                if value != value.replace(minute=0, second=0, microsecond=0):
+                    return None
+            if leaf[1] == '>=':
+                start = max(start, value) if start else value
+            else:
+                end = min(end, value) if end else value
+        return start, end
+
+    def _ks_materialized_companies(self, spec):
+        """ Summary rows the current user may read, as (company ids or None for
+        all, whether records without company are readable), None when the
+        record rules of the model depend on more than the company. """
+        if self.env.su:
+            return None, True
+        rule_domain = self.env['ir.rule']._compute_domain(spec['model'], 'read')
+        if not rule_domain:
+            return None, True
+        if not spec['company_field']:
+            return None
+        rule_domain = expression.normalize_domain(rule_domain)
+        company_model = self.env['res.company'].sudo().with_context(active_test=False)
+        matching = {}
+        for token in rule_domain:
+            if expression.is_operator(token) or tuple(token) in (expression.TRUE_LEAF, expression.FALSE_LEAF):
+                continue
+            if token[0] != 'company_id' or token[1] not in KS_RULE_COMPANY_OPERATORS:
+                return None
+            matching[repr(token)] = set(company_model.search([('id', token[1], token[2])]).ids)
+
+        def leaf_matches(token, company_id):
+            if tuple(token) in (expression.TRUE_LEAF, expression.FALSE_LEAF):
+                return tuple(token) == expression.TRUE_LEAF
+            if company_id:
+                return company_id in matching[repr(token)]
+            operator, value = token[1], token[2]
+            if operator == '=':
+                return not value
+            if operator == '!=':
+                return bool(value)
+            if operator == 'in':
+                return False in value
+            if operator == 'not in':
+                return False not in value
+            return False
+
+        def domain_matches(company_id):
+            stack = []
+            for token in reversed(rule_domain):
+                if token == '!':
+                    stack.append(not stack.pop())
+                elif token in ('&', '|'):
+                    first, second = stack.pop(), stack.pop()
+                    stack.append(first and second if token == '&' else first or second)
+                else:
+                    stack.append(leaf_matches(token, company_id))
+            return all(stack)
+
+        return [company_id for company_id in company_model.search([]).ids if domain_matches(company_id)], \
+            domain_matches(False)
+
+    def _ks_materialized_fetch(self, model_name, func, domain):
+        """ ``search_count`` / ungrouped ``read_group`` of the item record field
+        answered from the summary, None when it cannot be. """
+        if not self.ks_materialized or model_name != self.ks_model_name:
+            return None
+        field_name = self.ks_record_field.name
+        summary = self._ks_materialized_read(domain)
+        if summary is None:
+            return None
+        count, totals = summary.get(None, (0, {}))
+        if func == 'search_count':
+            return count
+        if func == 'read_group' and field_name in totals:
+            return [{'__count': count, field_name: totals[field_name][0]}]
+        return None
+
+    def _ks_materialized_chart_records(self, model_name, domain, measure_fields_with_type, groupby, orderby, limit):
+        """ ``read_group`` rows of a chart grouped by a relational or selection
+        field answered from the summary, None when they cannot be. """
+        if not self.ks_materialized or model_name != self.ks_model_name:
+            return None
+        aggregates = []
+        for measure in measure_fields_with_type:
+            if ':' not in measure:
+                return None
+            name, aggregate = measure.split(':', 1)
+            if aggregate == 'count(id)':
+                aggregate = 'count'
+            elif aggregate not in ('sum', 'avg'):
+                return None
+            aggregates.append((name, aggregate))
+        summary = self._ks_materialized_read(domain, groupby)
+        if summary is None or any(aggregate != 'count' and name not in totals
+                                  for name, aggregate in aggregates for _count, totals in summary.values()):
+            return None
+
+        field = self.env[model_name]._fields[groupby]
+        keys = [key for key in summary if key]
+        if field.type == 'many2one':
+            groups = self.env[field.comodel_name].sudo().with_context(active_test=False) \
+                .browse(int(key) for key in keys).sorted()
+            values = {str(group.id): (group.id, group.display_name) for group in groups}
+            keys = [str(group.id) for group in groups]
+        else:
+            values = {key: key for key in keys}
+            keys.sort()
+        if None in summary:
+            keys.append(None)
+
+        rows = []
+        for key in keys:
+            count, totals = summary[key]
+            value = values.get(key, False) if key else False
+            res = {groupby: value, '__count': count,
+                   '__domain': expression.AND([domain, [(groupby, '=', value[0] if field.type == 'many2one' and key
+                                                         else (key or False))]])}
+            for name, aggregate in aggregates:
+                if aggregate == 'count':
+                    res[name] = count
+                elif aggregate == 'sum':
+                    res[name] = totals[name][0]
+                else:
+                    res[name] = totals[name][0] / totals[name][1] if totals[name][1] else None
+            rows.append(res)
+
+        order = (orderby or '').split()
+        if order:
+            name, descending = order[0], len(order) > 1 and order[1].lower() == 'desc'
+            if name == groupby:
+                if descending:
+                    rows.reverse()
+            elif name in ('count', '__count') or name in dict(aggregates):
+                sort_key = '__count' if name in ('count', '__count') else name
+                rows.sort(key=lambda res: res[sort_key] or 0, reverse=descending)
+            else:
+                return None
+        return rows[:limit] if limit else rows
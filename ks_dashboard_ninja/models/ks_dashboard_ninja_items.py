@@ -22,9 +22,54 @@ from odoo import models, fields, api, _
 from odoo.exceptions import ValidationError, UserError
 from odoo.addons.ks_dashboard_ninja.common_lib.ks_date_filter_selections import ks_get_date, ks_convert_into_utc, \
     ks_convert_into_local
+from odoo.addons.ks_dashboard_ninja.common_lib.ks_chart_aggregation import ks_count_column, ks_measure_column, \
+    ks_merge_chart_rows
+from odoo.addons.ks_dashboard_ninja.common_lib.ks_bulk_loader import KsCopyLoader, ks_custom_column_name, \
+    ks_iter_csv_rows, ks_iter_excel_rows
+from odoo.addons.ks_dashboard_ninja.common_lib.ks_time_series import ks_time_buckets
+from odoo.addons.ks_dashboard_ninja.common_lib.ks_domain_template import ks_domain_template, ks_render_domain, \
+    ks_fill_placeholders
 from .ks_country_bounds import get_country_code
+import copy
 import logging
+import time
+import uuid
+from odoo.tools.lru import LRU
+from odoo.tools.sql import SQL
 _logger = logging.getLogger("DS_NINJA")
+
+# Query results of the dashboard items, shared by all users of the worker:
+# {cache key: (expires_at, results)}, see ``_ks_get_item_results``.
+KS_RESULT_CACHE_SIZE = 4096
+_ks_result_cache = LRU(KS_RESULT_CACHE_SIZE)
+# context keys set by the dashboard date filter
+KS_DATE_FILTER_KEYS = ('ksDateFilterSelection', 'ksDateFilterStartDate', 'ksDateFilterEndDate',
+                       'ksIsDefultCustomDateFilter')
+# formatted labels of date-grouped charts:
+# {(begin, end, granularity, field type, format, lang, tz): labels}
+_ks_time_label_cache = LRU(512)
+# field types an ungrouped list can be paged on with a seek (sort value, id)
+KS_LIST_SEEK_TYPES = ('char', 'integer', 'float', 'monetary', 'date', 'datetime', 'selection')
+# ids fetched per round trip of the server-side cursor of list exports
+KS_LIST_EXPORT_BATCH = 2000
+KS_TIMESERIES_DISPLAY_FORMATS = {
+    # Careful with week/year formats:
+    #  - yyyy (lower) must always be used, except for week+year formats
+    #  - YYYY (upper) must always be used for week+year format
+    #         e.g. 2006-01-01 is W52 2005 in some locales (de_DE),
+    #                         and W1 2006 for others
+    #
+    # Mixing both formats, e.g. 'MMM YYYY' would yield wrong results,
+    # such as 2006-01-01 being formatted as "January 2005" in some locales.
+    # Cfr: http://babel.pocoo.org/en/latest/dates.html#date-fields
+    'minute': 'hh:mm dd MMM',
+    'hour': 'hh:00 dd MMM',
+    'day': 'dd MMM yyyy',  # yyyy = normal year
+    'week': "'W'w YYYY",  # w YYYY = ISO week-year
+    'month': 'MMMM yyyy',
+    'quarter': 'QQQ yyyy',
+    'year': 'yyyy',
+}
 # TODO : Check all imports if needed
 
 
@@ -591,6 +636,9 @@ class KsDashboardNinjaItems(models.Model):
                                        domain="[('name','!=','App Store'),('name','!=','Updates'),('res_model','not ilike','ks_dashboard_ninja.%'),('name','!=','Discuss')]",
                                        help="This Action will be Performed at the end of Drill Down Action")
     ks_pagination_limit = fields.Integer('Pagination Limit', default=15)
+    ks_cache_ttl = fields.Integer('Result Cache Lifetime (s)', default=60,
+                                  help="Item data is served from cache for at most this many seconds, changes to "
+                                       "the records of its model show up once it expires. Set 0 to disable caching.")
 
     ks_multiplier_lines = fields.One2many('ks_dashboard_item.multiplier', 'ks_dashboard_item_id',
 
@@ -967,21 +1015,13 @@ class KsDashboardNinjaItems(models.Model):
             'order': 'x_name asc, id desc',  # valid order
         })
         for value in dict:
-            column_name = value.get('name')
+            column_name = ks_custom_column_name(value.get('name'))
             column_type = value.get('type')
-            if '/' in column_name:
-                column_name = value.get('name').replace('/', '_')
-            if ' ' in column_name:
-                column_name = value.get('name').replace(' ', '_')
-            if '(' and ')' in column_name:
-                column_name = value.get('name').replace(')', '').replace('(', '')
-            if column_name == 'name':
-                column_name = column_name.replace('name', 'name1')
             model_creation.write({
                     'field_id': [(0, 0, {
-                        'name': 'x_'+column_name,
+                        'name': column_name,
                         'ttype': column_type,
-                        'field_description': column_name.replace('_', ' ')
+                        'field_description': value.get('name')
                     })]
                 })
         self.env['ir.model.access'].sudo().create({
@@ -998,179 +1038,27 @@ class KsDashboardNinjaItems(models.Model):
         # Inserting data into the ir model table.
     def insert_data_into_table(self, tablemodel):
         if self.upload_excel:
+            extension = os.path.splitext(self.filename)[1]
             try:
-                fp = tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx")
-                fp.write(binascii.a2b_base64(self.upload_excel))
-                fp.seek(0)
-                file_type = os.path.splitext(self.filename)
-                if file_type[1] == ".xlsx":
-                    df = pd.read_excel(fp.name, engine='openpyxl')
-                elif file_type[1] == ".xls":
-                    df = pd.read_excel(fp.name, engine='xlrd')
-                else:
-                    raise ValueError("Unsupported file format. Only XLSX and XLS are supported.")
+                data = binascii.a2b_base64(self.upload_excel)
+                rows = ks_iter_excel_rows(data, extension)
+                self._ks_bulk_load_table(tablemodel, self.ks_group_by_lines, rows)
             except Exception as e:
-                raise ValidationError("Invalid file")
-            df = df.astype(str)
-            values ={}
-            fields = df.columns.tolist()
-            for row_no in range(df.shape[0]):
-                    line = list(df.iloc[row_no])
-                    val = {}
-                    value = 0
-                    for field in fields:
-                        if '/' in field:
-                            field = field.replace('/', ' ')
-                        if ' ' in field:
-                            field = field.replace(' ', '_')
-                        if '(' and ')' in field:
-                            field = field.replace(')', '').replace('(', '')
-                        if field == 'Name':
-                            field = field.replace('Name', 'name1')
-                        if 'Date' in field or 'Deadline' in field:
-                            if line[value] != 'NaT' and line[value] !=False:
-                                if self.ks_group_by_lines[value].ttype == 'datetime':
-                                    # final_date = pd.to_timedelta(float(line[value]), unit='D') + pd.to_datetime('1899-12-30')
-                                    while (value < len(line)):
-                                        values.update({
-                                            field: line[value],
-                                        })
-                                        value = value + 1
-                                        break
-                                else:
-                                    while (value < len(line)):
-                                        values.update({
-                                            field: line[value],
-                                        })
-                                        value = value + 1
-                                        break
-                            else:
-                                while (value < len(line)):
-                                    values.update({
-                                        field: 'Null',
-                                    })
-                                    value = value + 1
-                                    break
-                        else:
-                            while (value < len(line)):
-                                if line[value] != 'nan' and  line[value] !=False:
-                                    if '.' in line[value]:
-                                        if ',' in line[value]:
-                                            if self.ks_group_by_lines[value].ttype == 'char':
-                                                split = line[value].split(',')
-                                                split_value = ''
-                                                for res in split:
-                                                    split_value += res
-                                                final_split = split_value.split('.')
-                                                final_split_value = ''
-                                                for final_res in final_split:
-                                                    final_split_value += final_res
-                                                values.update({
-                                                    field: final_split_value,
-                                                })
-                                            else:
-                                                split = line[value].split(',')
-                                                split_value = split[0] + split[1]
-                                                final_value = float(split_value)
-                                                values.update({
-                                                    field: final_value,
-                                                })
-                                        elif '@' in line[value]:
-                                            values.update({
-                                                field: line[value],
-                                            })
-                                        else:
-                                            # final_value = (line[value])
-                                            if self.ks_group_by_lines[value].ttype == 'integer' and line[value]!='nan':
-                                                try:
-                                                    values.update({
-                                                        field: int(float(line[value])),
-                                                    })
-                                                except:
-                                                    values.update({
-                                                        field: 0,
-                                                    })
-                                            elif self.ks_group_by_lines[value].ttype == 'float'and line[value]!='nan':
-                                                try:
-                                                    values.update({
-                                                        field: float(line[value]),
-                                                    })
-                                                except:
-                                                    values.update({
-                                                        field: 0.00,
-                                                    })
-                                            elif line[value] == 'nan':
-                                                values.update({
-                                                    field: 'Null',
-                                                })
+                raise ValidationError("found error while Table creation {}".format(e))
 
-                                            else:
-                                                values.update({
-                                                    field: line[value],
-                                                })
-                                    elif "'" and '+' in line[value]:
-                                        split_value = line[value].split('+')
-                                        final_split = '+' + split_value[1]
-                                        values.update({
-                                            field: final_split,
-                                        })
-                                    elif "'" in line[value]:
-                                        split_value = line[value].split("'")
-                                        final_split_value = ''
-                                        for res in split_value:
-                                            final_split_value += res
-                                        values.update({
-                                            field: final_split_value,
-                                        })
-                                    elif "NaT" in line[value]:
-                                        values.update({
-                                            field:'Null',
-                                        })
-                                    elif  self.ks_group_by_lines[value].ttype == 'integer' and line[value]!='nan':
-                                        try:
-                                            values.update({
-                                                field: int(float(line[value])),
-                                            })
-                                        except:
-                                            values.update({
-                                                field: 0,
-                                            })
-                                    elif self.ks_group_by_lines[value].ttype == 'float' and line[value] != 'nan':
-                                        try:
-                                            values.update({
-                                                field: float(line[value]),
-                                            })
-                                        except:
-                                            values.update({
-                                                field: 0.00,
-                                            })
-                                    else:
-                                        values.update({
-                                            field: line[value],
-                                        })
-                                    value = value + 1
-                                    break
-                                else:
-                                    values.update({
-                                        field: 'Null',
-                                    })
-                                    value = value + 1
-                                    break
-                    final_values = []
-                    final_heading = []
-                    try:
-                        for final in values:
-                            if values.get(final) != 'Null':
-                                final_values.append(str(values.get(final)))
-                                final_heading.append('x_' + final.lower().replace(' ', '_'))
-                        resultString = ", ".join(["'{}'".format(item) for item in final_values if item])
-                        resultHeading = ", ".join(['{}'.format(item) for item in final_heading if item])
-                        if resultString and resultHeading != "":
-                            data_query = """INSERT INTO {} ({}) VALUES ({})""".format(tablemodel, resultHeading, resultString)
-                            self.env.cr.execute(data_query)
-                    except Exception as e:
-                        raise ValidationError("found error while Table creation {}".format(e))
-                    self._cr.commit()
+    def _ks_bulk_load_table(self, tablemodel, group_by_lines, rows):
+        """ Stream ``rows`` into the table of ``tablemodel`` with COPY, in the
+        current transaction. Columns map positionally onto ``group_by_lines``. """
+        columns = [(ks_custom_column_name(line.name), line.ttype) for line in group_by_lines]
+        self.env.flush_all()
+        start = time.time()
+
+        def progress(count):
+            _logger.info("Loading %s: %s rows copied in %.2fs", tablemodel, count, time.time() - start)
+
+        count = KsCopyLoader(self.env.cr, tablemodel, columns, progress=progress).load(rows)
+        self.env.invalidate_all()
+        return count
 
     def csv_create_table(self):
         records = self.ks_csv_group_by_lines
@@ -1205,21 +1093,13 @@ class KsDashboardNinjaItems(models.Model):
             'order': 'x_name asc, id desc',  # valid order
         })
         for value in dict:
-            column_name = value.get('name')
+            column_name = ks_custom_column_name(value.get('name'))
             column_type = value.get('type')
-            if '/' in column_name:
-                column_name = value.get('name').replace('/', '_')
-            if ' ' in column_name:
-                column_name = value.get('name').replace(' ', '_')
-            if '(' and ')' in column_name:
-                column_name = value.get('name').replace(')', '').replace('(', '')
-            if column_name == 'name':
-                column_name = column_name.replace('name', 'name1')
             model_creation.write({
                     'field_id': [(0, 0, {
-                        'name': 'x_'+column_name,
+                        'name': column_name,
                         'ttype': column_type,
-                        'field_description': column_name.replace('_', ' ')
+                        'field_description': value.get('name')
                     })]
                 })
         self.env['ir.model.access'].sudo().create({
@@ -1235,166 +1115,11 @@ class KsDashboardNinjaItems(models.Model):
 
     def insert_data_into_csv_table(self, tablemodel):
         if self.ks_csv_field:
-            fp = tempfile.NamedTemporaryFile(delete=False, suffix=".csv")
-            fp.write(binascii.a2b_base64(self.ks_csv_field))
-            fp.seek(0)
-
-            with open(fp.name, 'r', encoding='utf-8') as csvfile:
-                csv_reader = csv.reader(csvfile)
-                fields = []
-                values = {}
-                field_values = {}
-                header_row = next(csv_reader)
-                for row in header_row:
-                    fields.append(row)
-                    field_values[row] = None
-                for line in csv_reader:
-                    value = 0
-                    for field in fields:
-                        if ' ' in field:
-                            field = field.replace(' ', '_')
-                        if '/' in field:
-                            field = field.replace('/', ' ')
-                        if '(' and ')' in field:
-                            field = field.replace(')', '').replace('(', '')
-                        if field == 'Name':
-                            field = field.replace('Name', 'name1')
-                        if 'Date' in field or 'Deadline' in field:
-                            if line[value]:
-                                if self.ks_csv_group_by_lines[value].ttype == 'datetime':
-                                    final_date = line[value].split(' ')[0]
-                                    while (value < len(line)):
-                                        values.update({
-                                            field: final_date,
-                                        })
-                                        value = value + 1
-                                        break
-                                else:
-                                    while (value < len(line)):
-                                        values.update({
-                                            field: line[value],
-                                        })
-                                        value = value + 1
-                                        break
-                            else:
-                                while (value < len(line)):
-                                    values.update({
-                                        field: 'Null',
-                                    })
-                                    value = value + 1
-                                    break
-                        else:
-                            while (value < len(line)):
-                                if line[value]:
-                                    if '$' in line[value]:
-                                        line[value] = line[value].replace('$', '')
-                                    if '-' in line[value]:
-                                        line[value] = line[value].replace('-', '')
-                                    if '(' and ')' in line[value]:
-                                        line[value] = line[value].replace(')', '').replace('(', '')
-                                    if '.' in line[value]:
-                                        if ',' in line[value]:
-                                            if self.ks_csv_group_by_lines[value].ttype == 'char':
-                                                split = line[value].split(',')
-                                                split_value = ''
-                                                for res in split:
-                                                    split_value += res
-                                                final_split = split_value.split('.')
-                                                final_split_value = ''
-                                                for final_res in final_split:
-                                                    final_split_value += final_res
-                                                values.update({
-                                                    field: final_split_value,
-                                                })
-                                            else:
-                                                split = line[value].split(',')
-                                                split_value = split[0] + split[1]
-                                                if self.ks_csv_group_by_lines[value].ttype == 'float':
-                                                    values.update({
-                                                        field: float(split_value),
-                                                    })
-                                                elif self.ks_csv_group_by_lines[value].ttype == 'integer':
-                                                    values.update({
-                                                        field: int(float(split_value)),
-                                                    })
-                                                else:
-                                                    values.update({
-                                                        field: split_value,
-                                                    })
-                                        elif '@' in line[value]:
-                                            values.update({
-                                                field: line[value],
-                                            })
-                                        else:
-                                            if self.ks_csv_group_by_lines[value].ttype == 'float':
-                                                values.update({
-                                                    field: float(line[value]),
-                                                })
-                                            elif self.ks_csv_group_by_lines[value].ttype == 'integer':
-                                                values.update({
-                                                    field: int(float(line[value])),
-                                                })
-                                            else:
-                                                values.update({
-                                                    field: line[value],
-                                                })
-                                    elif "'" and '+' in line[value]:
-                                        split_value = line[value].split('+')
-                                        final_split = '+' + split_value[1]
-                                        values.update({
-                                            field: final_split,
-                                        })
-                                    elif "'" in line[value]:
-                                        split_value = line[value].split("'")
-                                        final_split_value = ''
-                                        for res in split_value:
-                                            final_split_value += res
-                                        values.update({
-                                            field: final_split_value,
-                                        })
-                                    elif line[value] == '    ':
-                                        values.update({
-                                            field: 'Null',
-                                        })
-                                        value = value + 1
-                                        break
-                                    elif self.ks_csv_group_by_lines[value].ttype == 'float':
-                                        values.update({
-                                                    field: float(line[value]),
-                                        })
-                                    elif self.ks_csv_group_by_lines[value].ttype == 'integer':
-                                        values.update({
-                                            field: int(float(line[value])),
-                                        })
-                                    else:
-                                        values.update({
-                                            field: line[value],
-                                        })
-                                    value = value + 1
-                                    break
-                                else:
-                                    values.update({
-                                        field: 'Null',
-                                    })
-                                    value = value + 1
-                                    break
-                    final_values = []
-                    final_heading = []
-                    try:
-                        for final in values:
-                            if values.get(final) != 'Null':
-                                final_values.append(str(values.get(final)))
-                                final_heading.append('x_' + final.lower().replace(' ', '_'))
-                        resultString = ", ".join(["'{}'".format(item) for item in final_values if item])
-                        resultHeading = ", ".join(['{}'.format(item) for item in final_heading if item])
-                        if resultString and resultHeading != "":
-                            data_query = """INSERT INTO {} ({}) VALUES ({})""".format(tablemodel, resultHeading,
-                                                                                      resultString)
-                            self.env.cr.execute(data_query)
-                    except Exception as e:
-                        raise ValidationError("found error while Table creation error {}".format(e))
-                    self._cr.commit()
-
+            try:
+                rows = ks_iter_csv_rows(binascii.a2b_base64(self.ks_csv_field))
+                self._ks_bulk_load_table(tablemodel, self.ks_csv_group_by_lines, rows)
+            except Exception as e:
+                raise ValidationError("found error while Table creation error {}".format(e))
 
     def check_target(self):
         base_url = self.env['ir.config_parameter'].sudo().get_param('web.base.url')
@@ -1886,6 +1611,52 @@ class KsDashboardNinjaItems(models.Model):
         for rec in self:
             rec.ks_record_count = rec._ksGetRecordCount(domain=[])
 
+    def _ks_get_item_results(self, domain1=[], domain2=[]):
+        """ Query backed data of the item, served from the result cache for
+        ks_cache_ttl seconds while neither the item nor the viewer context
+        changed. """
+        self.ensure_one()
+        key = self._ks_result_cache_key(domain1, domain2)
+        entry = _ks_result_cache.get(key) if key else None
+        if entry and entry[0] > time.monotonic():
+            return copy.deepcopy(entry[1])
+        results = {
+            'ks_record_count': self._ksGetRecordCount(domain1),
+            'ks_chart_data': self._ks_get_chart_data(domain1),
+            'ks_list_view_data': self._ksGetListViewData(domain1),
+            'ks_kpi_data': self._ksGetKpiData(domain1, domain2),
+        }
+        if key:
+            _ks_result_cache[key] = (time.monotonic() + self.ks_cache_ttl, copy.deepcopy(results))
+        return results
+
+    def _ks_result_cache_key(self, domain1, domain2):
+        """ Everything the item results depend on: item definition, effective
+        domain, date filter, companies, language/timezone and the record rules
+        and groups of the viewer. Changes to the source records are bounded by
+        the TTL, checking them would cost a query per fetch. """
+        if not self.ks_cache_ttl or self.data_source not in (False, 'odoo') or self.ks_data_calculation_type == 'query':
+            return None
+        model_names = [name for name in (self.ks_model_name, self.ks_model_name_2) if name and name in self.env]
+        if not model_names:
+            return None
+        now = fields.Datetime.now()
+        date_filter = []
+        for key in KS_DATE_FILTER_KEYS:
+            value = self._context.get(key)
+            if isinstance(value, datetime) and abs(value - now) < timedelta(minutes=1):
+                # "to date" ranges end at the current time, the TTL bounds their staleness
+                value = 'now'
+            date_filter.append(str(value))
+        user_dependent = '%UID' in (self.ks_domain or '') + (self.ks_domain_2 or '')
+        return (
+            self.env.cr.dbname, self.id, self.write_date, repr(domain1), repr(domain2), tuple(date_filter),
+            self.env.company.id, tuple(self.env.companies.ids), self.env.lang, self._context.get('tz'),
+            fields.Date.context_today(self), self.env.uid if user_dependent else None, self.env.su,
+            tuple(self.env.user.groups_id.ids),
+            tuple(repr(self.env['ir.rule']._compute_domain(name, 'read')) for name in model_names),
+        )
+
     def _ksGetRecordCount(self, domain=[]):
         rec = self
         if rec.ks_record_count_type == 'count' or rec.ks_dashboard_item_type == 'ks_list_view':
@@ -1918,6 +1689,9 @@ class KsDashboardNinjaItems(models.Model):
         try:
             if ks_domain and ks_domain != '[]' and ks_model_name:
                 proper_domain = self.ks_convert_into_proper_domain(ks_domain, rec, domain)
+                data = rec._ks_materialized_fetch(ks_model_name, ks_func, proper_domain)
+                if data is not None:
+                    return data
                 if ks_func == 'search_count':
                     data = self.env[ks_model_name].search_count(proper_domain)
                 elif ks_func == 'read_group':
@@ -1925,6 +1699,9 @@ class KsDashboardNinjaItems(models.Model):
             elif ks_model_name:
                 # Have to put extra if condition here because on load,model giving False value
                 proper_domain = self.ks_convert_into_proper_domain(False, rec, domain)
+                data = rec._ks_materialized_fetch(ks_model_name, ks_func, proper_domain)
+                if data is not None:
+                    return data
                 if ks_func == 'search_count':
                     data = self.env[ks_model_name].search_count(proper_domain)
 
@@ -1937,12 +1714,6 @@ class KsDashboardNinjaItems(models.Model):
         return data
 
     def ks_convert_into_proper_domain(self, ks_domain, rec, domain=[]):
-        if ks_domain and "%UID" in ks_domain:
-            ks_domain = ks_domain.replace('"%UID"', str(self.env.user.id))
-
-        if ks_domain and "%MYCOMPANY" in ks_domain:
-            ks_domain = ks_domain.replace('"%MYCOMPANY"', str(self.env.company.id))
-
         ks_date_domain = False
         if rec.ks_date_filter_field:
             if not rec.ks_date_filter_selection or rec.ks_date_filter_selection == "l_none":
@@ -2048,7 +1819,7 @@ class KsDashboardNinjaItems(models.Model):
         else:
             ks_date_domain = []
 
-        proper_domain = safe_eval(ks_domain) if ks_domain else []
+        proper_domain = self.ks_compiled_domain(ks_domain) if ks_domain else []
         if ks_date_domain:
             proper_domain.extend(ks_date_domain)
         if rec.ks_domain_extension:
@@ -2060,19 +1831,20 @@ class KsDashboardNinjaItems(models.Model):
         return proper_domain
 
     def ks_convert_domain_extension(self, ks_extensiom_domain, rec):
-        if ks_extensiom_domain and "%UID" in ks_extensiom_domain:
-            ks_extensiom_domain = ks_extensiom_domain.replace('"%UID"', str(self.env.user.id))
-            if "%UID" in ks_extensiom_domain:
-                ks_extensiom_domain = ks_extensiom_domain.replace("'%UID'", str(self.env.user.id))
-                print(ks_extensiom_domain)
-
-        if ks_extensiom_domain and "%MYCOMPANY" in ks_extensiom_domain:
-            ks_extensiom_domain = ks_extensiom_domain.replace('"%MYCOMPANY"', str(self.env.company.id))
-            if "%MYCOMPANY" in ks_extensiom_domain:
-                ks_extensiom_domain = ks_extensiom_domain.replace("'%MYCOMPANY'", str(self.env.company.id))
-
-        ks_domain = eval(ks_extensiom_domain)
-        return ks_domain
+        return self.ks_compiled_domain(ks_extensiom_domain, evaluate=eval)
+
+    def ks_compiled_domain(self, ks_domain, evaluate=safe_eval):
+        """
+        Domain of the text ``ks_domain`` for the current user and company.
+        The text is parsed once into a template (see ``ks_domain_template``)
+        which is then only filled, ``evaluate`` is used for texts that are
+        not plain literals.
+        """
+        values = {'%UID': self.env.user.id, '%MYCOMPANY': self.env.company.id}
+        template = ks_domain_template(ks_domain)
+        if template is not None:
+            return ks_render_domain(template, values)
+        return evaluate(ks_fill_placeholders(ks_domain, values))
 
     @api.onchange('ks_domain_extension')
     def ks_onchange_domain_extension(self):
@@ -2414,19 +2186,17 @@ class KsDashboardNinjaItems(models.Model):
                                 ks_goal_doamins.insert(0, '&')
                                 ks_goal_domains[goal_domain] = ks_goal_doamins
 
-                            domains = {}
-                            counter = 0
-                            for label in ks_chart_data['labels']:
-                                domains[label] = ks_chart_data['domains'][counter]
-                                counter += 1
-
-                            ks_chart_records_dates = ks_chart_data['labels'] + list(
-                                set(ks_goal_labels) - set(ks_chart_data['labels']))
+                            domains = dict(zip(ks_chart_data['labels'], ks_chart_data['domains']))
+                            # first position of each label, as list.index() would give
+                            chart_index = {}
+                            for index, label in enumerate(ks_chart_data['labels']):
+                                chart_index.setdefault(label, index)
+                            goal_index = {}
+                            for index, label in enumerate(ks_goal_labels):
+                                goal_index.setdefault(label, index)
 
-                            ks_chart_records = []
-                            for label in labels:
-                                if label in ks_chart_records_dates:
-                                    ks_chart_records.append(label)
+                            ks_chart_records = [label for label in labels if label in chart_index or
+                                                label in goal_index]
 
                             ks_chart_data['domains'].clear()
                             datasets = []
@@ -2442,23 +2212,12 @@ class KsDashboardNinjaItems(models.Model):
                                     ks_chart_data['domains'].append(domain)
                                 else:
                                     ks_chart_data['domains'].append(ks_goal_domains.get(label, []))
-                                counterr = 0
-                                if label in ks_chart_data['labels']:
-                                    index = ks_chart_data['labels'].index(label)
+                                index = chart_index.get(label)
+                                for counterr, dataset in enumerate(ks_chart_data['datasets']):
+                                    dataset['data'].append(datasets[counterr][index] if index is not None else 0.00)
 
-                                    for dataset in ks_chart_data['datasets']:
-                                        dataset['data'].append(datasets[counterr][index])
-                                        counterr += 1
-
-                                else:
-                                    for dataset in ks_chart_data['datasets']:
-                                        dataset['data'].append(0.00)
-
-                                if label in ks_goal_labels:
-                                    index = ks_goal_labels.index(label)
-                                    goal_dataset.append(ks_goal_dataset[index])
-                                else:
-                                    goal_dataset.append(0.00)
+                                index = goal_index.get(label)
+                                goal_dataset.append(ks_goal_dataset[index] if index is not None else 0.00)
 
                             ks_chart_data['labels'] = ks_chart_records
                         else:
@@ -3185,13 +2944,8 @@ class KsDashboardNinjaItems(models.Model):
                 ks_goal_doamins.insert(0, '&')
                 ks_goal_domains[goal_domain] = ks_goal_doamins
 
-            ks_chart_records_dates = ks_list_labels + list(
-                set(ks_goal_labels) - set(ks_list_labels))
-
-            ks_list_labels_dates = []
-            for label in labels:
-                if label in ks_chart_records_dates:
-                    ks_list_labels_dates.append(label)
+            ks_chart_records_dates = set(ks_list_labels) | set(ks_goal_labels)
+            ks_list_labels_dates = [label for label in labels if label in ks_chart_records_dates]
 
             for label in ks_list_labels_dates:
                 data_rows = {'data': [label], 'ks_column_type': [],'store':True}
@@ -3265,7 +3019,15 @@ class KsDashboardNinjaItems(models.Model):
         return ks_list_view_data
 
     @api.model
-    def ks_fetch_list_view_data(self, rec, ks_chart_domain, limit=15, offset=0, ks_export_all=False, initial_count=0):
+    def ks_fetch_list_view_data(self, rec, ks_chart_domain, limit=15, offset=0, ks_export_all=False, initial_count=0,
+                                seek=None):
+        """
+        Rows of an ungrouped list item. Pages are sought from the edge of the
+        displayed page when ``seek`` carries its key ({'after': key} or
+        {'before': key}, see ``seek_keys`` in the result) and read at
+        ``offset`` otherwise. With ``ks_export_all``, ``data_rows`` is a
+        generator streaming every row from a server-side cursor.
+        """
         ks_list_view_data = {'label': [], 'fields': [], 'fields_type': [],
                              'store': [], 'type': 'ungrouped',
                              'data_rows': [], 'model': self.ks_model_name}
@@ -3308,31 +3070,172 @@ class KsDashboardNinjaItems(models.Model):
             ks_list_view_fields = [res.name for res in self.ks_list_view_fields]
             ks_list_view_field_type = [res.ttype for res in self.ks_list_view_fields]
         try:
-            ks_list_view_records = self.env[self.ks_model_name].search_read(ks_chart_domain,
-                                                                            ks_list_view_fields,
-                                                                            order=orderby, limit=limit, offset=offset)
+            if ks_export_all:
+                ks_list_view_data['data_rows'] = self._ks_stream_list_view_rows(
+                    ks_chart_domain, ks_list_view_fields, ks_list_view_field_type, orderby, limit)
+                return ks_list_view_data
+            seek_field = self._ks_list_view_seek_field()
+            if seek_field is not None:
+                ks_list_view_records, ks_list_view_data['seek_keys'] = self._ks_seek_list_view_records(
+                    ks_chart_domain, ks_list_view_fields, seek_field, limit, offset, seek or {})
+            else:
+                ks_list_view_records = self.env[self.ks_model_name].search_read(ks_chart_domain,
+                                                                                ks_list_view_fields,
+                                                                                order=orderby, limit=limit,
+                                                                                offset=offset)
         except Exception as e:
             ks_list_view_data = False
             return ks_list_view_data
+        ks_selections = self._ks_list_view_selections(ks_list_view_fields, ks_list_view_field_type)
         for res in ks_list_view_records:
-            counter = 0
-            data_row = {'id': res['id'], 'data': [], 'ks_column_type': []}
-            for field_rec in ks_list_view_fields:
-                if type(res[field_rec]) == fields.datetime or type(res[field_rec]) == fields.date:
-                    res[field_rec] = res[field_rec].strftime("%D %T")
-                elif ks_list_view_field_type[counter] == "many2one":
-                    if res[field_rec]:
-                        res[field_rec] = res[field_rec][1]
-                elif ks_list_view_field_type[counter] == "selection" and res.get(field_rec, False):
-                    res[field_rec] = dict(self.env[rec.ks_model_name].fields_get(allfields=[field_rec])
-                                          [field_rec]['selection'])[res[field_rec]]
-                data_row['data'].append(res[field_rec])
-                data_row['ks_column_type'].append(ks_list_view_field_type[counter])
-                counter += 1
-            ks_list_view_data['data_rows'].append(data_row)
+            ks_list_view_data['data_rows'].append(
+                self._ks_list_view_row(res, ks_list_view_fields, ks_list_view_field_type, ks_selections))
 
         return ks_list_view_data
 
+    def _ks_list_view_selections(self, ks_list_view_fields, ks_list_view_field_type):
+        """ {field name: {value: label}} of the selection columns of the list. """
+        selection_fields = [name for name, ttype in zip(ks_list_view_fields, ks_list_view_field_type)
+                            if ttype == 'selection']
+        if not selection_fields:
+            return {}
+        fields_info = self.env[self.ks_model_name].fields_get(allfields=selection_fields, attributes=['selection'])
+        return {name: dict(info['selection']) for name, info in fields_info.items()}
+
+    @api.model
+    def _ks_list_view_row(self, res, ks_list_view_fields, ks_list_view_field_type, ks_selections):
+        data_row = {'id': res['id'], 'data': [], 'ks_column_type': []}
+        for field_rec, field_type in zip(ks_list_view_fields, ks_list_view_field_type):
+            value = res[field_rec]
+            if type(value) == fields.datetime or type(value) == fields.date:
+                value = value.strftime("%D %T")
+            elif field_type == "many2one":
+                if value:
+                    value = value[1]
+            elif field_type == "selection" and value:
+                value = ks_selections[field_rec][value]
+            data_row['data'].append(value)
+            data_row['ks_column_type'].append(field_type)
+        return data_row
+
+    def _ks_list_view_seek_field(self):
+        """
+        Column the ungrouped list can be sought on, together with the id as
+        tie-breaker: the sort field name, '' when the list is sorted on the id
+        alone, None when its order does not allow seeking.
+        """
+        model = self.env[self.ks_model_name]
+        if not self.ks_sort_by_field:
+            return '' if model._order.strip().lower() in ('id', 'id asc', 'id desc') else None
+        field = model._fields.get(self.ks_sort_by_field.name)
+        if field and field.store and field.column_type and not field.inherited and not field.translate \
+                and field.type in KS_LIST_SEEK_TYPES:
+            return field.name
+        return None
+
+    def _ks_list_view_descending(self):
+        if self.ks_sort_by_field:
+            return (self.ks_sort_by_order or '').strip().upper() == 'DESC'
+        return self.env[self.ks_model_name]._order.strip().lower().endswith('desc')
+
+    def _ks_seek_list_view_records(self, domain, ks_list_view_fields, seek_field, limit, offset, seek):
+        """
+        Read one page of the list ordered on (``seek_field``, id), starting
+        right after (or ending right before) the key given in ``seek``, at
+        ``offset`` when there is no usable key. NULL values sort as the
+        largest ones, as PostgreSQL does by default.
+        :return: (records read, [key of the first row, key of the last row])
+        """
+        model = self.env[self.ks_model_name]
+        descending = self._ks_list_view_descending()
+        backward = bool(seek.get('before'))
+        key = seek.get('before') or seek.get('after')
+        if not key or len(key) != 3 or key[0] != seek_field:
+            key = backward = False
+
+        # reading backward walks the list in the reverse order
+        reverse = descending != backward
+        direction = 'desc' if reverse else 'asc'
+        order = 'id %s' % direction
+        if seek_field:
+            order = '%s %s nulls %s, %s' % (seek_field, direction, 'first' if reverse else 'last', order)
+        query = model._search(domain, order=order, limit=limit or None, offset=0 if key else offset)
+        if key:
+            query.add_where(self._ks_seek_condition(model._table, seek_field, key[1], key[2], not reverse))
+        self.env.cr.execute(query.select())
+        ids = [row[0] for row in self.env.cr.fetchall()]
+        if backward:
+            ids.reverse()
+        if not ids:
+            return [], False
+
+        records = model.browse(ids).read(ks_list_view_fields)
+        keys = {record_id: [seek_field, None, record_id] for record_id in (ids[0], ids[-1])}
+        if seek_field:
+            self.env.cr.execute(SQL("SELECT id, %s FROM %s WHERE id IN %s",
+                                    SQL.identifier(seek_field), SQL.identifier(model._table), tuple(keys)))
+            for record_id, value in self.env.cr.fetchall():
+                # dates, datetimes and numerics go through JSON as text
+                keys[record_id][1] = value if value is None or isinstance(value, (str, int, float)) else str(value)
+        return records, [keys[ids[0]], keys[ids[-1]]]
+
+    @api.model
+    def _ks_seek_condition(self, table, seek_field, value, record_id, upward):
+        """ Rows past (``seek_field``, id) = (``value``, ``record_id``), toward the
+        largest values when ``upward``, NULL being larger than any value. """
+        id_column = SQL.identifier(table, 'id')
+        id_operator = SQL('>' if upward else '<')
+        if not seek_field:
+            return SQL("%s %s %s", id_column, id_operator, record_id)
+        column = SQL.identifier(table, seek_field)
+        if upward and value is None:
+            return SQL("(%s IS NULL AND %s > %s)", column, id_column, record_id)
+        if upward:
+            return SQL("(%s > %s OR (%s = %s AND %s > %s) OR %s IS NULL)",
+                       column, value, column, value, id_column, record_id, column)
+        if value is None:
+            return SQL("(%s IS NOT NULL OR %s < %s)", column, id_column, record_id)
+        return SQL("(%s < %s OR (%s = %s AND %s < %s))", column, value, column, value, id_column, record_id)
+
+    def _ks_stream_list_view_rows(self, domain, ks_list_view_fields, ks_list_view_field_type, orderby, limit):
+        """
+        Generator of the rows of the list for exports: ids are fetched in
+        batches from a named (server-side) cursor of the current transaction
+        and read batch by batch, so that memory does not grow with the number
+        of exported records. The query runs and the first batch is read right
+        away, so that their errors are raised to the caller.
+        """
+        model = self.env[self.ks_model_name]
+        query = model._search(domain, order=orderby or None, limit=limit or None)
+        if query.is_empty():
+            return iter(())
+        ks_selections = self._ks_list_view_selections(ks_list_view_fields, ks_list_view_field_type)
+        self.env.flush_all()
+        sql = query.select()
+        cursor = self.env.cr._cnx.cursor('ks_list_export_%s' % uuid.uuid4().hex)
+        cursor.itersize = KS_LIST_EXPORT_BATCH
+        try:
+            cursor.execute(sql.code, sql.params)
+            records = model.browse([row[0] for row in cursor.fetchmany(KS_LIST_EXPORT_BATCH)]).read(ks_list_view_fields)
+        except Exception:
+            cursor.close()
+            raise
+        return self._ks_iter_list_view_rows(model, cursor, records, ks_list_view_fields, ks_list_view_field_type,
+                                            ks_selections)
+
+    def _ks_iter_list_view_rows(self, model, cursor, records, ks_list_view_fields, ks_list_view_field_type,
+                                ks_selections):
+        """ Rows of the records already read, then of the next batches of ids of ``cursor``. """
+        try:
+            while records:
+                for res in records:
+                    yield self._ks_list_view_row(res, ks_list_view_fields, ks_list_view_field_type, ks_selections)
+                model.invalidate_model()
+                ids = [row[0] for row in cursor.fetchmany(KS_LIST_EXPORT_BATCH)]
+                records = model.browse(ids).read(ks_list_view_fields) if ids else []
+        finally:
+            cursor.close()
+
     @api.onchange('ks_dashboard_item_type')
     def set_color_palette(self):
         for rec in self:
@@ -3433,15 +3336,18 @@ class KsDashboardNinjaItems(models.Model):
             if rec.ks_record_count_type == 'count':
                 ks_record_count = 0
                 try:
-                    ks_record_count = self.env[rec.ks_model_name].search_count(proper_domain)
+                    ks_record_count = rec._ks_materialized_fetch(rec.ks_model_name, 'search_count', proper_domain)
+                    if ks_record_count is None:
+                        ks_record_count = self.env[rec.ks_model_name].search_count(proper_domain)
                 except Exception as E:
                     ks_record_count = 0
                 return ks_record_count
 
             elif rec.ks_record_field:
                 try:
-                    data = \
-                        self.env[rec.ks_model_name].read_group(proper_domain, [rec.ks_record_field.name], [], lazy=False)[0]
+                    data = rec._ks_materialized_fetch(rec.ks_model_name, 'read_group', proper_domain) or \
+                        self.env[rec.ks_model_name].read_group(proper_domain, [rec.ks_record_field.name], [], lazy=False)
+                    data = data[0]
                 except Exception as E:
                     data = {}
                 if rec.ks_record_count_type == 'sum':
@@ -3563,11 +3469,6 @@ class KsDashboardNinjaItems(models.Model):
                 rec.ks_item_end_date_2 = ks_date_data["selected_end_date"]
 
     def ks_convert_into_proper_domain_2(self, ks_domain_2, rec, domain=[]):
-        if ks_domain_2 and "%UID" in ks_domain_2:
-            ks_domain_2 = ks_domain_2.replace('"%UID"', str(self.env.user.id))
-        if ks_domain_2 and "%MYCOMPANY" in ks_domain_2:
-            ks_domain_2 = ks_domain_2.replace('"%MYCOMPANY"', str(self.env.company.id))
-
         ks_date_domain = False
 
         if rec.ks_date_filter_field_2:
@@ -3677,7 +3578,7 @@ class KsDashboardNinjaItems(models.Model):
         else:
             ks_date_domain = []
 
-        proper_domain = safe_eval(ks_domain_2) if ks_domain_2 else []
+        proper_domain = self.ks_compiled_domain(ks_domain_2) if ks_domain_2 else []
         if ks_date_domain:
             proper_domain.extend(ks_date_domain)
         if rec.ks_domain_extension_2:
@@ -3700,124 +3601,63 @@ class KsDashboardNinjaItems(models.Model):
         else:
             ks_chart_groupby_field = ks_chart_groupby_relation_field
 
-        try:
-            if self.ks_fill_temporal and ks_chart_date_groupby not in ['minute', 'hour']:
-                ks_chart_records = self.env[ks_model_name].with_context(fill_temporal=True) \
-                    .read_group(ks_chart_domain,
-                                list(set(ks_chart_measure_field_with_type + ks_chart_measure_field_with_type_2 +
-                                         [ks_chart_groupby_relation_field])), [ks_chart_groupby_field],
-                                orderby=orderby, limit=limit, lazy=False)
-            else:
-                ks_chart_records = self.env[ks_model_name] \
-                    .read_group(ks_chart_domain,
-                                list(set(ks_chart_measure_field_with_type + ks_chart_measure_field_with_type_2 +
-                                         [ks_chart_groupby_relation_field])), [ks_chart_groupby_field],
-                                orderby=orderby, limit=limit, lazy=False)
-        except Exception as e:
-            ks_chart_records = []
-            pass
+        ks_chart_records = None
+        if ks_chart_groupby_type in ('relational_type', 'selection'):
+            ks_chart_records = self._ks_materialized_chart_records(
+                ks_model_name, ks_chart_domain, ks_chart_measure_field_with_type + ks_chart_measure_field_with_type_2,
+                ks_chart_groupby_field, orderby, limit)
+        if ks_chart_records is None:
+            try:
+                if self.ks_fill_temporal and ks_chart_date_groupby not in ['minute', 'hour']:
+                    ks_chart_records = self.env[ks_model_name].with_context(fill_temporal=True) \
+                        .read_group(ks_chart_domain,
+                                    list(set(ks_chart_measure_field_with_type + ks_chart_measure_field_with_type_2 +
+                                             [ks_chart_groupby_relation_field])), [ks_chart_groupby_field],
+                                    orderby=orderby, limit=limit, lazy=False)
+                else:
+                    ks_chart_records = self.env[ks_model_name] \
+                        .read_group(ks_chart_domain,
+                                    list(set(ks_chart_measure_field_with_type + ks_chart_measure_field_with_type_2 +
+                                             [ks_chart_groupby_relation_field])), [ks_chart_groupby_field],
+                                    orderby=orderby, limit=limit, lazy=False)
+            except Exception as e:
+                ks_chart_records = []
         ks_chart_data['groupby'] = ks_chart_groupby_field
         if ks_chart_groupby_type == "relational_type":
             ks_chart_data['groupByIds'] = []
 
-        for res in ks_chart_records:
-            is_ks_index = False
-            ks_index = False
-            if all(measure_field in res for measure_field in ks_chart_measure_field):
-                if ks_chart_groupby_type == "relational_type":
-                    if res[ks_chart_groupby_field]:
-                        ks_chart_data['groupByIds'].append(res[ks_chart_groupby_field][0])
-                        label = res[ks_chart_groupby_field][1]
-                    else:
-                        label = res[ks_chart_groupby_field]
-                elif ks_chart_groupby_type == "selection":
-                    selection = res[ks_chart_groupby_field]
-                    if selection:
-                        label = dict(self.env[ks_model_name].fields_get(allfields=[ks_chart_groupby_field])
-                                     [ks_chart_groupby_field]['selection'])[selection]
-                    else:
-                        label = selection
-                else:
-                    label = res[ks_chart_groupby_field]
-
-                ks_chart_data['domains'].append(res.get('__domain', []))
-                if label in ks_chart_data['labels']:
-                    ks_index = ks_chart_data['labels'].index(label)
-                    is_ks_index = True
-
-                else:
-                    ks_chart_data['labels'].append(label)
-
-                counter = 0
-                if ks_chart_measure_field:
-                    if ks_chart_measure_field_2:
-                        index = 0
-                        for field_rec in ks_chart_measure_field_2:
-                            ks_groupby_equal_measures = res.get(ks_chart_groupby_relation_field + "_count",
-                                                                False) or res.get("__count", False) \
-                                if res.get(ks_chart_groupby_relation_field + "_count", False) or res.get("__count",
-                                                                                                         False) \
-                                   and ks_chart_measure_field_2_ids[index] == ks_chart_groupby_relation_field_id \
-                                else 1
-                            try:
-                                if res.get('__count', False):
-                                    data = res[field_rec] * ks_groupby_equal_measures \
-                                        if chart_count == 'sum' else \
-                                        res[field_rec]
-                                else:
-                                    data = 0
-                                if is_ks_index:
-                                    if chart_count == 'sum':
-                                        ks_chart_data['datasets'][counter]['data'][ks_index] += data
-                                    else:
-                                        ks_chart_data['datasets'][counter]['data'][ks_index] = \
-                                            (ks_chart_data['datasets'][counter]['data'][ks_index] + data) / 2
-                                    counter += 1
-                                    index += 1
-                                    continue
-                            except ZeroDivisionError:
-                                data = 0
-                            ks_chart_data['datasets'][counter]['data'].append(data)
-                            counter += 1
-                            index += 1
-
-                    index = 0
-                    for field_rec in ks_chart_measure_field:
-                        ks_groupby_equal_measures = res.get(ks_chart_groupby_relation_field + "_count",
-                                                            False) or res.get("__count", False) \
-                            if res.get(ks_chart_groupby_relation_field + "_count", False) or res.get("__count", False) \
-                               and ks_chart_measure_field_ids[index] == ks_chart_groupby_relation_field_id \
-                            else 1
-                        try:
-                            if res.get('__count', False):
-                                data = res[field_rec] * ks_groupby_equal_measures \
-                                    if chart_count == 'sum' else \
-                                    res[field_rec]
-                            else:
-                                data = 0
-                            if is_ks_index:
-                                if chart_count == 'sum':
-                                    ks_chart_data['datasets'][counter]['data'][ks_index] += data
-                                else:
-                                    ks_chart_data['datasets'][counter]['data'][ks_index] = \
-                                        (ks_chart_data['datasets'][counter]['data'][ks_index] + data) / 2
-                                counter += 1
-                                index += 1
-                                continue
-                        except ZeroDivisionError:
-                            data = 0
-                        ks_chart_data['datasets'][counter]['data'].append(data)
-                        counter += 1
-                        index += 1
-
-                else:
-                    if res.get('__count'):
-                        count = res[ks_chart_groupby_relation_field + "_count"] \
-                            if res.get((ks_chart_groupby_relation_field + "_count"), False) else res['__count']
-                    else:
-                        count = 0
-                    data = count
-                    ks_chart_data['datasets'][0]['data'].append(data)
+        rows = [res for res in ks_chart_records if all(measure_field in res for measure_field in ks_chart_measure_field)]
+        if ks_chart_groupby_type == "relational_type":
+            ks_chart_data['groupByIds'].extend(
+                res[ks_chart_groupby_field][0] for res in rows if res[ks_chart_groupby_field])
+            row_labels = [res[ks_chart_groupby_field][1] if res[ks_chart_groupby_field] else res[ks_chart_groupby_field]
+                          for res in rows]
+        elif ks_chart_groupby_type == "selection":
+            # selection labels resolved once per item instead of once per row
+            selection = dict(self.env[ks_model_name].fields_get(allfields=[ks_chart_groupby_field])
+                             [ks_chart_groupby_field]['selection']) if rows else {}
+            row_labels = [selection[res[ks_chart_groupby_field]] if res[ks_chart_groupby_field]
+                          else res[ks_chart_groupby_field] for res in rows]
+        else:
+            row_labels = [res[ks_chart_groupby_field] for res in rows]
+        ks_chart_data['domains'].extend(res.get('__domain', []) for res in rows)
+
+        count_field = ks_chart_groupby_relation_field + "_count"
+        if ks_chart_measure_field:
+            # datasets of the second measures come first
+            measures = [(field_rec, field_id) for field_rec, field_id in
+                        zip(ks_chart_measure_field_2 or [], ks_chart_measure_field_2_ids)] + \
+                       [(field_rec, field_id) for field_rec, field_id in
+                        zip(ks_chart_measure_field, ks_chart_measure_field_ids)]
+            columns = [
+                (counter, ks_measure_column(rows, field_rec, count_field,
+                                            field_id == ks_chart_groupby_relation_field_id, chart_count))
+                for counter, (field_rec, field_id) in enumerate(measures)
+            ]
+            ks_merge_chart_rows(ks_chart_data, row_labels, columns, chart_count)
+        else:
+            ks_merge_chart_rows(ks_chart_data, row_labels, [], chart_count)
+            ks_chart_data['datasets'][0]['data'].extend(ks_count_column(rows, count_field))
 
         return ks_chart_data
 
@@ -4095,14 +3935,10 @@ class KsDashboardNinjaItems(models.Model):
                               ks_goal_domain):
         ks_start_end_date = {}
         try:
-            model_field_start_date = \
-                self.env[model_name].search(ks_chart_domain + [(ks_chart_groupby_relation_field, '!=', False)], limit=1,
-                                            order=ks_chart_groupby_relation_field + " ASC")[
-                    ks_chart_groupby_relation_field]
-            model_field_end_date = \
-                self.env[model_name].search(ks_chart_domain + [(ks_chart_groupby_relation_field, '!=', False)], limit=1,
-                                            order=ks_chart_groupby_relation_field + " DESC")[
-                    ks_chart_groupby_relation_field]
+            # first and last dates in a single aggregate query
+            model_field_start_date, model_field_end_date = self.env[model_name]._read_group(
+                ks_chart_domain + [(ks_chart_groupby_relation_field, '!=', False)], [],
+                [ks_chart_groupby_relation_field + ':min', ks_chart_groupby_relation_field + ':max'])[0]
         except Exception as e:
             model_field_start_date = model_field_end_date = False
             pass
@@ -4117,12 +3953,8 @@ class KsDashboardNinjaItems(models.Model):
         #                                                         order='ks_goal_date DESC')['ks_goal_date']
         # else:
 
-        goal_model_start_date = \
-            self.env['ks_dashboard_ninja.item_goal'].search(ks_goal_domain, limit=1,
-                                                            order='ks_goal_date ASC')['ks_goal_date']
-        goal_model_end_date = \
-            self.env['ks_dashboard_ninja.item_goal'].search(ks_goal_domain, limit=1,
-                                                            order='ks_goal_date DESC')['ks_goal_date']
+        goal_model_start_date, goal_model_end_date = self.env['ks_dashboard_ninja.item_goal']._read_group(
+            ks_goal_domain, [], ['ks_goal_date:min', 'ks_goal_date:max'])[0]
 
         if model_field_start_date and ttype == "date":
             model_field_end_date = datetime.combine(model_field_end_date, datetime.min.time())
@@ -4165,7 +3997,8 @@ class KsDashboardNinjaItems(models.Model):
             ks_list_view_data = self.get_list_view_record(orderby, sort_order, ks_list_domain, ksoffset=int(ks_offset))
 
         else:
-            ks_list_view_data = self.ks_fetch_list_view_data(record, ks_list_domain, offset=int(ks_offset))
+            seek = {direction: offset[direction] for direction in ('after', 'before') if offset.get(direction)}
+            ks_list_view_data = self.ks_fetch_list_view_data(record, ks_list_domain, offset=int(ks_offset), seek=seek)
 
         return {
             'ks_list_view_data': json.dumps(ks_list_view_data),
@@ -4176,62 +4009,27 @@ class KsDashboardNinjaItems(models.Model):
 
     @api.model
     def get_sorted_month(self, display_format, ftype='date'):
-        query = """
-                    with d as (SELECT date_trunc(%(aggr)s, generate_series) AS timestamp FROM generate_series
-                    (%(timestamp_begin)s::TIMESTAMP , %(timestamp_end)s::TIMESTAMP , %(aggr1)s::interval ))
-                     select timestamp from d group by timestamp order by timestamp
-                        """
-        self.env.cr.execute(query, {
-            'timestamp_begin': "2020-01-01 00:00:00",
-            'timestamp_end': "2020-12-31 00:00:00",
-            'aggr': 'month',
-            'aggr1': '1 month'
-        })
-
-        dates = self.env.cr.fetchall()
-        locale = self._context.get('lang') or 'en_US'
-        tz_convert = self._context.get('tz')
-        return [self.format_label(d[0], ftype, display_format, tz_convert, locale) for d in dates]
+        return self._ks_time_labels("2020-01-01 00:00:00", "2020-12-31 00:00:00", 'month', ftype, display_format)
 
     # Fix Order BY : maybe revert old code
     @api.model
     def generate_timeserise(self, date_begin, date_end, aggr, ftype='date'):
-        query = """
-                    with d as (SELECT date_trunc(%(aggr)s, generate_series) AS timestamp FROM generate_series
-                    (%(timestamp_begin)s::TIMESTAMP , %(timestamp_end)s::TIMESTAMP , '1 hour'::interval )) 
-                    select timestamp from d group by timestamp order by timestamp
-                """
-
-        self.env.cr.execute(query, {
-            'timestamp_begin': date_begin,
-            'timestamp_end': date_end,
-            'aggr': aggr,
-            'aggr1': '1 ' + aggr
-        })
-        dates = self.env.cr.fetchall()
-        display_formats = {
-            # Careful with week/year formats:
-            #  - yyyy (lower) must always be used, except for week+year formats
-            #  - YYYY (upper) must always be used for week+year format
-            #         e.g. 2006-01-01 is W52 2005 in some locales (de_DE),
-            #                         and W1 2006 for others
-            #
-            # Mixing both formats, e.g. 'MMM YYYY' would yield wrong results,
-            # such as 2006-01-01 being formatted as "January 2005" in some locales.
-            # Cfr: http://babel.pocoo.org/en/latest/dates.html#date-fields
-            'minute': 'hh:mm dd MMM',
-            'hour': 'hh:00 dd MMM',
-            'day': 'dd MMM yyyy',  # yyyy = normal year
-            'week': "'W'w YYYY",  # w YYYY = ISO week-year
-            'month': 'MMMM yyyy',
-            'quarter': 'QQQ yyyy',
-            'year': 'yyyy',
-        }
+        return self._ks_time_labels(date_begin, date_end, aggr, ftype, KS_TIMESERIES_DISPLAY_FORMATS[aggr])
 
-        display_format = display_formats[aggr]
+    @api.model
+    def _ks_time_labels(self, date_begin, date_end, aggr, ftype, display_format):
+        """ Labels of the ``aggr`` buckets between the two dates, formatted once
+        per range, granularity, format, language and timezone. """
         locale = self._context.get('lang') or 'en_US'
         tz_convert = self._context.get('tz')
-        return [self.format_label(d[0], ftype, display_format, tz_convert, locale) for d in dates]
+        key = (str(date_begin), str(date_end), aggr, ftype, display_format, locale, tz_convert)
+        labels = _ks_time_label_cache.get(key)
+        if labels is None:
+            buckets = ks_time_buckets(fields.Datetime.to_datetime(date_begin), fields.Datetime.to_datetime(date_end),
+                                      aggr)
+            labels = tuple(self.format_label(bucket, ftype, display_format, tz_convert, locale) for bucket in buckets)
+            _ks_time_label_cache[key] = labels
+        return list(labels)
 
     @api.model
     def format_label(self, value, ftype, display_format, tz_convert, locale):
@@ -144,6 +144,8 @@ export class Ksdashboardgraph extends Component{
         this.count = '1-' + length
         this.offset = 1
         this.intial_count = length
+        // keys of the first and last rows, the pager seeks the next pages from them
+        this.ks_seek_keys = list_view_data ? list_view_data.seek_keys : false
         this.ks_pager = true
         this.ks_company= this.item.ks_company
         this.calculation_type = this.ks_dashboard_data.ks_item_data[this.item_id].ks_data_calculation_type
@@ -1730,6 +1732,7 @@ export class Ksdashboardgraph extends Component{
                 args: [parseInt(itemId), {
                     ks_intial_count: ks_intial_count,
                     offset: ks_offset,
+                    after: self.ks_seek_keys && self.ks_seek_keys[1],
                     }, parseInt(self.ks_dashboard_data.ks_dashboard_id), params],
                 kwargs:{context:context}
             }).then(function(result) {
@@ -1762,6 +1765,7 @@ export class Ksdashboardgraph extends Component{
                 args: [parseInt(itemId), {
                     ks_intial_count: ks_intial_count,
                     offset: ks_offset,
+                    before: self.ks_seek_keys && self.ks_seek_keys[0],
                     }, parseInt(self.ks_dashboard_data.ks_dashboard_id), params],
                 kwargs:{context:context}
             }).then(function(result) {
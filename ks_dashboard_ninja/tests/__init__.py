@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+
+from . import test_ks_bulk_loader
+from . import test_ks_chart_aggregation
+from . import test_ks_item_summary
+from . import test_ks_list_view
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests.common import TransactionCase, tagged
+
+from odoo.addons.ks_dashboard_ninja.common_lib.ks_bulk_loader import KS_IDENTIFIER, KsCopyLoader, \
+    ks_custom_column_name
+
+
+@tagged('post_install', '-at_install')
+class TestKsBulkLoader(TransactionCase):
+
+    def test_column_names(self):
+        self.assertEqual(ks_custom_column_name('Sale Amount (USD)'), 'x_sale_amount_usd')
+        self.assertEqual(ks_custom_column_name('Café/Prix'), 'x_cafe_prix')
+        self.assertEqual(ks_custom_column_name('name'), 'x_name1')
+        headers = ['الاسم الكامل', 'المبلغ', 'Amount المبلغ', 'Amount', '  ', 'x' * 80]
+        columns = [ks_custom_column_name(header) for header in headers]
+        for column in columns:
+            self.assertRegex(column, KS_IDENTIFIER)
+            self.assertLessEqual(len(column), 63)
+        self.assertEqual(len(set(columns)), len(headers), "headers losing characters must stay distinct")
+        self.assertEqual(ks_custom_column_name('المبلغ'), columns[1], "column names must be stable")
+
+    def test_load_non_ascii_headers(self):
+        name_column = ks_custom_column_name('الاسم الكامل')
+        amount_column = ks_custom_column_name('المبلغ')
+        self.env.cr.execute('CREATE TEMPORARY TABLE x_ks_bulk_test ("%s" varchar, "%s" float8)' % (
+            name_column, amount_column))
+        loader = KsCopyLoader(self.env.cr, 'x_ks_bulk_test', [(name_column, 'char'), (amount_column, 'float')])
+        self.assertEqual(loader.load([['أحمد', '1,250.5'], ['', ''], ['سارة', None]]), 2)
+        self.env.cr.execute('SELECT "%s", "%s" FROM x_ks_bulk_test ORDER BY 2' % (name_column, amount_column))
+        self.assertEqual(self.env.cr.fetchall(), [('أحمد', 1250.5), ('سارة', None)])
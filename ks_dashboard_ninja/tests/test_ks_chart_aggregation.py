@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+
+from unittest.mock import patch
+
+from odoo.tests import BaseCase, tagged
+
+from odoo.addons.ks_dashboard_ninja.common_lib import ks_chart_aggregation
+from odoo.addons.ks_dashboard_ninja.common_lib.ks_chart_aggregation import ks_count_column, ks_measure_column, \
+    ks_merge_chart_rows
+
+
+@tagged('post_install', '-at_install')
+class TestKsChartAggregation(BaseCase):
+
+    def _chart(self, labels, *datasets):
+        return {'labels': list(labels), 'datasets': [{'data': list(data)} for data in datasets]}
+
+    def test_merge_sum(self):
+        row_labels = ['b', 'c', 'a', 'c', 'b', 'd']
+        columns = [(0, [1, 2, 3, 4, 5, 6]), (1, [0.5, 1.5, 2.5, 3.5, 4.5, 5.5])]
+        expected = self._chart(['a', 'b', 'c', 'd'], [13, 6, 6, 6], [2.5, 5.0, 5.0, 5.5])
+        chart = ks_merge_chart_rows(self._chart(['a'], [10], [0]), row_labels, columns, 'sum')
+        self.assertEqual(chart, expected)
+        self.assertIsInstance(chart['datasets'][0]['data'][0], int, "integer measures are summed as integers")
+        # same result without numpy
+        with patch.object(ks_chart_aggregation, 'numpy', None):
+            chart = ks_merge_chart_rows(self._chart(['a'], [10], [0]), row_labels, columns, 'sum')
+        self.assertEqual(chart, expected)
+
+    def test_merge_average(self):
+        chart = ks_merge_chart_rows(self._chart([], []), ['a', 'a', 'b', 'a'], [(0, [8, 4, 1, 2])], 'count')
+        # values of a same label are averaged pairwise in row order
+        self.assertEqual(chart, self._chart(['a', 'b'], [4.0, 1]))
+
+    def test_measure_columns(self):
+        rows = [
+            {'__count': 2, 'amount': 5, 'stage_id_count': 3},
+            {'__count': 1, 'amount': 7, 'stage_id_count': False},
+            {'__count': 0, 'amount': 9, 'stage_id_count': 4},
+        ]
+        self.assertEqual(ks_measure_column(rows, 'amount', 'stage_id_count', False, 'sum'), [15, 7, 0])
+        self.assertEqual(ks_measure_column(rows, 'amount', 'stage_id_count', True, 'sum'), [15, 7, 0])
+        self.assertEqual(ks_measure_column(rows, 'amount', 'stage_id_count', False, 'average'), [5, 7, 0])
+        self.assertEqual(ks_count_column(rows, 'stage_id_count'), [3, 1, 0])
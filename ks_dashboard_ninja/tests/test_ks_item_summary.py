@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests.common import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestKsItemSummary(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.country_be, cls.country_fr = cls.env.ref('base.be'), cls.env.ref('base.fr')
+        cls.partners = cls.env['res.partner'].create([
+            {'name': 'Partner 1', 'ref': 'ks_summary', 'date': '2024-03-04', 'country_id': cls.country_be.id, 'color': 2},
+            {'name': 'Partner 2', 'ref': 'ks_summary', 'date': '2024-03-04', 'country_id': cls.country_fr.id, 'color': 3},
+            {'name': 'Partner 3', 'ref': 'ks_summary', 'date': '2024-03-05', 'country_id': cls.country_be.id, 'color': 5},
+            {'name': 'Partner 4', 'ref': 'ks_summary', 'date': False, 'country_id': False, 'color': 1},
+        ])
+        partner_field = lambda name: cls.env['ir.model.fields']._get('res.partner', name)
+        cls.item = cls.env['ks_dashboard_ninja.item'].create({
+            'name': 'Partners by country',
+            'ks_model_id': cls.env['ir.model']._get_id('res.partner'),
+            'ks_domain': "[('ref', '=', 'ks_summary')]",
+            'ks_dashboard_item_type': 'ks_bar_chart',
+            'ks_chart_relation_groupby': partner_field('country_id').id,
+            'ks_chart_measure_field': [(6, 0, [partner_field('color').id])],
+            'ks_date_filter_field': partner_field('date').id,
+            'ks_materialized': True,
+        })
+        cls.domain = [('ref', '=', 'ks_summary')]
+
+    def test_summary_read(self):
+        self.item._ks_refresh_materialized()
+        self.assertEqual(self.item._ks_materialized_read(self.domain, 'country_id'), {
+            str(self.country_be.id): (2, {'color': (7, 2)}),
+            str(self.country_fr.id): (1, {'color': (3, 1)}),
+            None: (1, {'color': (1, 1)}),
+        })
+        # date bounds falling on day buckets are answered from the summary
+        day_domain = self.domain + [('date', '>=', '2024-03-04'), ('date', '<=', '2024-03-04')]
+        self.assertEqual(self.item._ks_materialized_read(day_domain, 'country_id'), {
+            str(self.country_be.id): (1, {'color': (2, 1)}),
+            str(self.country_fr.id): (1, {'color': (3, 1)}),
+        })
+        # anything else is read live
+        self.assertIsNone(self.item._ks_materialized_read(self.domain + [('name', '=', 'Partner 1')]))
+        self.assertIsNone(self.item._ks_materialized_read(self.domain, 'company_id'))
+
+        rows = self.item._ks_materialized_chart_records(
+            'res.partner', self.domain, ['color:sum'], 'country_id', 'color desc', 0)
+        self.assertEqual([(row['country_id'], row['__count'], row['color']) for row in rows], [
+            ((self.country_be.id, self.country_be.display_name), 2, 7),
+            ((self.country_fr.id, self.country_fr.display_name), 1, 3),
+            (False, 1, 1),
+        ])
+
+    def test_summary_refresh(self):
+        self.item._ks_refresh_materialized()
+        # written records are picked up by the incremental refresh
+        self.env['res.partner'].create({
+            'name': 'Partner 5', 'ref': 'ks_summary', 'date': '2024-03-05', 'country_id': self.country_fr.id, 'color': 4,
+        })
+        self.partners[0].color = 6
+        self.item._ks_refresh_materialized()
+        summary = self.item._ks_materialized_read(self.domain, 'country_id')
+        self.assertEqual(summary[str(self.country_be.id)], (2, {'color': (11, 2)}))
+        self.assertEqual(summary[str(self.country_fr.id)], (2, {'color': (7, 2)}))
+        # deletions are caught by the record count check
+        self.partners[1].unlink()
+        self.item._ks_refresh_materialized()
+        summary = self.item._ks_materialized_read(self.domain, 'country_id')
+        self.assertEqual(summary[str(self.country_fr.id)], (1, {'color': (4, 1)}))
+        self.assertEqual(sum(count for count, _totals in summary.values()), 4)
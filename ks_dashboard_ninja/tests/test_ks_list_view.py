@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+
+import json
+
+from odoo.tests.common import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestKsListView(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.partners = cls.env['res.partner'].create([
+            {'name': 'Partner %s' % index, 'ref': 'ks_list', 'color': color}
+            for index, color in enumerate([2, 1, 1, 0, 1])
+        ])
+        # NULL sort values come last in ascending order
+        cls.env.cr.execute("UPDATE res_partner SET color = NULL WHERE id = %s", [cls.partners[3].id])
+        cls.partners.invalidate_recordset()
+        partner_field = lambda name: cls.env['ir.model.fields']._get('res.partner', name)
+        cls.item = cls.env['ks_dashboard_ninja.item'].create({
+            'name': 'Partners',
+            'ks_model_id': cls.env['ir.model']._get_id('res.partner'),
+            'ks_dashboard_item_type': 'ks_list_view',
+            'ks_list_view_type': 'ungrouped',
+            'ks_list_view_fields': [(6, 0, [partner_field('name').id, partner_field('color').id])],
+            'ks_sort_by_field': partner_field('color').id,
+            'ks_sort_by_order': 'ASC',
+            'ks_pagination_limit': 2,
+        })
+        cls.domain = [('ref', '=', 'ks_list')]
+
+    def _walk(self, direction, seek=None):
+        """ Ids of the pages read from ``seek`` toward ``direction``, keys
+        going through JSON as they do through the pager. """
+        pages = []
+        while True:
+            data = self.item.ks_fetch_list_view_data(self.item, self.domain, seek=seek)
+            if not data['data_rows']:
+                return pages
+            pages.append([row['id'] for row in data['data_rows']])
+            first_key, last_key = json.loads(json.dumps(data['seek_keys']))
+            seek = {'after': last_key} if direction == 'after' else {'before': first_key}
+
+    def test_seek_pages_with_ties(self):
+        p0, p1, p2, p3, p4 = self.partners.ids
+        for sort_order, expected in [
+            ('ASC', [[p1, p2], [p4, p0], [p3]]),
+            ('DESC', [[p3, p0], [p4, p2], [p1]]),
+        ]:
+            with self.subTest(sort_order=sort_order):
+                self.item.ks_sort_by_order = sort_order
+                pages = self._walk('after')
+                self.assertEqual(pages, expected)
+                # walking back from the last page gives the same pages
+                last_key = [self.item.ks_sort_by_field.name, None if sort_order == 'ASC' else 1, pages[-1][0]]
+                self.assertEqual(self._walk('before', {'before': last_key})[::-1], expected[:-1])
+
+    def test_export_rows(self):
+        data = self.item.ks_fetch_list_view_data(self.item, self.domain, ks_export_all=True)
+        p0, p1, p2, p3, p4 = self.partners.ids
+        self.assertEqual([row['id'] for row in data['data_rows']], [p1, p2, p4, p0, p3])
+
+    def test_export_error_before_streaming(self):
+        # the query error is raised while fetching the list, not once the
+        # response is being streamed
+        data = self.item.ks_fetch_list_view_data(self.item, [('ks_no_such_field', '=', 1)], ks_export_all=True)
+        self.assertFalse(data)
@@ -4,11 +4,10 @@ import hashlib
 import hmac
 import json
 import logging
-from markupsafe import Markup
 from werkzeug.exceptions import Forbidden
 
 from http import HTTPStatus
-from odoo import http, _
+from odoo import http
 from odoo.http import request
 from odoo.tools import consteq
 
@@ -19,51 +18,17 @@ class Webhook(http.Controller):
 
     @http.route('/whatsapp/webhook/', methods=['POST'], type="json", auth="public")
     def webhookpost(self):
+        """ Check the signature of the payload and store it in the webhook
+        inbox, processed later by a cron (see ``whatsapp.webhook.event``), so
+        that WhatsApp is answered without waiting for the processing. """
         data = json.loads(request.httprequest.data)
-        for entry in data['entry']:
-            account_id = entry['id']
-            account = request.env['whatsapp.account'].sudo().search(
-                [('account_uid', '=', account_id)])
+        account_uids = {entry['id'] for entry in data['entry']}
+        accounts = request.env['whatsapp.account'].sudo().search([('account_uid', 'in', list(account_uids))])
+        for account_id in account_uids:
+            account = accounts.filtered(lambda account: account.account_uid == account_id)
             if not self._check_signature(account):
                 raise Forbidden()
-
-            for changes in entry.get('changes', []):
-                value = changes['value']
-                phone_number_id = value.get('metadata', {}).get('phone_number_id', {})
-                if not phone_number_id:
-                    phone_number_id = value.get('whatsapp_business_api_data', {}).get('phone_number_id', {})
-                if phone_number_id:
-                    wa_account_id = request.env['whatsapp.account'].sudo().search([
-                        ('phone_uid', '=', phone_number_id), ('account_uid', '=', account_id)])
-                    if wa_account_id:
-                        # Process Messages and Status webhooks
-                        if changes['field'] == 'messages':
-                            request.env['whatsapp.message']._process_statuses(value)
-                            wa_account_id._process_messages(value)
-                    else:
-                        _logger.warning("There is no phone configured for this whatsapp webhook : %s ", data)
-
-                # Process Template webhooks
-                if value.get('message_template_id'):
-                    # There is no user in webhook, so we need to SUPERUSER_ID to write on template object
-                    template = request.env['whatsapp.template'].sudo().search([('wa_template_uid', '=', value['message_template_id'])])
-                    if template:
-                        if changes['field'] == 'message_template_status_update':
-                            template.write({'status': value['event'].lower()})
-                            description = value.get('other_info', {}).get('description', {}) or value.get('reason', {})
-                            if description:
-                                template.message_post(
-                                    body=_("Your Template has been rejected.") + Markup("<br/>") + _("Reason : %s", description))
-                            continue
-                        if changes['field'] == 'message_template_quality_update':
-                            template.write({'quality': value['new_quality_score'].lower()})
-                            continue
-                        if changes['field'] == 'template_category_update':
-                            template.write({'template_type': value['new_category'].lower()})
-                            continue
-                        _logger.warning("Unknown Template webhook : %s ", value)
-                    else:
-                        _logger.warning("No Template found for this webhook : %s ", value)
+        request.env['whatsapp.webhook.event'].sudo()._enqueue(request.httprequest.data)
 
     @http.route('/whatsapp/webhook/', methods=['GET'], type="http", auth="public", csrf=False)
     def webhookget(self, **kwargs):
@@ -12,3 +12,4 @@ from . import whatsapp_message
 from . import whatsapp_template
 from . import whatsapp_template_button
 from . import whatsapp_template_variable
+from . import whatsapp_webhook_event
@@ -156,7 +156,7 @@ class WhatsAppAccount(models.Model):
             related_message=whatsapp_message.mail_message_id,
         )
 
-    def _process_messages(self, value):
+    def _process_messages(self, value, channels=None):
         """
             This method is used for processing messages with the values received via webhook.
             If any whatsapp message template has been sent from this account then it will find the active channel or
@@ -168,7 +168,13 @@ class WhatsAppAccount(models.Model):
              => Location Message
              => Contact Message
              => Message Reactions
+
+            :param dict channels: optional cache of the active channel of the
+              senders, {(account id, sender mobile): channel}, shared by the
+              payloads of a batch
         """
+        if channels is None:
+            channels = {}
         if 'messages' not in value and value.get('whatsapp_business_api_data', {}).get('messages'):
             value = value['whatsapp_business_api_data']
 
@@ -187,8 +193,11 @@ class WhatsAppAccount(models.Model):
                 if parent_id:
                     channel = self.env['discuss.channel'].sudo().search([('message_ids', 'in', parent_id.id)], limit=1)
 
+            if not channel:
+                channel = channels.get((self.id, sender_mobile))
             if not channel:
                 channel = self._find_active_channel(sender_mobile, sender_name=sender_name, create_if_not_found=True)
+                channels[(self.id, sender_mobile)] = channel
             kwargs = {
                 'message_type': 'whatsapp_message',
                 'author_id': channel.whatsapp_partner_id.id,
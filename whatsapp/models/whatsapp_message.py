@@ -1,7 +1,9 @@
 # Part of Odoo. See LICENSE file for full copyright and licensing details.
 
+import functools
 import re
 import logging
+import threading
 import markupsafe
 from markupsafe import Markup
 
@@ -9,11 +11,12 @@ from datetime import timedelta
 
 from odoo import models, fields, api, _, Command
 from odoo.addons.phone_validation.tools import phone_validation
-from odoo.addons.whatsapp.tools.retryable_codes import WHATSAPP_RETRYABLE_ERROR_CODES
+from odoo.addons.whatsapp.tools.retryable_codes import WHATSAPP_RETRYABLE_ERROR_CODES, WHATSAPP_THROTTLING_ERROR_CODES
 from odoo.addons.whatsapp.tools.whatsapp_api import WhatsAppApi
 from odoo.addons.whatsapp.tools.whatsapp_exception import WhatsAppError
+from odoo.addons.whatsapp.tools.whatsapp_sender import get_rate_limiter, send_all
 from odoo.exceptions import ValidationError, UserError
-from odoo.tools import groupby, html2plaintext
+from odoo.tools import groupby, html2plaintext, split_every
 
 _logger = logging.getLogger(__name__)
 
@@ -34,6 +37,13 @@ class WhatsAppMessage(models.Model):
         'image': ('image/jpeg', 'image/png'),
         'video': ('video/mp4', 'video/3gp'),
     }
+    # messages sent by a run of the queue cron, and per commit
+    _SEND_CRON_LIMIT = 5000
+    _SEND_BATCH_SIZE = 250
+    # default concurrency and per phone rate (Cloud API default throughput),
+    # see whatsapp.send_workers and whatsapp.messages_per_second parameters
+    _SEND_WORKERS = 8
+    _SEND_RATE = 80
     # amount of days during which a message is considered active
     # used for GC and for finding an active document channel using a recent whatsapp template message
     _ACTIVE_THRESHOLD_DAYS = 15
@@ -185,9 +195,9 @@ class WhatsAppMessage(models.Model):
         """ Send all outgoing messages. """
         records = self.search([
             ('state', '=', 'outgoing'), ('wa_template_id', '!=', False)
-        ], limit=500)
+        ], limit=self._SEND_CRON_LIMIT)
         records._send_message(with_commit=True)
-        if len(records) == 500:  # assumes there are more whenever search hits limit
+        if len(records) == self._SEND_CRON_LIMIT:  # assumes there are more whenever search hits limit
             self.env.ref('whatsapp.ir_cron_send_whatsapp_queue')._trigger()
 
     def _send(self, force_send_by_cron=False):
@@ -197,7 +207,11 @@ class WhatsAppMessage(models.Model):
             self.env.ref('whatsapp.ir_cron_send_whatsapp_queue')._trigger()
 
     def _send_message(self, with_commit=False):
-        """ Prepare json data for sending messages, attachments and templates."""
+        """ Prepare json data for sending messages, attachments and templates.
+
+        Messages are handled by batches: their payloads are prepared, sent
+        concurrently (see ``_send_payloads``), then the outcomes are written
+        on the batch at once and committed when ``with_commit`` is set. """
         # init api
         message_to_api = {}
         for account, messages in groupby(self, lambda msg: msg.wa_account_id):
@@ -214,78 +228,209 @@ class WhatsAppMessage(models.Model):
             for message in messages:
                 message_to_api[message] = wa_api
 
-        for whatsapp_message in self:
-            wa_api = message_to_api[whatsapp_message]
-            whatsapp_message = whatsapp_message.with_user(whatsapp_message.create_uid)
-            if whatsapp_message.state != 'outgoing':
+        for batch_ids in split_every(self._SEND_BATCH_SIZE, self.ids):
+            jobs = []
+            media_uids = {}
+            batch = self.browse(batch_ids)
+            for whatsapp_message in batch.filtered(lambda msg: msg.state != 'outgoing'):
                 _logger.info("Message state in %s state so it will not sent.", whatsapp_message.state)
-                continue
-            msg_uid = False
-            try:
-                parent_message_id = False
-                body = whatsapp_message.body
-                if isinstance(body, markupsafe.Markup):
-                    # If Body is in html format so we need to remove html tags before sending message.
-                    body = body.striptags()
-                number = whatsapp_message.mobile_number_formatted
-                if not number:
-                    raise WhatsAppError(failure_type='phone_invalid')
-                if self.env['phone.blacklist'].sudo().search([('number', 'ilike', number)]):
-                    raise WhatsAppError(failure_type='blacklisted')
-                if whatsapp_message.wa_template_id:
-                    message_type = 'template'
-                    if whatsapp_message.wa_template_id.status != 'approved' or whatsapp_message.wa_template_id.quality in ('red', 'yellow'):
-                        raise WhatsAppError(failure_type='template')
-                    whatsapp_message.message_type = 'outbound'
-                    if whatsapp_message.mail_message_id.model != whatsapp_message.wa_template_id.model:
-                        raise WhatsAppError(failure_type='template')
-
-                    RecordModel = self.env[whatsapp_message.mail_message_id.model].with_user(whatsapp_message.create_uid)
-                    from_record = RecordModel.browse(whatsapp_message.mail_message_id.res_id)
-                    send_vals, attachment = whatsapp_message.wa_template_id._get_send_template_vals(
-                        record=from_record, free_text_json=whatsapp_message.free_text_json,
-                        attachment=whatsapp_message.mail_message_id.attachment_ids)
-                    if attachment:
-                        # If retrying message then we need to remove previous attachment and add new attachment.
-                        if whatsapp_message.mail_message_id.attachment_ids and whatsapp_message.wa_template_id.header_type == 'document' and whatsapp_message.wa_template_id.report_id:
-                            whatsapp_message.mail_message_id.attachment_ids.unlink()
-                        if attachment not in whatsapp_message.mail_message_id.attachment_ids:
-                            whatsapp_message.mail_message_id.attachment_ids = [Command.link(attachment.id)]
-                elif whatsapp_message.mail_message_id.attachment_ids:
-                    attachment_vals = whatsapp_message._prepare_attachment_vals(whatsapp_message.mail_message_id.attachment_ids[0], wa_account_id=whatsapp_message.wa_account_id)
-                    message_type = attachment_vals.get('type')
-                    send_vals = attachment_vals.get(message_type)
-                    if whatsapp_message.body:
-                        send_vals['caption'] = body
+            sendable = batch._filter_sendable()
+            template_values = sendable._prepare_template_batch()
+            for whatsapp_message in sendable:
+                wa_api = message_to_api[whatsapp_message]
+                whatsapp_message = whatsapp_message.with_user(whatsapp_message.create_uid)
+                try:
+                    payload = whatsapp_message._prepare_send_payload(
+                        template_values=template_values.get(whatsapp_message.id), media_uids=media_uids)
+                except WhatsAppError as we:
+                    whatsapp_message._handle_error(whatsapp_error_code=we.error_code, error_message=we.error_message,
+                                                   failure_type=we.failure_type)
+                except (UserError, ValidationError) as e:
+                    whatsapp_message._handle_error(failure_type='unknown', error_message=str(e))
                 else:
-                    message_type = 'text'
-                    send_vals = {
-                        'preview_url': True,
-                        'body': body,
-                    }
-                # Tagging parent message id if parent message is available
-                if whatsapp_message.mail_message_id and whatsapp_message.mail_message_id.parent_id:
-                    parent_id = whatsapp_message.mail_message_id.parent_id.wa_message_ids
-                    if parent_id:
-                        parent_message_id = parent_id[0].msg_uid
-                msg_uid = wa_api._send_whatsapp(number=number, message_type=message_type, send_vals=send_vals, parent_message_id=parent_message_id)
-            except WhatsAppError as we:
-                whatsapp_message._handle_error(whatsapp_error_code=we.error_code, error_message=we.error_message,
-                                               failure_type=we.failure_type)
-            except (UserError, ValidationError) as e:
-                whatsapp_message._handle_error(failure_type='unknown', error_message=str(e))
-            else:
-                if not msg_uid:
+                    jobs.append((whatsapp_message, wa_api, payload))
+
+            unexpected_error = None
+            for (whatsapp_message, _wa_api, payload), (msg_uid, error) in zip(jobs, self._send_payloads(jobs)):
+                if isinstance(error, WhatsAppError):
+                    whatsapp_message._handle_error(whatsapp_error_code=error.error_code, error_message=error.error_message,
+                                                   failure_type=error.failure_type)
+                elif isinstance(error, (UserError, ValidationError)):
+                    whatsapp_message._handle_error(failure_type='unknown', error_message=str(error))
+                elif error:
+                    unexpected_error = unexpected_error or error
+                elif not msg_uid:
                     whatsapp_message._handle_error(failure_type='unknown')
                 else:
-                    if message_type == 'template':
+                    if payload['message_type'] == 'template':
                         whatsapp_message._post_message_in_active_channel()
                     whatsapp_message.write({
                         'state': 'sent',
                         'msg_uid': msg_uid
                     })
-                if with_commit:
-                    self._cr.commit()
+            # outcomes of the batch are flushed together
+            if with_commit:
+                self._cr.commit()
+            if unexpected_error:
+                raise unexpected_error
+
+    def _filter_sendable(self):
+        """ Return the outgoing messages that can be sent. The others are
+        failed in bulk, before any API call: missing number, blacklisted
+        number (one exact match query on the normalized numbers of all
+        messages) or template that cannot be used. """
+        outgoing = self.filtered(lambda msg: msg.state == 'outgoing')
+        invalid = outgoing.filtered(lambda msg: not msg.mobile_number_formatted)
+        outgoing -= invalid
+
+        normalized = {msg: '+' + re.sub(r'\D', '', msg.mobile_number_formatted) for msg in outgoing}
+        blacklisted_numbers = set(self.env['phone.blacklist'].sudo().search(
+            [('number', 'in', list(set(normalized.values())))]).mapped('number'))
+        blacklisted = outgoing.filtered(lambda msg: normalized[msg] in blacklisted_numbers)
+        outgoing -= blacklisted
+
+        templated = outgoing.filtered('wa_template_id')
+        bad_template = templated.filtered(
+            lambda msg: msg.wa_template_id.status != 'approved'
+            or msg.wa_template_id.quality in ('red', 'yellow')
+            or msg.mail_message_id.model != msg.wa_template_id.model
+        )
+        outgoing -= bad_template
+        (templated - bad_template).message_type = 'outbound'
+
+        for messages, failure_type in ((invalid, 'phone_invalid'), (blacklisted, 'blacklisted'), (bad_template, 'template')):
+            if messages:
+                messages.write({
+                    'failure_type': failure_type,
+                    'failure_reason': False,
+                    'state': 'error',
+                })
+        return outgoing
+
+    def _prepare_template_batch(self):
+        """ Evaluate at once what the template messages need for their payload,
+        by template and sender: the values of the variables of their records,
+        and the report of their header, rendered by a single run of the report
+        and attached to a new attachment per message. A group that fails is
+        left out, its messages are then prepared one by one and fail on their own.
+
+        :return dict: {message id: {'variables': dict, 'attachment': ir.attachment}}
+        """
+        template_values = {}
+        messages = self.filtered(lambda msg: msg.wa_template_id and msg.mail_message_id.model)
+        groups = groupby(messages, lambda msg: (msg.wa_template_id, msg.create_uid, msg.mail_message_id.model))
+        for (template, user, model), group in groups:
+            template = template.with_user(user)
+            records = self.env[model].with_user(user).browse([msg.mail_message_id.res_id for msg in group])
+            try:
+                with self.env.cr.savepoint():
+                    variables = template.variable_ids._get_variables_values(records)
+                    to_render = [
+                        msg for msg in group
+                        if not msg.mail_message_id.attachment_ids and not template.header_attachment_ids
+                    ]
+                    report_values = template._prepare_report_attachment_values(
+                        records.browse([msg.mail_message_id.res_id for msg in to_render]))
+                    attachments = self.env['ir.attachment'].create([
+                        report_values[msg.mail_message_id.res_id] for msg in to_render
+                    ]) if report_values else self.env['ir.attachment']
+            except (UserError, ValidationError) as e:
+                _logger.info("Preparing WhatsApp template %s by batch failed: %s", template.id, e)
+                continue
+            attachment_by_message = dict(zip(to_render, attachments))
+            for msg in group:
+                template_values[msg.id] = {
+                    'variables': variables[msg.mail_message_id.res_id],
+                    'attachment': attachment_by_message.get(msg, self.env['ir.attachment']),
+                }
+        return template_values
+
+    def _prepare_send_payload(self, template_values=None, media_uids=None):
+        """ Prepare the arguments of ``WhatsAppApi._send_whatsapp`` for a
+        message accepted by ``_filter_sendable``. Attachments are uploaded here.
+
+        :param dict template_values: values prepared for the template of the
+          message by ``_prepare_template_batch``
+        :param dict media_uids: see ``_prepare_attachment_vals``
+        """
+        self.ensure_one()
+        template_values = template_values or {}
+        parent_message_id = False
+        body = self.body
+        if isinstance(body, markupsafe.Markup):
+            # If Body is in html format so we need to remove html tags before sending message.
+            body = body.striptags()
+        number = self.mobile_number_formatted
+        if self.wa_template_id:
+            message_type = 'template'
+            RecordModel = self.env[self.mail_message_id.model].with_user(self.create_uid)
+            from_record = RecordModel.browse(self.mail_message_id.res_id)
+            send_vals, attachment = self.wa_template_id._get_send_template_vals(
+                record=from_record, free_text_json=self.free_text_json,
+                attachment=self.mail_message_id.attachment_ids or template_values.get('attachment'),
+                template_variables_value=template_values.get('variables'), media_uids=media_uids)
+            if attachment:
+                # If retrying message then we need to remove previous attachment and add new attachment.
+                if self.mail_message_id.attachment_ids and self.wa_template_id.header_type == 'document' and self.wa_template_id.report_id:
+                    self.mail_message_id.attachment_ids.unlink()
+                if attachment not in self.mail_message_id.attachment_ids:
+                    self.mail_message_id.attachment_ids = [Command.link(attachment.id)]
+        elif self.mail_message_id.attachment_ids:
+            attachment_vals = self._prepare_attachment_vals(self.mail_message_id.attachment_ids[0], wa_account_id=self.wa_account_id,
+                                                            media_uids=media_uids)
+            message_type = attachment_vals.get('type')
+            send_vals = attachment_vals.get(message_type)
+            if self.body:
+                send_vals['caption'] = body
+        else:
+            message_type = 'text'
+            send_vals = {
+                'preview_url': True,
+                'body': body,
+            }
+        # Tagging parent message id if parent message is available
+        if self.mail_message_id and self.mail_message_id.parent_id:
+            parent_id = self.mail_message_id.parent_id.wa_message_ids
+            if parent_id:
+                parent_message_id = parent_id[0].msg_uid
+        return {
+            'number': number,
+            'message_type': message_type,
+            'send_vals': send_vals,
+            'parent_message_id': parent_message_id,
+        }
+
+    @api.model
+    def _send_payloads(self, jobs):
+        """ Send the prepared payloads on a bounded pool of threads, limited
+        to the configured rate per sender phone. Messages to a same number
+        keep their order. Threads only do HTTP calls: all ORM work is done
+        before and after.
+
+        :param list jobs: list of (whatsapp.message, WhatsAppApi, payload)
+        :return: list of (msg_uid, exception) in the order of ``jobs``
+        """
+        if not jobs:
+            return []
+        ICP = self.env['ir.config_parameter'].sudo()
+        workers = int(ICP.get_param('whatsapp.send_workers', self._SEND_WORKERS))
+        rate = float(ICP.get_param('whatsapp.messages_per_second', self._SEND_RATE))
+        if getattr(threading.current_thread(), 'testing', False):
+            # API calls are mocked in the current thread only
+            workers = 1
+        for wa_api in {wa_api for _message, wa_api, _payload in jobs}:
+            wa_api._check_configuration()
+        calls = []
+        for _message, wa_api, payload in jobs:
+            limiter = get_rate_limiter(wa_api.phone_uid, rate)
+            calls.append(((wa_api.phone_uid, payload['number']), limiter, functools.partial(wa_api._send_whatsapp, **payload)))
+
+        def retry_delay(error):
+            if isinstance(error, WhatsAppError) and error.error_code in WHATSAPP_THROTTLING_ERROR_CODES:
+                return 1.0
+            return None
+
+        return send_all(calls, workers, retry_delay=retry_delay)
 
     def _handle_error(self, failure_type=False, whatsapp_error_code=False, error_message=False):
         """ Format and write errors on the message. """
@@ -325,8 +470,12 @@ class WhatsAppMessage(models.Model):
         )
 
     @api.model
-    def _prepare_attachment_vals(self, attachment, wa_account_id):
-        """ Upload the attachment to WhatsApp and return prepared values to attach to the message. """
+    def _prepare_attachment_vals(self, attachment, wa_account_id, media_uids=None):
+        """ Upload the attachment to WhatsApp and return prepared values to attach to the message.
+
+        :param dict media_uids: media already uploaded by the same batch, by
+          account and content; an identical attachment is uploaded only once
+        """
         whatsapp_media_type = next((
             media_type
             for media_type, mimetypes
@@ -337,8 +486,13 @@ class WhatsAppMessage(models.Model):
 
         if not whatsapp_media_type:
             raise WhatsAppError(_("Attachment mimetype is not supported by WhatsApp: %s.", attachment.mimetype))
-        wa_api = WhatsAppApi(wa_account_id)
-        whatsapp_media_uid = wa_api._upload_whatsapp_document(attachment)
+        media_key = (wa_account_id.id, attachment.checksum, attachment.mimetype)
+        whatsapp_media_uid = media_uids.get(media_key) if media_uids is not None else None
+        if not whatsapp_media_uid:
+            wa_api = WhatsAppApi(wa_account_id)
+            whatsapp_media_uid = wa_api._upload_whatsapp_document(attachment)
+            if media_uids is not None and attachment.checksum:
+                media_uids[media_key] = whatsapp_media_uid
 
         vals = {
             'type': whatsapp_media_type,
@@ -354,11 +508,24 @@ class WhatsAppMessage(models.Model):
     # CALLBACK
     # ------------------------------------------------------------
 
-    def _process_statuses(self, value):
-        """ Process status of the message like 'send', 'delivered' and 'read'."""
+    @api.model
+    def _get_messages_by_uid(self, msg_uids):
+        """ Messages of the given WhatsApp uids, fetched in one query: {msg_uid: message}. """
+        if not msg_uids:
+            return {}
+        messages = self.env['whatsapp.message'].sudo().search([('msg_uid', 'in', list(set(msg_uids)))])
+        return {message.msg_uid: message for message in messages}
+
+    def _process_statuses(self, value, messages_by_uid=None):
+        """ Process status of the message like 'send', 'delivered' and 'read'.
+
+        :param dict messages_by_uid: messages already fetched by the caller
+          (see ``_get_messages_by_uid``), fetched here otherwise """
         mapping = {'failed': 'error', 'cancelled': 'cancel'}
+        if messages_by_uid is None:
+            messages_by_uid = self._get_messages_by_uid([statuses['id'] for statuses in value.get('statuses', [])])
         for statuses in value.get('statuses', []):
-            whatsapp_message_id = self.env['whatsapp.message'].sudo().search([('msg_uid', '=', statuses['id'])])
+            whatsapp_message_id = messages_by_uid.get(statuses['id'])
             if whatsapp_message_id:
                 whatsapp_message_id.state = mapping.get(statuses['status'], statuses['status'])
                 whatsapp_message_id._update_message_fetched_seen()
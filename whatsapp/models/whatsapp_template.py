@@ -549,7 +549,7 @@ class WhatsAppTemplate(models.Model):
     #         Send WhatsApp message using template
     #========================================================================
 
-    def _get_header_component(self, free_text_json, template_variables_value, attachment):
+    def _get_header_component(self, free_text_json, template_variables_value, attachment, media_uids=None):
         """ Prepare header component for sending WhatsApp template message"""
         header = []
         header_type = self.header_type
@@ -562,7 +562,8 @@ class WhatsAppTemplate(models.Model):
         elif header_type in ['image', 'video', 'document']:
             header = {
                 'type': 'header',
-                'parameters': [self.env['whatsapp.message']._prepare_attachment_vals(attachment, wa_account_id=self.wa_account_id)]
+                'parameters': [self.env['whatsapp.message']._prepare_attachment_vals(
+                    attachment, wa_account_id=self.wa_account_id, media_uids=media_uids)]
             }
         elif header_type == 'location':
             header = {
@@ -625,13 +626,21 @@ class WhatsAppTemplate(models.Model):
             })
         return components
 
-    def _get_send_template_vals(self, record, free_text_json, attachment=False):
-        """Prepare JSON dictionary for sending WhatsApp template message"""
+    def _get_send_template_vals(self, record, free_text_json, attachment=False, template_variables_value=None, media_uids=None):
+        """Prepare JSON dictionary for sending WhatsApp template message
+
+        :param dict template_variables_value: values of the variables for
+          ``record`` when already evaluated (see ``_get_variables_values``)
+        :param dict media_uids: uploaded media shared by a batch of messages
+          (see ``whatsapp.message._prepare_attachment_vals``)
+        """
         self.ensure_one()
         components = []
-        template_variables_value = self.variable_ids._get_variables_value(record)
+        if template_variables_value is None:
+            template_variables_value = self.variable_ids._get_variables_value(record)
         attachment = attachment or self.header_attachment_ids or self._generate_attachment_from_report(record)
-        header = self._get_header_component(free_text_json=free_text_json, attachment=attachment, template_variables_value=template_variables_value)
+        header = self._get_header_component(free_text_json=free_text_json, attachment=attachment,
+                                            template_variables_value=template_variables_value, media_uids=media_uids)
         body = self._get_body_component(free_text_json=free_text_json, template_variables_value=template_variables_value)
         buttons = self._get_button_components(free_text_json=free_text_json, template_variables_value=template_variables_value)
         if header:
@@ -686,18 +695,45 @@ class WhatsAppTemplate(models.Model):
 
     def _generate_attachment_from_report(self, record=False):
         """Create attachment from report if relevant"""
-        if record and self.header_type == 'document' and self.report_id:
-            report_content, report_format = self.report_id._render_qweb_pdf(self.report_id, record.id)
+        if record:
+            attachment_values = self._prepare_report_attachment_values(record)
+            if attachment_values:
+                return self.env['ir.attachment'].create(attachment_values[record.id])
+        return self.env['ir.attachment']
+
+    def _prepare_report_attachment_values(self, records):
+        """ Render the header report of ``records`` and return the values of
+        their attachment by record id. Several records are rendered by a single
+        run of the report; the ones whose document cannot be split out of it
+        are rendered on their own. """
+        self.ensure_one()
+        if not records or self.header_type != 'document' or not self.report_id:
+            return {}
+        records = records.browse(list(dict.fromkeys(records.ids)))
+        streams = {}
+        if len(records) > 1:
+            streams = self.report_id._render_qweb_pdf_prepare_streams(
+                self.report_id, {'report_type': 'pdf'}, res_ids=records.ids)
+        attachment_values = {}
+        for record in records:
+            stream = (streams.get(record.id) or {}).get('stream')
+            if stream:
+                report_content, report_format = stream.getvalue(), 'pdf'
+            else:
+                report_content, report_format = self.report_id._render_qweb_pdf(self.report_id, record.id)
             if self.report_id.print_report_name:
                 report_name = safe_eval(self.report_id.print_report_name, {'object': record}) + '.' + report_format
             else:
                 report_name = self.display_name + '.' + report_format
-            return self.env['ir.attachment'].create({
+            attachment_values[record.id] = {
                 'name': report_name,
                 'raw': report_content,
                 'mimetype': 'application/pdf',
-            })
-        return self.env['ir.attachment']
+            }
+        for stream_data in streams.values():
+            if stream_data.get('stream'):
+                stream_data['stream'].close()
+        return attachment_values
 
     def _check_location_latitude_longitude(self, latitude, longitude):
         if not re.match(LATITUDE_LONGITUDE_REGEX, f"{latitude}, {longitude}"):
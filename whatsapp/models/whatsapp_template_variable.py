@@ -4,7 +4,7 @@ from functools import reduce
 from werkzeug.urls import url_join
 
 from odoo import api, models, fields, _
-from odoo.exceptions import UserError, ValidationError
+from odoo.exceptions import AccessError, MissingError, UserError, ValidationError
 
 class WhatsAppTemplateVariable(models.Model):
     _name = 'whatsapp.template.variable'
@@ -98,28 +98,51 @@ class WhatsAppTemplateVariable(models.Model):
         self.field_name = False
 
     def _get_variables_value(self, record):
-        value_by_name = {}
+        return self._get_variables_values(record)[record.id]
+
+    def _get_variables_values(self, records):
+        """ Values of the variables for each of ``records``, in one pass:
+        values not depending on the record are computed once and field
+        chains are read for all records at once.
+
+        :return dict: {record id: {'body-{{1}}': value, ...}}
+        """
+        values_by_record = {record.id: {} for record in records}
         user = self.env.user
         for variable in self:
+            if variable.button_id:
+                name = f"button-{variable.button_id.name}"
+            else:
+                name = f"{variable.line_type}-{variable.name}"
+
+            if variable.field_type == 'field':
+                try:
+                    # fill the cache for the whole chain at once
+                    records.sudo(False).mapped(variable.field_name)
+                except (KeyError, AccessError, MissingError):
+                    pass  # reported per record below
+                for record in records:
+                    value = variable._find_value_from_field_chain(record)
+                    values_by_record[record.id][name] = value and str(value) or ''
+                continue
+            if variable.field_type == 'portal_url':
+                base_url = variable.get_base_url()
+                for record in records:
+                    portal_url = record._whatsapp_get_portal_url()
+                    values_by_record[record.id][name] = url_join(base_url, (portal_url or ''))
+                continue
+
             if variable.field_type == 'user_name':
                 value = user.name
             elif variable.field_type == 'user_mobile':
                 value = user.mobile
-            elif variable.field_type == 'field':
-                value = variable._find_value_from_field_chain(record)
-            elif variable.field_type == 'portal_url':
-                portal_url = record._whatsapp_get_portal_url()
-                value = url_join(variable.get_base_url(), (portal_url or ''))
             else:
                 value = variable.demo_value
-
             value_str = value and str(value) or ''
-            if variable.button_id:
-                value_by_name[f"button-{variable.button_id.name}"] = value_str
-            else:
-                value_by_name[f"{variable.line_type}-{variable.name}"] = value_str
+            for value_by_name in values_by_record.values():
+                value_by_name[name] = value_str
 
-        return value_by_name
+        return values_by_record
 
     # ------------------------------------------------------------
     # TOOLS
@@ -0,0 +1,164 @@
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+import json
+import logging
+
+from datetime import timedelta
+from markupsafe import Markup
+
+from odoo import api, fields, models, _
+
+_logger = logging.getLogger(__name__)
+
+
+class WhatsAppWebhookEvent(models.Model):
+    """ Inbox of the payloads received on the webhook. The controller only
+    checks their signature and stores them, so that WhatsApp gets its answer
+    right away; they are processed by batches by a cron. """
+    _name = 'whatsapp.webhook.event'
+    _description = 'WhatsApp Webhook Event'
+    _order = 'id'
+
+    # payloads processed by a run of the cron
+    _PROCESS_BATCH_SIZE = 200
+    # processed payloads are removed after that many days
+    _DONE_RETENTION_DAYS = 2
+
+    payload = fields.Text(string="Payload", required=True)
+    state = fields.Selection([
+        ('pending', 'Pending'),
+        ('done', 'Processed'),
+        ('error', 'Failed')], string="State", default='pending', required=True, index=True)
+    failure_reason = fields.Char(string="Failure Reason")
+
+    @api.model
+    def _enqueue(self, payload):
+        """ Store a verified webhook payload and wake up the processing cron. """
+        event = self.create({'payload': payload.decode() if isinstance(payload, bytes) else payload})
+        self.env.ref('whatsapp.ir_cron_process_whatsapp_webhook')._trigger()
+        return event
+
+    @api.autovacuum
+    def _gc_webhook_events(self):
+        date_threshold = fields.Datetime.now() - timedelta(days=self._DONE_RETENTION_DAYS)
+        self.search([('state', '=', 'done'), ('create_date', '<', date_threshold)]).unlink()
+
+    # ------------------------------------------------------------
+    # PROCESSING
+    # ------------------------------------------------------------
+
+    @api.model
+    def _process_pending(self):
+        """ Process the oldest pending payloads, cron entry point. """
+        events = self.search([('state', '=', 'pending')], limit=self._PROCESS_BATCH_SIZE)
+        events._process()
+        if len(events) == self._PROCESS_BATCH_SIZE:
+            self.env.ref('whatsapp.ir_cron_process_whatsapp_webhook')._trigger()
+
+    def _process(self):
+        """ Process the payloads in order, each one in its own savepoint.
+
+        Lookups are shared by the whole batch: accounts are fetched at once,
+        the messages whose status is updated by a single search on their
+        uids, and the channel of a sender is resolved once per account. """
+        payloads = {}
+        for event in self:
+            try:
+                data = json.loads(event.payload)
+            except ValueError:
+                event.write({'state': 'error', 'failure_reason': 'Invalid JSON payload'})
+                continue
+            try:
+                self._check_payload(data)
+            except ValueError as e:
+                event.write({'state': 'error', 'failure_reason': str(e)})
+                continue
+            payloads[event] = data
+        entries = [entry for data in payloads.values() for entry in data.get('entry', [])]
+        account_uids = {entry['id'] for entry in entries}
+        accounts = self.env['whatsapp.account'].sudo().search([('account_uid', 'in', list(account_uids))])
+        accounts_by_phone = {(account.account_uid, account.phone_uid): account for account in accounts}
+
+        statuses = [
+            status
+            for entry in entries
+            for changes in entry.get('changes', [])
+            if changes.get('field') == 'messages'
+            for status in changes['value'].get('statuses', [])
+        ]
+        messages_by_uid = self.env['whatsapp.message']._get_messages_by_uid([status['id'] for status in statuses])
+        channels = {}
+
+        for event, data in payloads.items():
+            try:
+                with self.env.cr.savepoint():
+                    for entry in data.get('entry', []):
+                        self._process_entry(entry, accounts_by_phone, messages_by_uid, channels)
+            except Exception as e:  # noqa: BLE001 kept on the event for inspection
+                _logger.exception("Failed to process WhatsApp webhook event %s", event.id)
+                # records created or updated in the rolled back savepoint
+                channels.clear()
+                self.env.invalidate_all()
+                event.write({'state': 'error', 'failure_reason': str(e)})
+            else:
+                event.state = 'done'
+
+    @api.model
+    def _check_payload(self, data):
+        """ Check the structure read by the lookups shared by the batch, so
+        that a malformed payload only fails its own event. """
+        if not isinstance(data, dict) or not isinstance(data.get('entry', []), list):
+            raise ValueError("Invalid webhook payload")
+        for entry in data.get('entry', []):
+            if not isinstance(entry, dict) or not isinstance(entry.get('id'), str):
+                raise ValueError("Invalid webhook entry: missing account id")
+            if not isinstance(entry.get('changes', []), list):
+                raise ValueError("Invalid webhook entry: invalid changes")
+            for changes in entry.get('changes', []):
+                if not isinstance(changes, dict) or not isinstance(changes.get('value'), dict):
+                    raise ValueError("Invalid webhook change: missing value")
+                if changes.get('field') != 'messages':
+                    continue
+                statuses = changes['value'].get('statuses', [])
+                if not isinstance(statuses, list) or not all(isinstance(status, dict) and 'id' in status for status in statuses):
+                    raise ValueError("Invalid webhook change: invalid statuses")
+
+    @api.model
+    def _process_entry(self, entry, accounts_by_phone, messages_by_uid, channels):
+        account_id = entry['id']
+        for changes in entry.get('changes', []):
+            value = changes['value']
+            phone_number_id = value.get('metadata', {}).get('phone_number_id', {})
+            if not phone_number_id:
+                phone_number_id = value.get('whatsapp_business_api_data', {}).get('phone_number_id', {})
+            if phone_number_id:
+                wa_account_id = accounts_by_phone.get((account_id, phone_number_id))
+                if wa_account_id:
+                    # Process Messages and Status webhooks
+                    if changes['field'] == 'messages':
+                        self.env['whatsapp.message']._process_statuses(value, messages_by_uid=messages_by_uid)
+                        wa_account_id._process_messages(value, channels=channels)
+                else:
+                    _logger.warning("There is no phone configured for this whatsapp webhook : %s ", entry)
+
+            # Process Template webhooks
+            if value.get('message_template_id'):
+                # There is no user in webhook, so we need to SUPERUSER_ID to write on template object
+                template = self.env['whatsapp.template'].sudo().search([('wa_template_uid', '=', value['message_template_id'])])
+                if template:
+                    if changes['field'] == 'message_template_status_update':
+                        template.write({'status': value['event'].lower()})
+                        description = value.get('other_info', {}).get('description', {}) or value.get('reason', {})
+                        if description:
+                            template.message_post(
+                                body=_("Your Template has been rejected.") + Markup("<br/>") + _("Reason : %s", description))
+                        continue
+                    if changes['field'] == 'message_template_quality_update':
+                        template.write({'quality': value['new_quality_score'].lower()})
+                        continue
+                    if changes['field'] == 'template_category_update':
+                        template.write({'template_type': value['new_category'].lower()})
+                        continue
+                    _logger.warning("Unknown Template webhook : %s ", value)
+                else:
+                    _logger.warning("No Template found for this webhook : %s ", value)
@@ -109,12 +109,15 @@ class MockIncomingWhatsApp(common.HttpCase):
     def _make_webhook_request(self, account, message_data=None, headers=None):
         if not message_data:
             message_data = json.dumps({'entry': [{'id': account.account_uid}]}).encode()
-        return self.url_open(
+        response = self.url_open(
             '/whatsapp/webhook/', data=message_data, headers={
                 "Content-Type": "application/json",
                 **(headers or {})
             }
         ).json()
+        # payloads are only stored by the webhook, process them as the cron would
+        self.env['whatsapp.webhook.event'].sudo()._process_pending()
+        return response
 
     # ------------------------------------------------------------
     # TEST TOOLS AND ASSERTS
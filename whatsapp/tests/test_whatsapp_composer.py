@@ -75,6 +75,33 @@ Welcome to {{4}} office''',
                     with self.mockWhatsappGateway():
                         composer.action_send_whatsapp_template()
 
+    @users('user_wa_admin')
+    def test_composer_batch_mode(self):
+        """ Bulk send renders the variables of every record and logs one
+        message per record. """
+        template = self.env['whatsapp.template'].create({
+            'body': 'Hello {{1}}, welcome to {{2}}',
+            'name': 'Test-batch',
+            'status': 'approved',
+            'variable_ids': [
+                (5, 0, 0),
+                (0, 0, {'name': "{{1}}", 'line_type': "body", 'field_type': "field", 'demo_value': "Customer", 'field_name': 'name'}),
+                (0, 0, {'name': "{{2}}", 'line_type': "body", 'field_type': "free_text", 'demo_value': "Odoo"}),
+            ],
+            'wa_account_id': self.whatsapp_account.id,
+        })
+        composer = self._instanciate_wa_composer_from_records(template, from_records=self.customers)
+        self.assertTrue(composer.batch_mode)
+        with self.mockWhatsappGateway():
+            composer.action_send_whatsapp_template()
+
+        self.assertEqual(len(self._new_wa_msg), 2)
+        for customer in self.customers:
+            wa_msg = self._find_wa_msg_wrecord(customer)
+            self.assertEqual(wa_msg.state, 'sent')
+            self.assertIn(f'Hello {customer.name}, welcome to Odoo', wa_msg.mail_message_id.body)
+            self.assertEqual(wa_msg.mail_message_id.message_type, 'whatsapp_message')
+
     @users('user_wa_admin')
     def test_composer_preview(self):
         """ Test preview feature from composer """
@@ -144,3 +171,18 @@ Welcome to {{4}} office''',
         # Test that the WhatsApp message fails validation when a URL button with an invalid URL is added.
         with self.assertRaises(exceptions.ValidationError):
             self._add_button_to_template(self.template_basic, name="test url fail", website_url='odoo.com', button_type='url')
+
+    @users('employee')
+    def test_composer_tpl_blacklisted_number(self):
+        """ Blacklisted numbers are failed before reaching WhatsApp. """
+        self.env['phone.blacklist'].sudo().add('+91 12345 67891')
+
+        template = self.template_basic.with_env(self.env)
+        composer = self._instanciate_wa_composer_from_records(template, from_records=self.customers[0])
+        with self.mockWhatsappGateway():
+            composer.action_send_whatsapp_template()
+
+        self.assertEqual(len(self._new_wa_msg), 1)
+        self.assertEqual(self._new_wa_msg.state, 'error')
+        self.assertEqual(self._new_wa_msg.failure_type, 'blacklisted')
+        self.assertFalse(self._wa_msg_sent)
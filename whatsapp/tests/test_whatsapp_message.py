@@ -1,11 +1,16 @@
 # Part of Odoo. See LICENSE file for full copyright and licensing details.
 
+import json
+
 from datetime import datetime
 from freezegun import freeze_time
+from functools import partial
 from unittest.mock import patch
 
 from odoo.addons.whatsapp.tests.common import WhatsAppCommon
-from odoo.tests import tagged
+from odoo.addons.whatsapp.tools.whatsapp_exception import WhatsAppError
+from odoo.addons.whatsapp.tools.whatsapp_sender import send_all
+from odoo.tests import BaseCase, tagged
 
 
 @tagged('wa_message')
@@ -72,3 +77,57 @@ class WhatsAppMessage(WhatsAppCommon):
                 deleted_message,
                 all_messages
             )
+
+    def test_webhook_event_invalid_payloads(self):
+        """ Malformed payloads fail their own event without failing the batch. """
+        account_uid = self.whatsapp_account.account_uid
+        payloads = [
+            {'entry': [{'id': account_uid}]},
+            'not json',
+            [account_uid],
+            {'entry': [{'changes': []}]},
+            {'entry': [{'id': account_uid, 'changes': [{'field': 'messages'}]}]},
+            {'entry': [{'id': account_uid, 'changes': [{'field': 'messages', 'value': {'statuses': [{}]}}]}]},
+        ]
+        events = self.env['whatsapp.webhook.event'].sudo().create([
+            {'payload': payload if isinstance(payload, str) else json.dumps(payload)}
+            for payload in payloads
+        ])
+        events._process()
+        self.assertEqual(events.mapped('state'), ['done'] + ['error'] * 5)
+        self.assertEqual(events.mapped('failure_reason'), [
+            False,
+            'Invalid JSON payload',
+            'Invalid webhook payload',
+            'Invalid webhook entry: missing account id',
+            'Invalid webhook change: missing value',
+            'Invalid webhook change: invalid statuses',
+        ])
+
+
+@tagged('wa_message')
+class WhatsAppSender(BaseCase):
+
+    def test_send_all(self):
+        """ Calls of a same group keep their order, outcomes are returned in
+        the order of the calls and throttled calls are retried. """
+        sent = []
+        throttled = {'count': 0}
+
+        def send(number, index):
+            if index == 3 and not throttled['count']:
+                throttled['count'] += 1
+                raise WhatsAppError('Throughput reached', 130429)
+            if index == 5:
+                raise WhatsAppError('Invalid parameter', 131009)
+            sent.append((number, index))
+            return f'wamid.{index}'
+
+        numbers = ['32470000001', '32470000002', '32470000001', '32470000003', '32470000001', '32470000002']
+        calls = [(number, None, partial(send, number, index)) for index, number in enumerate(numbers)]
+        outcomes = send_all(calls, 4, retry_delay=lambda e: 0 if e.error_code == 130429 else None)
+
+        self.assertEqual([result for result, _error in outcomes], ['wamid.0', 'wamid.1', 'wamid.2', 'wamid.3', 'wamid.4', None])
+        self.assertEqual(outcomes[5][1].error_code, 131009)
+        self.assertEqual(throttled['count'], 1)
+        self.assertEqual([index for number, index in sent if number == '32470000001'], [0, 2, 4])
@@ -4,3 +4,4 @@ from . import lang_list
 from . import retryable_codes
 from . import whatsapp_api
 from . import whatsapp_exception
+from . import whatsapp_sender
@@ -35,3 +35,10 @@ WHATSAPP_RETRYABLE_ERROR_CODES = {
     133006,  # Phone number needs to be verified before registering.
     133010,  # Phone number not registered on the Whatsapp Business Platform.
 }
+
+# Throughput limits, retried after a short delay while sending
+WHATSAPP_THROTTLING_ERROR_CODES = {
+    4,       # The app has reached its API call rate limit.
+    80007,   # The WhatsApp Business Account has reached its rate limit.
+    130429,  # Cloud API message throughput has been reached.
+}
@@ -8,10 +8,13 @@ import json
 from odoo import _
 from odoo.exceptions import RedirectWarning
 from odoo.addons.whatsapp.tools.whatsapp_exception import WhatsAppError
+from odoo.addons.whatsapp.tools.whatsapp_sender import get_session
 
 _logger = logging.getLogger(__name__)
 
 DEFAULT_ENDPOINT = "https://graph.facebook.com/v17.0"
+# connections kept alive per account, at least the number of send workers
+SESSION_POOL_SIZE = 16
 
 class WhatsAppApi:
     def __init__(self, wa_account_id):
@@ -20,6 +23,14 @@ class WhatsAppApi:
         self.phone_uid = wa_account_id.phone_uid
         self.token = wa_account_id.sudo().token
         self.is_shared_account = False
+        # read once, messages may be sent from worker threads without ORM access
+        self.account_name = wa_account_id.name
+        self.session = get_session((wa_account_id.env.cr.dbname, wa_account_id.id), SESSION_POOL_SIZE)
+
+    def _check_configuration(self):
+        if not all([self.token, self.phone_uid]):
+            action = self.wa_account_id.env.ref('whatsapp.whatsapp_account_action')
+            raise RedirectWarning(_("To use WhatsApp Configure it first"), action=action.id, button_text=_("Configure Whatsapp Business Account"))
 
     def __api_requests(self, request_type, url, auth_type="", params=False, headers=None, data=False, files=False, endpoint_include=False):
         if getattr(threading.current_thread(), 'testing', False):
@@ -27,9 +38,7 @@ class WhatsAppApi:
 
         headers = headers or {}
         params = params or {}
-        if not all([self.token, self.phone_uid]):
-            action = self.wa_account_id.env.ref('whatsapp.whatsapp_account_action')
-            raise RedirectWarning(_("To use WhatsApp Configure it first"), action=action.id, button_text=_("Configure Whatsapp Business Account"))
+        self._check_configuration()
         if auth_type == 'oauth':
             headers.update({'Authorization': f'OAuth {self.token}'})
         if auth_type == 'bearer':
@@ -37,7 +46,7 @@ class WhatsAppApi:
         call_url = (DEFAULT_ENDPOINT + url) if not endpoint_include else url
 
         try:
-            res = requests.request(request_type, call_url, params=params, headers=headers, data=data, files=files, timeout=10)
+            res = self.session.request(request_type, call_url, params=params, headers=headers, data=data, files=files, timeout=10)
         except requests.exceptions.RequestException:
             raise WhatsAppError(failure_type='network')
 
@@ -176,7 +185,7 @@ class WhatsAppApi:
                 message_type: send_vals
             })
         json_data = json.dumps(data)
-        _logger.info("Send %s message from account %s [%s]", message_type, self.wa_account_id.name, self.wa_account_id.id)
+        _logger.info("Send %s message from account %s [%s]", message_type, self.account_name, self.wa_account_id.id)
         response = self.__api_requests(
             "POST",
             f"/{self.phone_uid}/messages",
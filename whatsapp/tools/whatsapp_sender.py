@@ -0,0 +1,116 @@
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+"""
+Concurrent sending of WhatsApp messages.
+
+Calls are spread over a bounded pool of threads; the calls of a same group
+(recipient) run one after the other on a single thread, and every call first
+takes a slot from the rate limiter of its sender phone. HTTP connections are
+kept alive in one pooled session per account. This module only deals with
+HTTP and never touches the ORM, so that it can be used from worker threads.
+"""
+
+import threading
+import time
+
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+_lock = threading.Lock()
+_sessions = {}
+_rate_limiters = {}
+
+
+class WhatsAppRateLimiter:
+    """ Token bucket allowing ``rate`` calls per second, with bursts of at
+    most one second worth of calls. """
+
+    def __init__(self, rate):
+        self.rate = float(rate)
+        self.tokens = self.rate
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def get_session(key, pool_size):
+    """ Shared keep-alive session of ``key`` (e.g. an account), able to hold
+    ``pool_size`` connections to the same host. """
+    with _lock:
+        session, size = _sessions.get(key, (None, 0))
+        if session is None or size < pool_size:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _sessions[key] = (session, pool_size)
+        return session
+
+
+def get_rate_limiter(key, rate):
+    """ Shared rate limiter of ``key`` (a sender phone). """
+    with _lock:
+        limiter = _rate_limiters.get(key)
+        if limiter is None or limiter.rate != float(rate):
+            limiter = _rate_limiters[key] = WhatsAppRateLimiter(rate)
+        return limiter
+
+
+def send_all(calls, workers, retry_delay=None, retries=2):
+    """
+    Run the given calls concurrently and return their outcome.
+
+    :param list calls: list of (group, rate limiter or None, callable)
+    :param int workers: maximum number of threads
+    :param retry_delay: optional callable receiving the exception raised by
+      a call and returning the delay in seconds before retrying it, or None
+      when the call must not be retried
+    :param int retries: maximum number of retries of a call
+    :return: list of (result, exception) in the order of ``calls``
+    """
+    outcomes = [(None, None)] * len(calls)
+
+    def run(indexes):
+        for index in indexes:
+            _group, limiter, call = calls[index]
+            attempt = 0
+            while True:
+                if limiter:
+                    limiter.acquire()
+                try:
+                    outcomes[index] = (call(), None)
+                except Exception as e:  # noqa: BLE001 reported to the caller
+                    delay = retry_delay(e) if retry_delay and attempt < retries else None
+                    if delay is not None:
+                        attempt += 1
+                        time.sleep(delay * attempt)
+                        continue
+                    outcomes[index] = (None, e)
+                break
+
+    groups = defaultdict(list)
+    for index, (group, _limiter, _call) in enumerate(calls):
+        groups[group].append(index)
+    if workers <= 1 or len(groups) <= 1:
+        for indexes in groups.values():
+            run(indexes)
+        return outcomes
+    with ThreadPoolExecutor(max_workers=min(workers, len(groups)), thread_name_prefix='whatsapp_send') as executor:
+        for future in [executor.submit(run, indexes) for indexes in groups.values()]:
+            future.result()
+    return outcomes
+
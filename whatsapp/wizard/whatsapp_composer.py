@@ -218,37 +218,55 @@ class WhatsAppComposer(models.TransientModel):
                     _("User mobile number required in template but no value set on user profile.")
                 )
         free_text_json = self._get_text_free_json()
-        message_vals = []
         company_country_id = self.env.company.country_id
+        mobile_numbers = []
         for rec in records:
             mobile_number = rec.mapped(self.wa_template_id.phone_field)[0] if self.batch_mode else self.phone
             formatted_number = phone_validation.phone_format(mobile_number, company_country_id.code, company_country_id.phone_code) if mobile_number else False
-            if not formatted_number:
-                continue
-            body = self._get_html_preview_whatsapp(rec=rec)
-            post_values = {
-                'attachment_ids': [self.attachment_id.id] if self.attachment_id else [],
-                'body': body,
-                'message_type': 'whatsapp_message',
-                'partner_ids': hasattr(rec, '_mail_get_partners') and rec._mail_get_partners()[rec.id].ids or rec._whatsapp_get_responsible().partner_id.ids,
-            }
-            if hasattr(records, '_message_log'):
-                message = rec._message_log(**post_values)
-            else:
-                message = self.env['mail.message'].create(
-                    dict(post_values, res_id=rec.id, model=self.res_model,
-                         subtype_id=self.env['ir.model.data']._xmlid_to_res_id("mail.mt_note"))
-                )
-            message_vals.append({
-                'mail_message_id': message.id,
-                'mobile_number': mobile_number,
-                'free_text_json': free_text_json,
-                'wa_template_id': self.wa_template_id.id,
-                'wa_account_id': self.wa_template_id.wa_account_id.id,
-            })
-        if message_vals:
-            message = self.env['whatsapp.message'].create(message_vals)
-            message._send(force_send_by_cron=force_send_by_cron)
+            if formatted_number:
+                mobile_numbers.append((rec, mobile_number))
+        if not mobile_numbers:
+            return
+        records = records.browse([rec.id for rec, _mobile_number in mobile_numbers])
+
+        # evaluate bodies and recipients of all records at once
+        bodies = self._get_html_previews_whatsapp(records)
+        partners = records._mail_get_partners() if hasattr(records, '_mail_get_partners') else {}
+        post_values_list = [{
+            'attachment_ids': [self.attachment_id.id] if self.attachment_id else [],
+            'body': bodies[rec.id],
+            'message_type': 'whatsapp_message',
+            'partner_ids': partners and partners[rec.id].ids or rec._whatsapp_get_responsible().partner_id.ids,
+        } for rec, _mobile_number in mobile_numbers]
+        messages = self._create_mail_messages(records, post_values_list)
+
+        message = self.env['whatsapp.message'].create([{
+            'mail_message_id': message.id,
+            'mobile_number': mobile_number,
+            'free_text_json': free_text_json,
+            'wa_template_id': self.wa_template_id.id,
+            'wa_account_id': self.wa_template_id.wa_account_id.id,
+        } for message, (_rec, mobile_number) in zip(messages, mobile_numbers)])
+        message._send(force_send_by_cron=force_send_by_cron)
+
+    def _create_mail_messages(self, records, post_values_list):
+        """ Log the messages of ``records`` (one values dict per record, in the
+        same order) with a single create, like ``_message_log`` would do one
+        by one on threads. """
+        subtype_id = self.env['ir.model.data']._xmlid_to_res_id("mail.mt_note")
+        if hasattr(records, '_message_log'):
+            author_id, email_from = records._message_compute_author(raise_on_email=False)
+            reply_to = self.env['mail.thread']._notify_get_reply_to(default=email_from)[False]
+            return records.sudo()._message_create([
+                dict(post_values, author_id=author_id, email_from=email_from, is_internal=True,
+                     model=records._name, res_id=rec.id, record_name=False, reply_to=reply_to,
+                     subtype_id=subtype_id)
+                for rec, post_values in zip(records, post_values_list)
+            ])
+        return self.env['mail.message'].create([
+            dict(post_values, res_id=rec.id, model=self.res_model, subtype_id=subtype_id)
+            for rec, post_values in zip(records, post_values_list)
+        ])
 
     def _get_text_free_json(self):
         """This method is used to prepare free text json using values set in free text field of composer."""
@@ -269,16 +287,28 @@ class WhatsAppComposer(models.TransientModel):
 
     def _get_html_preview_whatsapp(self, rec):
         """This method is used to get the html preview of the whatsapp message."""
+        return self._get_html_previews_whatsapp(rec)[rec.id]
+
+    def _get_html_previews_whatsapp(self, records):
+        """Html previews of the whatsapp message for all records, the template
+        variables being evaluated for all of them in one pass.
+
+        :return dict: {record id: Markup}
+        """
         self.ensure_one()
-        template_variables_value = self.wa_template_id.variable_ids._get_variables_value(rec)
+        values_by_record = self.wa_template_id.variable_ids._get_variables_values(records)
+        free_text_values = {}
         text_vars = self.wa_template_id.variable_ids.filtered(lambda var: var.field_type == 'free_text')
         for var_index, body_text_var in zip(range(1, self.number_of_free_text + 1), text_vars.filtered(lambda var: var.line_type == 'body')):
             free_text_x = self[f'free_text_{var_index}']
             if free_text_x:
-                template_variables_value[f'body-{body_text_var.name}'] = free_text_x
+                free_text_values[f'body-{body_text_var.name}'] = free_text_x
         if self.header_text_1 and text_vars.filtered(lambda var: var.line_type == 'header'):
-            template_variables_value['header-{{1}}'] = self.header_text_1
-        return self.wa_template_id._get_formatted_body(variable_values=template_variables_value)
+            free_text_values['header-{{1}}'] = self.header_text_1
+        return {
+            record_id: self.wa_template_id._get_formatted_body(variable_values=dict(template_variables_value, **free_text_values))
+            for record_id, template_variables_value in values_by_record.items()
+        }
 
     # ------------------------------------------------------------
     # TOOLS